@@ -14,6 +14,10 @@ Environment ## An environment holds objects, runs simulations
     XYEnvironment
     VacuumEnvironment
 
+XYSnapshot ## An immutable view of an XYEnvironment that planners can search
+
+ThingChanges ## The net adds, moves and deletes of a batch, as sent to observers
+
 
 An agent program is a callable instance, taking percepts and choosing actions
     SimpleReflexAgentProgram
@@ -26,15 +30,13 @@ EnvToolbar ## contains buttons for controlling EnvGUI
 EnvCanvas ## Canvas to display the environment of an EnvGUI
 """
 
-from utilities import distance_squared, turn_heading
+from utilities import distance_squared, turn_heading, zobrist_key
 from statistics import mean
-from ipythonblocks import BlockGrid
-from IPython.display import HTML, display, clear_output
-from time import sleep
 
 import random
 import copy
 import collections
+import contextlib
 import numbers
 
 
@@ -130,6 +132,8 @@ class Environment:
     def __init__(self):
         self.things = []
         self.agents = []
+        self.tick = 0
+        self.recorder = None
 
     def thing_classes(self):
         return []  # List of classes that can go into environment
@@ -168,7 +172,9 @@ class Environment:
                     actions.append("")
             for (agent, action) in zip(self.agents, actions):
                 self.execute_action(agent, action)
+                self.record_action(agent, action, self.tick)
             self.exogenous_change()
+            self.tick += 1
 
     def run(self, steps=1000):
         """Run the Environment for given number of time steps."""
@@ -177,6 +183,13 @@ class Environment:
                 return
             self.step()
 
+    def record_action(self, agent, action, tick, cleaned=None):
+        """Pass an executed action and its outcome on to the recorder, if one
+        is attached (see episode_trace.TraceRecorder). cleaned tells whether
+        the action removed dirt, if the environment knows."""
+        if self.recorder is not None:
+            self.recorder.record(tick, self.agents.index(agent), action, agent.location, agent.performance, cleaned)
+
     def list_things_at(self, location, tclass=Thing):
         """Return all things exactly at a given location."""
         if isinstance(location, numbers.Number):
@@ -198,15 +211,17 @@ class Environment:
             thing = Agent(thing)
         if thing in self.things:
             print("Can't add the same thing twice")
+            return False
         else:
             thing.location = location if location is not None else self.default_location(thing)
             self.things.append(thing)
             if isinstance(thing, Agent):
                 thing.performance = 0
                 self.agents.append(thing)
+            return True
 
     def delete_thing(self, thing):
-        """Remove a thing from the environment."""
+        """Remove a thing from the environment. Returns False if it was not there."""
         try:
             self.things.remove(thing)
         except ValueError as e:
@@ -214,8 +229,10 @@ class Environment:
             print("  in Environment delete_thing")
             print("  Thing to be removed: {} at {}".format(thing, thing.location))
             print("  from list: {}".format([(thing, thing.location) for thing in self.things]))
+            return False
         if thing in self.agents:
             self.agents.remove(thing)
+        return True
 
 
 class Direction:
@@ -316,6 +333,18 @@ class XYEnvironment(Environment):
         self.width = width
         self.height = height
         self.observers = []
+        # Changes collected for observers while a changes() block is open.
+        self.pending_changes = None
+        self.batch_depth = 0
+
+        # Bumped whenever walls or dirt change, so snapshot() can reuse its last result.
+        self.version = 0
+        self.snapshot_cache = None
+        # Zobrist hashes of the wall and dirt layout, kept up to date by map_changed().
+        self.wall_fingerprint = 0
+        self.dirt_fingerprint = 0
+        # Walls and dirt by location, also kept by map_changed(), see map_things_at().
+        self.map_index = {}
 
         # Sets iteration start and end (no walls).
         self.x_start, self.y_start = (0, 0)
@@ -336,6 +365,11 @@ class XYEnvironment(Environment):
         """By default, agent perceives things within a default radius."""
         return self.things_near(agent.location)
 
+    def step(self):
+        """Run the environment for one time step; observers hear of all its changes at once."""
+        with self.changes():
+            super().step()
+
     def execute_action(self, agent, action):
         agent.bump = False
         if action == 'TurnRight':
@@ -365,28 +399,35 @@ class XYEnvironment(Environment):
 
     def move_to(self, thing, destination):
         """Move a thing to a new location. Returns True on success or False if there is an Obstacle.
-        If thing is holding anything, they move with him."""
+        If thing is holding anything, they move with him. Held things are not in the
+        environment (see 'Grab'), so only their location changes."""
         thing.bump = self.some_things_at(destination, Obstacle)
         if not thing.bump:
+            origin = thing.location
+            self.map_changed(thing, origin)
             thing.location = destination
-            for o in self.observers:
-                o.thing_moved(thing)
-            for t in thing.holding:
-                self.delete_thing(t)
-                self.add_thing(t, destination)
+            self.map_changed(thing, destination)
+            self.thing_changed('move', thing, origin, destination)
+            for t in getattr(thing, 'holding', ()):
                 t.location = destination
         return thing.bump
 
     def add_thing(self, thing, location=None, exclude_duplicate_class_items=False):
         """Add things to the world. If (exclude_duplicate_class_items) then the item won't be
-        added if the location has at least one item of the same class."""
+        added if the location has at least one item of the same class. Returns True if it was added."""
         if location is None:
-            super().add_thing(thing)
+            added = super().add_thing(thing)
         elif self.is_inbounds(location):
             if (exclude_duplicate_class_items and
                     any(isinstance(t, thing.__class__) for t in self.list_things_at(location))):
-                return
-            super().add_thing(thing, location)
+                return False
+            added = super().add_thing(thing, location)
+        else:
+            return False
+        if added:
+            self.map_changed(thing, thing.location)
+            self.thing_changed('add', thing, thing.location)
+        return added
 
     def is_inbounds(self, location):
         """Checks to make sure that the location is inbounds (within walls if we have walls)"""
@@ -408,9 +449,32 @@ class XYEnvironment(Environment):
         if isinstance(thing, Agent):
             del thing.holding
 
-        super().delete_thing(thing)
-        for obs in self.observers:
-            obs.thing_deleted(thing)
+        if super().delete_thing(thing):
+            self.map_changed(thing, thing.location)
+            self.thing_changed('delete', thing, thing.location)
+
+    def map_changed(self, thing, location):
+        """Account for a wall or dirt appearing at, or leaving, location.
+        Doing it twice for the same location cancels out."""
+        if isinstance(thing, Obstacle):
+            self.wall_fingerprint ^= zobrist_key('wall', *location)
+        elif isinstance(thing, Dirt):
+            self.dirt_fingerprint ^= zobrist_key('dirt', *location)
+        else:
+            return
+        self.version += 1
+        location = tuple(location)
+        things = self.map_index.setdefault(location, [])
+        if thing in things:
+            things.remove(thing)
+            if not things:
+                del self.map_index[location]
+        else:
+            things.append(thing)
+
+    def map_things_at(self, location):
+        """The walls and dirt at location, looked up without scanning all things."""
+        return self.map_index.get(tuple(location), ())
 
     def add_walls(self):
         """Put walls around the entire perimeter of the grid."""
@@ -429,15 +493,172 @@ class XYEnvironment(Environment):
         """Adds an observer to the list of observers.
         An observer is typically an EnvGUI.
 
-        Each observer is notified of changes in move_to and add_thing,
-        by calling the observer's methods thing_moved(thing)
-        and thing_added(thing, loc)."""
+        Observers are notified of the things added, moved and deleted. One that
+        has a things_changed(changes) method gets a single ThingChanges per
+        batch (see changes()); otherwise its methods thing_added(thing, loc)
+        (if it has one), thing_moved(thing) and thing_deleted(thing) are called
+        for each thing in the batch."""
         self.observers.append(observer)
 
+    @contextlib.contextmanager
+    def changes(self):
+        """Collect the changes made inside a with block and notify observers of
+        their net effect once, when the block ends. Blocks may be nested, only
+        the outermost one notifies. step() runs inside such a block."""
+        if self.pending_changes is None:
+            self.pending_changes = ThingChanges(self.tick)
+        self.batch_depth += 1
+        try:
+            yield self.pending_changes
+        finally:
+            self.batch_depth -= 1
+            if self.batch_depth == 0:
+                changes, self.pending_changes = self.pending_changes, None
+                self.notify(changes)
+
+    def thing_changed(self, kind, thing, *locations):
+        """Add a change ('add', 'move' or 'delete') to the open batch, or notify
+        observers of it straight away if there is none."""
+        if not self.observers:
+            return
+        if self.pending_changes is not None:
+            getattr(self.pending_changes, kind)(thing, *locations)
+            return
+        changes = ThingChanges(self.tick)
+        getattr(changes, kind)(thing, *locations)
+        self.notify(changes)
+
+    def notify(self, changes):
+        if not changes:
+            return
+        for observer in self.observers:
+            if hasattr(observer, 'things_changed'):
+                observer.things_changed(changes)
+                continue
+            if hasattr(observer, 'thing_added'):
+                for thing, location in changes.added.items():
+                    observer.thing_added(thing, location)
+            for thing in changes.moved:
+                observer.thing_moved(thing)
+            for thing in changes.deleted:
+                observer.thing_deleted(thing)
+
     def turn_heading(self, heading, inc):
         """Return the heading to the left (inc=+1) or right (inc=-1) of heading."""
         return turn_heading(heading, inc)
 
+    def snapshot(self):
+        """Return an immutable XYSnapshot of the walls, dirt and agent locations.
+        Planners can search a snapshot on another thread or process while this
+        environment keeps changing. Consecutive snapshots share their wall and
+        dirt sets whenever those did not change in between."""
+        agents = tuple(tuple(agent.location) for agent in self.agents)
+        cached = self.snapshot_cache
+        if cached is not None and cached.version == self.version:
+            if cached.agents == agents:
+                return cached
+            snapshot = cached._replace(agents=agents)
+        else:
+            walls = frozenset(tuple(t.location) for t in self.things if isinstance(t, Obstacle))
+            dirt = frozenset(tuple(t.location) for t in self.things if isinstance(t, Dirt))
+            if cached is not None:
+                walls = cached.walls if walls == cached.walls else walls
+                dirt = cached.dirt if dirt == cached.dirt else dirt
+            snapshot = XYSnapshot(self.width, self.height, walls, dirt, agents, self.version,
+                                  self.wall_fingerprint, self.dirt_fingerprint)
+        self.snapshot_cache = snapshot
+        return snapshot
+
+
+class ThingChanges:
+    """The net effect of a batch of changes to an XYEnvironment at a given tick.
+    added maps each new thing to its location, moved maps each thing that moved
+    to its (from, to) locations and deleted maps each removed thing to where it
+    was. Changes that cancel out within the batch, such as a thing added and
+    deleted again, are left out."""
+
+    def __init__(self, tick):
+        self.tick = tick
+        self.added = {}
+        self.moved = {}
+        self.deleted = {}
+
+    def __len__(self):
+        return len(self.added) + len(self.moved) + len(self.deleted)
+
+    def __repr__(self):
+        return '<ThingChanges tick={} added={} moved={} deleted={}>'.format(
+            self.tick, len(self.added), len(self.moved), len(self.deleted))
+
+    def add(self, thing, location):
+        location = tuple(location)
+        if thing in self.deleted:  # deleted and put back: at most a move
+            origin = self.deleted.pop(thing)
+            if origin != location:
+                self.moved[thing] = (origin, location)
+        else:
+            self.added[thing] = location
+
+    def move(self, thing, origin, destination):
+        origin, destination = tuple(origin), tuple(destination)
+        if thing in self.added:
+            self.added[thing] = destination
+            return
+        if thing in self.moved:
+            origin = self.moved[thing][0]
+        if origin == destination:
+            self.moved.pop(thing, None)
+        else:
+            self.moved[thing] = (origin, destination)
+
+    def delete(self, thing, location):
+        if self.added.pop(thing, None) is not None:
+            return
+        if thing in self.moved:
+            location = self.moved.pop(thing)[0]
+        self.deleted[thing] = tuple(location)
+
+
+class XYSnapshot(collections.namedtuple('XYSnapshot', 'width height walls dirt agents version '
+                                                      'wall_fingerprint dirt_fingerprint')):
+    """An immutable view of an XYEnvironment, as returned by XYEnvironment.snapshot().
+    walls and dirt are frozensets of (x, y) locations, agents is a tuple with the
+    location of each agent. Snapshots are cheap to copy and safe to share between
+    threads; use with_changes() to plan "what-if" variants of the same map.
+    The fingerprints are Zobrist hashes of the wall and dirt layout."""
+    __slots__ = ()
+
+    @property
+    def fingerprint(self):
+        """Zobrist hash of walls and dirt together."""
+        return self.wall_fingerprint ^ self.dirt_fingerprint
+
+    def is_blocked(self, location):
+        return tuple(location) in self.walls
+
+    def has_dirt(self, location):
+        return tuple(location) in self.dirt
+
+    def with_changes(self, add_walls=(), remove_walls=(), add_dirt=(), remove_dirt=(), agents=None):
+        """Return a new snapshot with some walls or dirt added or removed.
+        Anything left unchanged is shared with this snapshot."""
+        walls, wall_fingerprint = changed_layout(self.walls, self.wall_fingerprint, 'wall', add_walls, remove_walls)
+        dirt, dirt_fingerprint = changed_layout(self.dirt, self.dirt_fingerprint, 'dirt', add_dirt, remove_dirt)
+        agents = self.agents if agents is None else tuple(map(tuple, agents))
+        return self._replace(walls=walls, dirt=dirt, agents=agents, version=None,
+                             wall_fingerprint=wall_fingerprint, dirt_fingerprint=dirt_fingerprint)
+
+
+def changed_layout(locations, fingerprint, kind, add, remove):
+    """Return locations with add and remove applied, and its updated Zobrist fingerprint."""
+    if not add and not remove:
+        return locations, fingerprint
+    add = set(map(tuple, add)) - locations
+    remove = set(map(tuple, remove)) & (locations | add)
+    for location in add ^ remove:
+        fingerprint ^= zobrist_key(kind, *location)
+    return (locations | add) - remove, fingerprint
+
 
 class Obstacle(Thing):
     """Something that can cause a bump, preventing an agent from
@@ -0,0 +1,249 @@
+"""
+Contraction hierarchies for repeated shortest-path queries on static maps.
+
+ContractionHierarchy ## Preprocesses a Graph once, then answers point-to-point
+                        distance and path queries by a tiny bidirectional search
+grid_graph           ## Compiles a grid world with walls into an undirected Graph
+
+Preprocessing contracts the nodes one by one, least important first: a node is
+taken out of the graph and, for each pair of its neighbours whose shortest path
+ran through it, a shortcut link is added between them, remembering the node it
+skips. Whether a path is still there without the node is checked by a small
+local Dijkstra search (the witness search). Importance is the edge difference
+(shortcuts added minus links removed) plus the number of neighbours already
+contracted, which spreads contractions evenly over the map.
+
+A query searches from the source upwards, i.e. only along links to nodes
+contracted later, and from the target upwards along reversed links; the shortest
+path is found where the two searches meet. Both only ever climb the hierarchy,
+so they settle a small number of nodes, where A* would search the map. Shortcuts on the path are
+unpacked recursively into the links of the original graph.
+
+The preprocessing only holds for the map it was built on; a changed wall means
+building the hierarchy again.
+"""
+
+import heapq
+import itertools
+
+from search_algorithms import UndirectedGraph
+
+# Nodes a witness search may settle before giving up and adding the shortcut anyway.
+WITNESS_LIMIT = 60
+
+
+def grid_graph(width, height, walls):
+    """The rooms of a width x height grid that are not walls, as an undirected
+    Graph with a link of length 1 between neighbouring rooms."""
+    graph = UndirectedGraph()
+    for x in range(width):
+        for y in range(height):
+            if (x, y) in walls:
+                continue
+            graph.graph_dict.setdefault((x, y), {})
+            for neighbour in ((x + 1, y), (x, y + 1)):
+                if neighbour[0] < width and neighbour[1] < height and neighbour not in walls:
+                    graph.connect((x, y), neighbour, 1)
+    return graph
+
+
+class ContractionHierarchy:
+    """The contraction hierarchy of a Graph (or anything with its nodes() and
+    get() methods, such as a CSRGraph). Link lengths must be non-negative numbers.
+    rank maps each node to its place in the contraction order; upward maps each
+    node to the links out of it towards higher ranked nodes, and downward to the
+    links into it from higher ranked nodes, shortcuts included. middle maps each
+    shortcut (u, w) to the node it skips."""
+
+    def __init__(self, graph):
+        nodes = graph.nodes()
+        out_links = {node: {} for node in nodes}
+        in_links = {node: {} for node in nodes}
+        for a in nodes:
+            for b, length in graph.get(a).items():
+                if a != b and length < out_links[a].get(b, float('inf')):
+                    out_links[a][b] = length
+                    in_links[b][a] = length
+        self.out_links, self.in_links = out_links, in_links
+        self.rank = {}
+        self.upward = {node: {} for node in nodes}
+        self.downward = {node: {} for node in nodes}
+        self.middle = {}
+        self.shortcuts = 0
+        self.deleted_neighbours = dict.fromkeys(nodes, 0)
+
+        counter = itertools.count()
+        queue = [(self.priority(node), next(counter), node) for node in nodes]
+        heapq.heapify(queue)
+        while queue:
+            _, _, node = heapq.heappop(queue)
+            priority = self.priority(node)  # lazy update: the neighbourhood may have changed since it was queued
+            if queue and priority > queue[0][0]:
+                heapq.heappush(queue, (priority, next(counter), node))
+                continue
+            self.contract(node)
+        del self.out_links, self.in_links, self.deleted_neighbours
+
+    def witnesses(self, source, skipped, limit):
+        """Distances from source found by Dijkstra without going through skipped,
+        no further than limit and settling at most WITNESS_LIMIT nodes."""
+        distances = {source: 0}
+        frontier = [(0, source)]
+        settled = 0
+        while frontier and settled < WITNESS_LIMIT:
+            distance, node = heapq.heappop(frontier)
+            if distance > distances[node]:
+                continue
+            if distance > limit:
+                break
+            settled += 1
+            for other, length in self.out_links[node].items():
+                if other != skipped and distance + length < distances.get(other, float('inf')):
+                    distances[other] = distance + length
+                    heapq.heappush(frontier, (distance + length, other))
+        return distances
+
+    def shortcuts_needed(self, node):
+        """The shortcuts (u, w, length) that contracting node would add."""
+        needed = []
+        targets = self.out_links[node]
+        for u, first in self.in_links[node].items():
+            if not targets.keys() - {u}:
+                continue
+            distances = self.witnesses(u, node, first + max(targets.values()))
+            for w, second in targets.items():
+                if w != u and distances.get(w, float('inf')) > first + second:
+                    needed.append((u, w, first + second))
+        return needed
+
+    def priority(self, node):
+        removed = len(self.out_links[node]) + len(self.in_links[node])
+        return 2 * (len(self.shortcuts_needed(node)) - removed) + self.deleted_neighbours[node]
+
+    def contract(self, node):
+        self.rank[node] = len(self.rank)
+        for u, w, length in self.shortcuts_needed(node):
+            if length < self.out_links[u].get(w, float('inf')):
+                self.out_links[u][w] = length
+                self.in_links[w][u] = length
+                self.middle[(u, w)] = node
+                self.shortcuts += 1
+        for w, length in self.out_links.pop(node).items():
+            self.upward[node][w] = length
+            del self.in_links[w][node]
+            self.deleted_neighbours[w] += 1
+        for u, length in self.in_links.pop(node).items():
+            self.downward[node][u] = length
+            del self.out_links[u][node]
+            self.deleted_neighbours[u] += 1
+
+    @staticmethod
+    def climb(links, stalls, source, opposite=None):
+        """Dijkstra from source along links, all of which lead up the hierarchy.
+        A node is stalled, i.e. not expanded, if stalls (the links coming down to
+        it) show a shorter way to it from a node already reached: no shortest
+        path can climb through it then. If opposite holds the distances of the
+        search from the other end, the search stops once it cannot improve on the
+        best meeting found. Returns (distances, parents, best, meeting)."""
+        inf = float('inf')
+        distances = {source: 0}
+        parents = {source: None}
+        frontier = [(0, source)]
+        best, meeting = inf, None
+        if opposite is not None and source in opposite:
+            best, meeting = opposite[source], source
+        while frontier:
+            distance, node = heapq.heappop(frontier)
+            if distance >= best:
+                break
+            if distance > distances[node]:
+                continue
+            if any(distances.get(other, inf) + length < distance for other, length in stalls[node].items()):
+                continue
+            for other, length in links[node].items():
+                reached = distance + length
+                if reached < distances.get(other, inf):
+                    distances[other] = reached
+                    parents[other] = node
+                    heapq.heappush(frontier, (reached, other))
+                    if opposite is not None and reached + opposite.get(other, inf) < best:
+                        best, meeting = reached + opposite[other], other
+        return distances, parents, best, meeting
+
+    def search(self, source, target):
+        """Search upwards from source, then from target until the second search
+        cannot improve on where the two meet. Returns (distance, meeting, forward,
+        backward): the length of a shortest path, the highest ranked node on it
+        (None if there is no path) and the parent links of both searches."""
+        distances, forward, _, _ = self.climb(self.upward, self.downward, source)
+        _, backward, best, meeting = self.climb(self.downward, self.upward, target, distances)
+        return best, meeting, forward, backward
+
+    def query(self, source, target):
+        """Return (distance, path) of a shortest path from source to target, the
+        path being the list of nodes of the original graph along it, or
+        (inf, None) if target cannot be reached."""
+        if source not in self.rank or target not in self.rank:
+            return float('inf'), None
+        distance, meeting, forward, backward = self.search(source, target)
+        if meeting is None:
+            return float('inf'), None
+        return distance, self.path(forward, backward, meeting)
+
+    def nearest(self, source, targets):
+        """Return (distance, target, path, reached) for the nearest of targets from
+        source, or (inf, None, None, reached) if none can be reached. The search
+        upwards from source is done once for all the targets; reached is the set
+        of nodes the searches reached."""
+        inf = float('inf')
+        best = (inf, None, None, None)
+        reached = set()
+        if source in self.rank:
+            distances, forward, _, _ = self.climb(self.upward, self.downward, source)
+            reached.update(distances)
+            for target in targets:
+                if target in self.rank:
+                    found, backward, distance, meeting = self.climb(self.downward, self.upward, target, distances)
+                    reached.update(found)
+                    if distance < best[0]:
+                        best = (distance, target, meeting, backward)
+        distance, target, meeting, backward = best
+        if target is None:
+            return inf, None, None, reached
+        return distance, target, self.path(forward, backward, meeting), reached
+
+    def path(self, forward, backward, meeting):
+        """Unpack the path through meeting found by searches with parent links
+        forward and backward into the nodes of the original graph."""
+        nodes = self.route(forward, meeting)[::-1] + self.route(backward, meeting)[1:]
+        path = nodes[:1]
+        for a, b in zip(nodes, nodes[1:]):
+            path += self.unpack(a, b)[1:]
+        return path
+
+    def distance(self, source, target):
+        """The length of a shortest path from source to target, inf if there is none."""
+        if source not in self.rank or target not in self.rank:
+            return float('inf')
+        return self.search(source, target)[0]
+
+    @staticmethod
+    def route(parents, node):
+        route = []
+        while node is not None:
+            route.append(node)
+            node = parents[node]
+        return route
+
+    def unpack(self, a, b):
+        """The nodes along the link from a to b in the original graph, both included."""
+        path = [a]
+        stack = [(a, b)]
+        while stack:
+            u, w = stack.pop()
+            node = self.middle.get((u, w))
+            if node is None:
+                path.append(w)
+            else:
+                stack += [(node, w), (u, node)]
+        return path
@@ -0,0 +1,217 @@
+"""
+Full-coverage planning: one path that sweeps every reachable room of the floor.
+
+decompose     ## Splits a set of rooms into boustrophedon cells
+plan_coverage ## Sweeps the cells one after another, sucking at the dirty rooms
+
+The rooms reachable from the start, as given by ReachabilityIndex.component,
+are cut, column by column, into vertical
+segments. Segments in neighbouring columns that overlap one-to-one belong to the
+same cell; wherever a segment splits in two or two segments merge, a new cell
+starts. Each cell is covered by sweeping its columns up and down in turn
+(boustrophedon, "the way an ox ploughs"). Cells are visited depth first over
+their adjacency, so getting from one cell to the next only searches the cells in
+between, and planning takes time roughly linear in the floor area.
+
+Sweeping along columns and along rows are both planned and the cheaper path is
+kept, so with turn costs the orientation needing fewer turns wins.
+"""
+
+import collections
+
+# Moves of the vacuum agent, as in VacuumPlanning.result.
+MOVES = {(0, 1): 'UP', (0, -1): 'DOWN', (-1, 0): 'LEFT', (1, 0): 'RIGHT'}
+
+
+def decompose(rooms):
+    """Boustrophedon decomposition of a set of rooms.
+    Returns (cells, adjacent): each cell is a list of (x, y0, y1) column
+    segments in increasing x, and adjacent maps each cell index to the set of
+    indices of the cells it touches."""
+    columns = collections.defaultdict(list)
+    for x, y in rooms:
+        columns[x].append(y)
+    segments = {}
+    for x, ys in columns.items():
+        ys.sort()
+        runs = []
+        for y in ys:
+            if runs and runs[-1][1] == y - 1:
+                runs[-1][1] = y
+            else:
+                runs.append([y, y])
+        segments[x] = runs
+
+    cells = []
+    adjacent = collections.defaultdict(set)
+    cell_of = {}
+    for x in sorted(segments):
+        previous = segments.get(x - 1, [])
+        current = segments[x]
+        # Pair up overlapping segments of columns x - 1 and x in one merge-like pass.
+        overlaps = []
+        i = j = 0
+        while i < len(previous) and j < len(current):
+            if previous[i][1] >= current[j][0] and current[j][1] >= previous[i][0]:
+                overlaps.append((i, j))
+            if previous[i][1] < current[j][1]:
+                i += 1
+            else:
+                j += 1
+        right = collections.Counter(i for i, _ in overlaps)
+        links = collections.defaultdict(list)
+        for i, j in overlaps:
+            links[j].append(i)
+        for j, (y0, y1) in enumerate(current):
+            if len(links[j]) == 1 and right[links[j][0]] == 1:
+                cell = cell_of[(x - 1, links[j][0])]
+            else:
+                cell = len(cells)
+                cells.append([])
+            cells[cell].append((x, y0, y1))
+            cell_of[(x, j)] = cell
+        for i, j in overlaps:
+            a, b = cell_of[(x - 1, i)], cell_of[(x, j)]
+            if a != b:
+                adjacent[a].add(b)
+                adjacent[b].add(a)
+    return cells, adjacent
+
+
+def cell_rooms(cell):
+    return {(x, y) for x, y0, y1 in cell for y in range(y0, y1 + 1)}
+
+
+def corners(cell):
+    (x0, a0, b0), (x1, a1, b1) = cell[0], cell[-1]
+    return {(x0, a0), (x0, b0), (x1, a1), (x1, b1)}
+
+
+def walk(rooms, start, targets):
+    """Breadth-first search inside rooms from start to the nearest of targets.
+    Returns the rooms along the way, start excluded."""
+    parents = {start: None}
+    frontier = collections.deque([start])
+    while frontier:
+        room = frontier.popleft()
+        if room in targets:
+            path = []
+            while room != start:
+                path.append(room)
+                room = parents[room]
+            return path[::-1]
+        x, y = room
+        for dx, dy in MOVES:
+            child = (x + dx, y + dy)
+            if child in rooms and child not in parents:
+                parents[child] = room
+                frontier.append(child)
+    raise ValueError('{} cannot reach {}'.format(start, targets))
+
+
+def sweep(cell, position):
+    """Cover cell column by column, starting from position at one of its corners.
+    Returns the rooms along the way, position excluded."""
+    segments = cell if position[0] == cell[0][0] else cell[::-1]
+    x, y = position
+    path = []
+
+    def move_to(target_y):
+        nonlocal y
+        step = 1 if target_y > y else -1
+        while y != target_y:
+            y += step
+            path.append((x, y))
+
+    last = None
+    for column, y0, y1 in segments:
+        if last is not None:  # cross over to the next column where the two segments overlap
+            move_to(min(max(y, y0, last[0]), y1, last[1]))
+            x = column
+            path.append((x, y))
+        first, second = (y0, y1) if y - y0 <= y1 - y else (y1, y0)
+        move_to(first)
+        move_to(second)
+        last = (y0, y1)
+    return path
+
+
+def sweep_rooms(rooms, start):
+    """Visit every one of rooms from start, cell by cell. Returns the rooms
+    along the way, start included, and the number of cells."""
+    cells, adjacent = decompose(rooms)
+    cell_of = {room: index for index, cell in enumerate(cells) for room in cell_rooms(cell)}
+    current = cell_of[start]
+    path = [start]
+    path += walk(cell_rooms(cells[current]), start, corners(cells[current]))
+    path += sweep(cells[current], path[-1])
+    visited = {current}
+    chain = [current]
+    behind = []  # cells left since the last sweep, all between the agent and chain[-1]
+    while chain:
+        current = chain[-1]
+        candidates = adjacent[current] - visited
+        if not candidates:
+            behind.append(chain.pop())
+            continue
+        x, y = path[-1]
+        following = min(candidates, key=lambda cell: min(abs(x - cx) + abs(y - cy) for cx, cy in corners(cells[cell])))
+        allowed = set().union(*(cell_rooms(cells[cell]) for cell in behind + [current, following]))
+        path += walk(allowed, path[-1], corners(cells[following]))
+        path += sweep(cells[following], path[-1])
+        visited.add(following)
+        chain.append(following)
+        behind = []
+    return path, len(cells)
+
+
+def path_actions(path, dirt=()):
+    """The moves along path, a list of neighbouring rooms, with a 'Suck' on the
+    first visit to each of the dirty rooms in dirt."""
+    dirt = set(dirt)
+    actions = []
+    if path[0] in dirt:
+        actions.append('Suck')
+        dirt.discard(path[0])
+    for (x0, y0), (x1, y1) in zip(path, path[1:]):
+        actions.append(MOVES[(x1 - x0, y1 - y0)])
+        if (x1, y1) in dirt:
+            actions.append('Suck')
+            dirt.discard((x1, y1))
+    return actions
+
+
+def actions_cost(actions, turn_cost=None):
+    """(cost, turns) of actions: one per move, plus turn_cost(previous, action) if given."""
+    cost = turns = 0
+    previous = None
+    for action in actions:
+        if action == 'Suck':
+            continue
+        cost += 1
+        if previous is not None and previous != action:
+            turns += 1
+            if turn_cost is not None:
+                cost += turn_cost(previous, action)
+        previous = action
+    return cost, turns
+
+
+def plan_coverage(rooms, start, dirt=(), turn_cost=None):
+    """Plan a path from start through every one of rooms, the set of rooms
+    reachable from it, sucking at the dirty ones. turn_cost(previous, action),
+    if given, prices the turns of the agent. Returns (actions, cells): the
+    actions to take and the number of cells the floor was decomposed into."""
+    start = tuple(start)
+    best = None
+    for transpose in (False, True):
+        if transpose:
+            path, cells = sweep_rooms({(y, x) for x, y in rooms}, start[::-1])
+            path = [(x, y) for y, x in path]
+        else:
+            path, cells = sweep_rooms(rooms, start)
+        actions = path_actions(path, dirt)
+        cost = actions_cost(actions, turn_cost)
+        if best is None or cost < best[0]:
+            best = (cost, actions, cells)
+    return best[1], best[2]
@@ -0,0 +1,255 @@
+"""
+Episode traces: record what happened during a run and replay it later.
+
+TraceRecorder ## Streams (tick, agent, action, cleaned, location, performance)
+                 records into a compact binary append-only log, plus periodic
+                 keyframes
+
+TraceReplay   ## Seeks to any tick of a recorded run in O(log n) and rebuilds
+                 the world state there, without re-running the planner
+
+A trace is stored as two files:
+    <path>      header followed by fixed-size step records (see STEP_DTYPE)
+    <path>.key  keyframes: full snapshots of agents, walls and dirt, each tagged
+                with the number of step records that precede it
+
+Since step records have a fixed size and ticks never decrease, the step log can
+be memory-mapped and binary searched directly. Rebuilding the state at a tick
+then costs one bisect over the keyframes plus at most keyframe_interval steps.
+"""
+
+import bisect
+import os.path
+import struct
+
+import numpy as np
+
+from agents_and_environments import Dirt, Obstacle, Wall
+
+MAGIC = b'VTRACE02'
+
+# Actions understood by the vacuum environments. The table is written into the
+# trace header, so readers never depend on this default.
+ACTIONS = ('', 'NoOp', 'Suck', 'UP', 'DOWN', 'LEFT', 'RIGHT',
+           'Forward', 'TurnLeft', 'TurnRight', 'Grab', 'Release')
+
+STEP_FORMAT = '<qHBBiid'
+STEP_DTYPE = np.dtype([('tick', '<i8'), ('agent', '<u2'), ('action', 'u1'), ('cleaned', 'u1'),
+                       ('x', '<i4'), ('y', '<i4'), ('performance', '<f8')])
+KEYFRAME_FORMAT = '<qqIII'
+
+assert struct.calcsize(STEP_FORMAT) == STEP_DTYPE.itemsize
+
+
+class ReplayState:
+    """The world as seen by a trace at a given tick: one [location, performance]
+    pair per agent, plus the set of wall and dirt locations."""
+
+    def __init__(self, tick, agents, walls, dirt):
+        self.tick = tick
+        self.agents = agents
+        self.walls = walls
+        self.dirt = dirt
+
+    def __repr__(self):
+        return '<ReplayState tick={} agents={} dirt={}>'.format(self.tick, self.agents, len(self.dirt))
+
+    def apply(self, records):
+        """Advance the state by a sequence of step records.
+        Dirt is dropped wherever a record says the action cleaned the room."""
+        for tick, agent, action, cleaned, x, y, performance in records:
+            self.tick = tick
+            self.agents[agent] = [(x, y), performance]
+            if cleaned:
+                self.dirt.discard((x, y))
+
+
+class TraceRecorder:
+    """Append-only recorder for a run of an Environment.
+    Attach it with env.recorder = TraceRecorder(path, env); the environment
+    then calls record() after every executed action. A keyframe of the whole
+    world is written when the recorder is created and then every
+    keyframe_interval steps."""
+
+    def __init__(self, path, env, keyframe_interval=4096, actions=ACTIONS):
+        self.path = path
+        self.env = env
+        self.keyframe_interval = keyframe_interval
+        self.actions = tuple(actions)
+        self.codes = {action: code for code, action in enumerate(self.actions)}
+        self.step_count = 0
+        self.last_tick = -1
+        self.performance = [agent.performance for agent in env.agents]  # as of each agent's last record
+        self.steps_file = open(path, 'wb')
+        self.key_file = open(path + '.key', 'wb')
+        self.steps_file.write(self.header())
+        self.keyframe()
+
+    def header(self):
+        names = [action.encode() for action in self.actions]
+        return (MAGIC + struct.pack('<H', len(names)) +
+                b''.join(struct.pack('<B', len(name)) + name for name in names))
+
+    def record(self, tick, agent, action, location, performance, cleaned=None):
+        """Append one step record: agent (an index into env.agents) executed
+        action at tick, ending up at location with the given performance.
+        cleaned tells whether the action removed dirt. Environments that do not
+        say are taken to have cleaned on a 'Suck' that raised the agent's
+        performance, as a 'Suck' on a clean room scores nothing in the vacuum
+        environments."""
+        if action is None:
+            action = ''
+        try:
+            code = self.codes[action]
+        except KeyError:
+            raise ValueError('Action {!r} is not in the trace action table'.format(action))
+        while agent >= len(self.performance):
+            self.performance.append(0)
+        if cleaned is None:
+            cleaned = action == 'Suck' and performance > self.performance[agent]
+        self.performance[agent] = performance
+        x, y = location
+        self.steps_file.write(struct.pack(STEP_FORMAT, tick, agent, code, bool(cleaned), x, y, performance))
+        self.step_count += 1
+        self.last_tick = tick
+        if self.step_count % self.keyframe_interval == 0:
+            self.keyframe()
+
+    def keyframe(self):
+        """Write a full snapshot of the environment, valid after the steps
+        recorded so far, and flush both files so readers can seek to it."""
+        agents = self.env.agents
+        walls = [t.location for t in self.env.things if isinstance(t, Obstacle)]
+        dirt = [t.location for t in self.env.things if isinstance(t, Dirt)]
+        data = [struct.pack(KEYFRAME_FORMAT, self.last_tick, self.step_count,
+                            len(agents), len(walls), len(dirt))]
+        for agent in agents:
+            x, y = agent.location
+            data.append(struct.pack('<iid', x, y, agent.performance))
+        for locations in (walls, dirt):
+            data.append(struct.pack('<{}i'.format(2 * len(locations)),
+                                    *(c for location in locations for c in location)))
+        self.key_file.write(b''.join(data))
+        self.flush()
+
+    def flush(self):
+        self.steps_file.flush()
+        self.key_file.flush()
+
+    def close(self):
+        if not self.steps_file.closed:
+            self.flush()
+            self.steps_file.close()
+            self.key_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.close()
+
+
+class TraceReplay:
+    """Read-only view of a trace written by TraceRecorder.
+
+    replay.state_at(tick) rebuilds the world after every step up to and
+    including tick. replay.steps() exposes the step records as a NumPy
+    structured array backed by the file, so a whole run can be re-scored
+    with vectorized operations instead of being simulated again."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError('{} is not an episode trace'.format(path))
+            (count,) = struct.unpack('<H', f.read(2))
+            actions = []
+            for _ in range(count):
+                (length,) = struct.unpack('<B', f.read(1))
+                actions.append(f.read(length).decode())
+            offset = f.tell()
+        self.actions = tuple(actions)
+        size = (os.path.getsize(path) - offset) // STEP_DTYPE.itemsize
+        if size:
+            self.records = np.memmap(path, dtype=STEP_DTYPE, mode='r', offset=offset, shape=(size,))
+        else:
+            self.records = np.zeros(0, dtype=STEP_DTYPE)
+        self.read_keyframe_index()
+
+    def read_keyframe_index(self):
+        """Hop over the keyframe headers, remembering where each one starts."""
+        self.key_steps, self.key_offsets = [], []
+        header_size = struct.calcsize(KEYFRAME_FORMAT)
+        size = os.path.getsize(self.path + '.key')
+        with open(self.path + '.key', 'rb') as f:
+            offset = 0
+            while offset + header_size <= size:
+                f.seek(offset)
+                tick, steps, n_agents, n_walls, n_dirt = struct.unpack(KEYFRAME_FORMAT, f.read(header_size))
+                end = offset + header_size + n_agents * struct.calcsize('<iid') + (n_walls + n_dirt) * 8
+                if end > size:  # a keyframe still being written
+                    break
+                self.key_steps.append(steps)
+                self.key_offsets.append(offset)
+                offset = end
+
+    def __len__(self):
+        """Number of step records in the trace."""
+        return len(self.records)
+
+    def keyframe(self, k):
+        """Return the state stored in the k-th keyframe."""
+        header_size = struct.calcsize(KEYFRAME_FORMAT)
+        with open(self.path + '.key', 'rb') as f:
+            f.seek(self.key_offsets[k])
+            tick, steps, n_agents, n_walls, n_dirt = struct.unpack(KEYFRAME_FORMAT, f.read(header_size))
+            agents = [[(x, y), p] for x, y, p in struct.iter_unpack('<iid', f.read(n_agents * 16))]
+            walls = list(struct.iter_unpack('<ii', f.read(n_walls * 8)))
+            dirt = list(struct.iter_unpack('<ii', f.read(n_dirt * 8)))
+        return ReplayState(tick, agents, set(walls), set(dirt))
+
+    def state_at(self, tick):
+        """Rebuild the world after all steps recorded at or before tick."""
+        n = int(np.searchsorted(self.records['tick'], tick, side='right'))
+        k = bisect.bisect_right(self.key_steps, n) - 1
+        state = self.keyframe(k)
+        state.apply(self.records[self.key_steps[k]:n].tolist())
+        return state
+
+    def steps(self, start_tick=None, stop_tick=None):
+        """Return the step records with start_tick <= tick < stop_tick."""
+        ticks = self.records['tick']
+        start = 0 if start_tick is None else int(np.searchsorted(ticks, start_tick, side='left'))
+        stop = len(ticks) if stop_tick is None else int(np.searchsorted(ticks, stop_tick, side='left'))
+        return self.records[start:stop]
+
+    def action_codes(self, *names):
+        return [self.actions.index(name) for name in names]
+
+    def rescore(self, rewards, agent=None):
+        """Score the run again under a different reward table, e.g.
+        {'Suck': 100, 'UP': -1, ...}; actions missing from rewards score 0.
+        A 'Suck' only earns its reward where it removed dirt, as it did live.
+        Returns the cumulative score after each step as an array."""
+        table = np.zeros(len(self.actions))
+        for action, reward in rewards.items():
+            table[self.actions.index(action)] = reward
+        records = self.records if agent is None else self.records[self.records['agent'] == agent]
+        scores = table[records['action']]
+        if 'Suck' in self.actions:
+            scores[(records['action'] == self.actions.index('Suck')) & (records['cleaned'] == 0)] = 0
+        return np.cumsum(scores)
+
+    def restore(self, env, tick):
+        """Put the walls, dirt and agents of env back where they were at tick."""
+        state = self.state_at(tick)
+        for thing in [t for t in env.things if isinstance(t, (Dirt, Obstacle))]:
+            env.delete_thing(thing)
+        for location in state.walls:
+            env.add_thing(Wall(), location)
+        for location in state.dirt:
+            env.add_thing(Dirt(), location)
+        for agent, (location, performance) in zip(env.agents, state.agents):
+            agent.location = location
+            agent.performance = performance
+        return state
@@ -0,0 +1,133 @@
+"""
+Discrete-event simulation of an environment.
+
+EventSimulation ## Advances an Environment from one event to the next instead
+                   of tick by tick
+DirtArrivals    ## Poisson process of dirt arriving in the rooms of a grid,
+                   drawn from a map of arrival rates
+
+Events wait in a queue ordered by time. An agent's decision is an event: when
+it comes up the agent acts, and its next decision is scheduled for when that
+action is over. An agent with nothing to do sleeps until something happens in
+the world, here the arrival of dirt, so time in which nothing happens costs
+nothing to simulate.
+
+Each room gets dirty as an independent Poisson process with its own rate. Their
+superposition is simulated as a single process with the total rate, each
+arrival landing in a room picked in proportion to the rates. Dirt arriving on a
+wall or on a room that is already dirty is dropped.
+"""
+
+import heapq
+import itertools
+
+from agents_and_environments import Dirt, Obstacle
+from utilities import np
+
+
+def rate_map(width, height, rate=0.0, regions=()):
+    """A width x height array of dirt arrival rates, per room and unit of time:
+    rate everywhere, except in regions, given as ((x0, y0, x1, y1), rate) pairs
+    covering x0 <= x < x1 and y0 <= y < y1."""
+    rates = np.full((width, height), float(rate))
+    for (x0, y0, x1, y1), region_rate in regions:
+        rates[x0:x1, y0:y1] = region_rate
+    return rates
+
+
+class DirtArrivals:
+    """Arrival times and rooms of dirt for a map of rates indexed [x, y]."""
+
+    def __init__(self, rates, random):
+        self.rates = np.asarray(rates, dtype=float)
+        self.cumulative = np.cumsum(self.rates.ravel())
+        self.total = float(self.cumulative[-1]) if self.cumulative.size else 0.0
+        self.random = random
+
+    def next_arrival(self, now):
+        """Return (time, location) of the first arrival after now, or None if
+        no room ever gets dirty."""
+        if self.total <= 0:
+            return None
+        time = now + self.random.exponential(1 / self.total)
+        index = int(np.searchsorted(self.cumulative, self.random.random() * self.total, side='right'))
+        x, y = divmod(min(index, self.cumulative.size - 1), self.rates.shape[1])
+        return time, (x, y)
+
+
+class EventSimulation:
+    """Runs env as a sequence of timed events.
+    decide(agent) makes one decision for agent and returns the action taken, or
+    None if the agent has nothing to do; by default the agent program is run on
+    its percept. Each action takes durations.get(action, 1) units of time.
+    dirt_rates, if given, is a map of arrival rates as made by rate_map()."""
+
+    def __init__(self, env, dirt_rates=None, seed=None, durations=None, decide=None):
+        self.env = env
+        self.now = 0.0
+        self.queue = []
+        self.counter = itertools.count()
+        self.random = np.random.default_rng(seed)
+        self.durations = durations or {}
+        self.decide = decide or self.run_program
+        self.idle = []
+        self.events = self.decisions = self.arrivals_added = 0
+        self.arrivals = None if dirt_rates is None else DirtArrivals(dirt_rates, self.random)
+        for agent in env.agents:
+            self.schedule(0.0, self.agent_decides, agent)
+        self.schedule_arrival()
+
+    def schedule(self, time, handler, *args):
+        """Call handler(*args) when the simulation reaches time."""
+        heapq.heappush(self.queue, (time, next(self.counter), handler, args))
+
+    def run_program(self, agent):
+        action = agent.program(self.env.percept(agent))
+        if action is None or action == 'NoOp':
+            return None
+        self.env.execute_action(agent, action)
+        self.env.record_action(agent, action, self.env.tick)
+        return action
+
+    def agent_decides(self, agent):
+        if not agent.alive:
+            return
+        action = self.decide(agent)
+        self.decisions += 1
+        if action is None:
+            self.idle.append(agent)
+        else:
+            self.schedule(self.now + self.durations.get(action, 1), self.agent_decides, agent)
+
+    def wake(self):
+        """Let the sleeping agents decide again, now that something has happened."""
+        for agent in self.idle:
+            self.schedule(self.now, self.agent_decides, agent)
+        self.idle = []
+
+    def schedule_arrival(self):
+        if self.arrivals is not None:
+            arrival = self.arrivals.next_arrival(self.now)
+            if arrival is not None:
+                self.schedule(arrival[0], self.dirt_arrives, arrival[1])
+
+    def dirt_arrives(self, location):
+        if not self.env.list_things_at(location, (Obstacle, Dirt)):
+            self.env.add_thing(Dirt(), location)
+            self.arrivals_added += 1
+            self.wake()
+        self.schedule_arrival()
+
+    def run(self, until):
+        """Process every event up to time until. Returns the number of events processed."""
+        events = self.events
+        while self.queue and self.queue[0][0] <= until:
+            time, _, handler, args = heapq.heappop(self.queue)
+            self.now = time
+            self.env.tick = int(time)
+            with self.env.changes():
+                handler(*args)
+            self.events += 1
+        self.now = max(self.now, until)
+        self.env.tick = int(self.now)
+        return self.events - events
@@ -0,0 +1,135 @@
+"""
+Exploration under partial observability.
+
+OccupancyMap ## What an agent has seen so far of a grid world: walls, free rooms,
+                dirt, and the frontier between the known and the unknown
+
+The map starts out unknown and is filled in from percepts: the walls and dirt at
+each room within perceptible_distance of the agent, looked up one room at a time
+(e.g. with XYEnvironment.map_things_at) so nothing outside the view is scanned.
+With line_of_sight, rooms hidden behind a wall along the Bresenham line from the
+agent stay unknown. Each observation only touches the rooms in view, and the
+frontier (known free rooms next to unknown ones) is updated around the rooms
+whose state changed, so the cost of an update is bounded by the area in view.
+
+plan() looks for the nearest known dirt or frontier room by breadth-first search
+over the known free rooms, stopping at the first one found.
+"""
+
+import collections
+
+from agents_and_environments import Dirt, Obstacle
+from coverage_planning import MOVES, path_actions
+
+UNKNOWN, FREE, WALL = 0, 1, 2
+
+
+def line_cells(a, b):
+    """The cells on the Bresenham line from a to b, both included."""
+    (x0, y0), (x1, y1) = a, b
+    dx, dy = abs(x1 - x0), -abs(y1 - y0)
+    sx, sy = (1 if x1 > x0 else -1), (1 if y1 > y0 else -1)
+    error = dx + dy
+    cells = [(x0, y0)]
+    while (x0, y0) != (x1, y1):
+        doubled = 2 * error
+        if doubled >= dy:
+            error += dy
+            x0 += sx
+        if doubled <= dx:
+            error += dx
+            y0 += sy
+        cells.append((x0, y0))
+    return cells
+
+
+class OccupancyMap:
+    """The part of a width x height grid an agent has observed."""
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.cells = bytearray(width * height)  # UNKNOWN, FREE or WALL, indexed by y * width + x
+        self.dirt = set()
+        self.frontier = set()
+
+    def state(self, cell):
+        x, y = cell
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return self.cells[y * self.width + x]
+        return WALL
+
+    def neighbours(self, cell):
+        x, y = cell
+        return [(x + dx, y + dy) for dx, dy in MOVES]
+
+    def in_radius(self, center, radius):
+        """The rooms within radius of center, as in XYEnvironment.things_near."""
+        cx, cy = center
+        r = int(radius)
+        return [(x, y) for x in range(max(cx - r, 0), min(cx + r, self.width - 1) + 1)
+                for y in range(max(cy - r, 0), min(cy + r, self.height - 1) + 1)
+                if (x - cx) ** 2 + (y - cy) ** 2 <= radius * radius]
+
+    def observe(self, center, things_at, radius, line_of_sight=False):
+        """Record what is seen from center: things_at(room) returns the things at
+        a room, as XYEnvironment.map_things_at does. Returns the rooms whose state
+        changed from unknown, or between free and wall."""
+        center = tuple(center)
+        cells = self.in_radius(center, radius)
+        walls, dirt = set(), set()
+        for cell in cells:
+            for thing in things_at(cell):
+                if isinstance(thing, Obstacle):
+                    walls.add(cell)
+                elif isinstance(thing, Dirt):
+                    dirt.add(cell)
+        if line_of_sight:  # leave out the rooms hidden behind walls
+            cells = [cell for cell in cells if not any(room in walls for room in line_cells(center, cell)[1:-1])]
+        changed = []
+        for cell in cells:
+            state = WALL if cell in walls else FREE
+            index = cell[1] * self.width + cell[0]
+            if self.cells[index] != state:
+                self.cells[index] = state
+                changed.append(cell)
+            if cell in dirt:
+                self.dirt.add(cell)
+            else:
+                self.dirt.discard(cell)
+        for cell in changed:
+            for room in [cell] + self.neighbours(cell):
+                self.update_frontier(room)
+        return changed
+
+    def update_frontier(self, cell):
+        if self.state(cell) == FREE and any(self.state(n) == UNKNOWN for n in self.neighbours(cell)):
+            self.frontier.add(cell)
+        else:
+            self.frontier.discard(cell)
+
+    def is_goal(self, cell):
+        return cell in self.dirt or cell in self.frontier
+
+    def plan(self, start):
+        """Breadth-first search over known free rooms from start to the nearest
+        dirt or frontier room. Returns (actions, route, searched): the moves, the
+        rooms they lead through, and the set of rooms searched; actions and
+        route are None if there is nowhere left to go."""
+        start = tuple(start)
+        parents = {start: None}
+        frontier = collections.deque([start])
+        while frontier:
+            cell = frontier.popleft()
+            if cell != start and self.is_goal(cell):
+                route = []
+                while cell != start:
+                    route.append(cell)
+                    cell = parents[cell]
+                route.reverse()
+                return path_actions([start] + route), route, set(parents)
+            for child in self.neighbours(cell):
+                if child not in parents and self.state(child) == FREE:
+                    parents[child] = cell
+                    frontier.append(child)
+        return None, None, set(parents)
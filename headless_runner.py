@@ -0,0 +1,337 @@
+"""
+Run the vacuum simulator without a GUI, e.g. for batch sweeps on worker processes.
+
+    python headless_runner.py --width 40 --height 30 --search A* --episodes 10 --seed 1
+    python headless_runner.py --check-import-budget
+    python headless_runner.py --layout rooms --corridor-width 2 --dirt-count 50 --seed 1
+    python headless_runner.py --dirt-rate 0.0001 --horizon 604800 --seed 1
+    python headless_runner.py --benchmark-wavefront --width 300 --height 300
+    python headless_runner.py --width 200 --height 200 --search BFS --profile /tmp/vacuum
+
+HeadlessVacuumEnvironment mirrors what Gui does for the planner (walls and dirt
+from scenario_generator, a single XYSearchAgent, the same step() logic), but keeps everything in
+memory instead of in Tk buttons. Only the engine modules are imported, so
+workers start without tkinter, IPython or NumPy.
+
+The floor plan is drawn from --seed by scenario_generator.generate, which
+--layout, --wall-density, --dirt-count, --dirt-density, --room-size and
+--corridor-width are passed on to.
+
+With --dirt-rate, dirt keeps arriving at random while the agent cleans, and the
+run is driven by event_simulation over --horizon units of time (one per action).
+
+With --profile PREFIX, every step and every plan is profiled as a phase of
+session_profiler, and the statistics are written to PREFIX.* at the end. With
+--trace FILE, the same calls are recorded on a timeline by span_trace and written
+to FILE as a Chrome trace. With --record FILE, every action is written to FILE as
+an episode_trace, which TraceReplay can seek through and rescore.
+"""
+
+import subprocess
+import sys
+
+from scenario_generator import LAYOUTS, generate
+from vacuum_planning import *
+
+# Start-up budget for a worker process importing the engine, in milliseconds.
+IMPORT_BUDGET_MS = 50
+
+# Modules that must not be loaded by importing the engine.
+HEAVY_MODULES = ('tkinter', 'IPython', 'ipythonblocks', 'numpy')
+
+
+class HeadlessVacuumEnvironment(VacuumEnvironment):
+    """A vacuum world with the same set-up and stepping rules as the GUI."""
+
+    perceptible_distance = 3  # how far the agent sees in Explore mode, as in Gui
+
+    def __init__(self, width=20, height=18, seed=None, dirt_count=5, layout='random', wall_density=None,
+                 dirt_density=None, room_size=8, corridor_width=0):
+        self.turnCostOn = False
+        self.searchAgent = None
+        self.solution = []
+        self.path = []
+        self.explored = set()
+        self.stepCount = 0
+        self.done = False
+        self.dirtCount = dirt_count
+        self.dirtyRooms = set()
+        self.scenario = dict(seed=seed, layout=layout, wall_density=wall_density, dirt_count=dirt_count,
+                             dirt_density=dirt_density, room_size=room_size, corridor_width=corridor_width)
+        super().__init__(width, height)
+        self.agent = XYSearchAgent(program=XYSearchAgentProgram, loc=(width // 2, height // 2))
+        self.add_thing(self.agent, self.agent.location)
+        self.setupTestEnvironment()
+
+    def setupTestEnvironment(self):
+        """Place the interior walls and dirty rooms of a scenario_generator scenario, as Gui does."""
+        scenario = generate(self.width, self.height, start=self.agent.location, **self.scenario)
+        for location in scenario.wall_cells():
+            self.add_thing(Wall(), location, exclude_duplicate_class_items=True)
+        self.dirtyRooms = set()
+        for location in scenario.dirt_cells():
+            self.add_thing(Dirt(), location)
+        self.dirtCount = len(self.dirtyRooms)
+
+    def add_thing(self, thing, location=None, exclude_duplicate_class_items=False):
+        added = super().add_thing(thing, location, exclude_duplicate_class_items)
+        if added and isinstance(thing, Dirt):
+            self.dirtyRooms.add(tuple(thing.location))
+        return added
+
+    def read_env(self):
+        """Things live in the environment itself, so only the dirt count needs refreshing."""
+        self.dirtCount = len(self.dirtyRooms)
+
+    def setSearchEngine(self, choice):
+        self.searchAgent = VacuumPlanning(self, choice)
+        self.searchAgent.generateSolution()
+        self.done = False
+
+    def set_solution(self, path):
+        self.solution = list(reversed(path.solution()))
+        self.path = [node.state for node in path.path()[1:-1]]
+
+    def display_explored(self, explored):
+        self.explored = explored
+
+    def execute_action(self, agent, action):
+        dirt_list = []
+        if action == 'Suck':
+            dirt_list = self.list_things_at(agent.location, Dirt)
+            if dirt_list:
+                agent.performance += 10
+                self.delete_thing(dirt_list[0])
+                self.dirtyRooms.discard(tuple(agent.location))
+        else:  # Move action
+            agent.direction = action
+            origin = agent.location
+            agent.location = self.searchAgent.result(agent.location, action)
+            self.thing_changed('move', agent, origin, agent.location)
+        self.record_action(agent, action, self.stepCount, bool(dirt_list))
+
+    def update_env(self):
+        self.tick = self.stepCount
+        with self.changes():
+            self.read_env()
+            self.step()
+        self.stepCount += 1
+
+    def step(self):
+        """Suck when the current plan is used up and plan again, otherwise take the next move.
+        Returns the action taken."""
+        if self.dirtCount == 0:
+            self.done = True
+            return None
+
+        if self.searchAgent is not None:
+            self.searchAgent.perceive()
+
+        if len(self.solution) == 0:
+            self.execute_action(self.agent, 'Suck')
+            self.read_env()
+            if self.dirtCount > 0 and self.searchAgent is not None:
+                self.searchAgent.generateNextSolution()
+                if len(self.solution) == 0 and not self.searchAgent.searching():  # the remaining dirt cannot be reached
+                    self.done = True
+            return 'Suck'
+        action = self.solution.pop()
+        self.execute_action(self.agent, action)
+        return action
+
+    def decide(self, agent):
+        """One decision of the agent for event_simulation.EventSimulation: the
+        action taken, or None if there is nothing it can clean until more dirt arrives."""
+        self.read_env()
+        if self.dirtCount == 0 or self.searchAgent is None:
+            return None
+        if len(self.solution) == 0 and tuple(agent.location) not in self.dirtyRooms:
+            self.searchAgent.generateNextSolution()  # dirt arrived while the agent was idle
+            if len(self.solution) == 0:
+                return None
+        action = self.step()
+        self.stepCount += 1
+        return action
+
+    def run(self, steps=100000):
+        for _ in range(steps):
+            if self.done:
+                return
+            self.update_env()
+
+
+def start_recording(env, path):
+    """Attach an episode_trace.TraceRecorder writing to path to env, if path is given."""
+    if path:
+        from episode_trace import TraceRecorder
+
+        env.recorder = TraceRecorder(path, env)
+
+
+def stop_recording(env):
+    if env.recorder is not None:
+        env.recorder.close()
+
+
+def run_episode(width=20, height=18, searchType='A*', seed=None, max_steps=100000, record=None, **scenario):
+    """Simulate one episode and return a dict of summary statistics. If record
+    is given, the episode is recorded there by episode_trace. scenario holds the
+    keyword arguments of HeadlessVacuumEnvironment, e.g. layout."""
+    env = HeadlessVacuumEnvironment(width, height, seed, **scenario)
+    start_recording(env, record)
+    env.setSearchEngine(searchType)
+    env.run(max_steps)
+    stop_recording(env)
+    return {'steps': env.stepCount, 'performance': env.agent.performance,
+            'dirt_left': len(env.dirtyRooms), 'search': searchType, 'seed': seed}
+
+
+def run_continuous(width=20, height=18, searchType='A*', seed=None, dirt_rate=0.0001, horizon=604800,
+                   record=None, **scenario):
+    """Simulate horizon units of time in which every room gets dirty at dirt_rate
+    per unit of time, and return a dict of summary statistics."""
+    from event_simulation import EventSimulation, rate_map
+
+    env = HeadlessVacuumEnvironment(width, height, seed, **scenario)
+    start_recording(env, record)
+    env.setSearchEngine(searchType)
+    simulation = EventSimulation(env, rate_map(width, height, dirt_rate), seed, decide=env.decide)
+    simulation.run(horizon)
+    stop_recording(env)
+    return {'time': horizon, 'events': simulation.events, 'steps': env.stepCount,
+            'dirt_arrived': simulation.arrivals_added, 'performance': env.agent.performance,
+            'dirt_left': len(env.dirtyRooms), 'search': searchType, 'seed': seed}
+
+
+def measure_import_time(module='vacuum_planning', repeat=3):
+    """Import module in fresh interpreters and return (best time in ms, heavy modules loaded)."""
+    code = ('import sys, time, types; t = time.perf_counter(); import {}; '
+            'ms = (time.perf_counter() - t) * 1000; '
+            'print(ms); print(*[m for m in {!r} if type(sys.modules.get(m)) is types.ModuleType])'
+            ).format(module, HEAVY_MODULES)
+    best, loaded = float('inf'), []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+        ms, heavy = out.split('\n')[:2]
+        best, loaded = min(best, float(ms)), heavy.split()
+    return best, loaded
+
+
+def check_import_budget(modules=('vacuum_planning', 'headless_runner'), budget_ms=IMPORT_BUDGET_MS):
+    """Print the import time of each module against the budget; return True if all fit
+    and none of them pulled in a GUI, notebook or NumPy dependency."""
+    ok = True
+    for module in modules:
+        ms, loaded = measure_import_time(module)
+        fits = ms <= budget_ms and not loaded
+        ok = ok and fits
+        print('{:<20} {:7.1f} ms (budget {} ms){}{}'.format(
+            module, ms, budget_ms, ', loaded ' + ', '.join(loaded) if loaded else '', '' if fits else '  OVER'))
+    return ok
+
+
+def benchmark_wavefront(width, height, repeat=3):
+    """Time BFS and the Wavefront search type from one corner of an open floor,
+    walled only around its edge, to dirt in the opposite corner. Prints the best
+    time of each and returns the speed-up of Wavefront over BFS."""
+    import time
+
+    walls = frozenset((x, y) for x in range(width) for y in range(height)
+                      if x in (0, width - 1) or y in (0, height - 1))
+    snapshot = XYSnapshot(width, height, walls, frozenset([(width - 2, height - 2)]), ((1, 1),), None, 0, 0)
+    times = {}
+    for searchType in ('BFS', 'Wavefront'):
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            path, explored = plan_snapshot(snapshot, searchType)
+            best = min(best, time.perf_counter() - start)
+        times[searchType] = best
+        print('{:<10} {:9.1f} ms  path cost {}, {} rooms explored'.format(
+            searchType, best * 1000, path.path_cost, len(explored)))
+    speedup = times['BFS'] / times['Wavefront']
+    print('Wavefront is {:.0f}x faster than BFS on a {} x {} open floor'.format(speedup, width, height))
+    return speedup
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--width', type=int, default=20)
+    parser.add_argument('--height', type=int, default=18)
+    parser.add_argument('--search', default='A*', choices=searchTypes[1:])
+    parser.add_argument('--episodes', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--max-steps', type=int, default=100000)
+    parser.add_argument('--layout', default='random', choices=LAYOUTS,
+                        help='walls scattered at random, or rooms joined by doors (default: random)')
+    parser.add_argument('--wall-density', type=float, metavar='P',
+                        help='share of the rooms that are walls (default: drawn between 1/7 and 1/3 with '
+                             'the random layout, none inside the rooms of the rooms layout)')
+    parser.add_argument('--dirt-count', type=int, default=5, help='number of dirty rooms (default: 5)')
+    parser.add_argument('--dirt-density', type=float, metavar='P',
+                        help='share of the free rooms that are dirty, instead of --dirt-count')
+    parser.add_argument('--room-size', type=int, default=8,
+                        help='distance between the wall lines of the rooms layout (default: 8)')
+    parser.add_argument('--corridor-width', type=int, default=0,
+                        help='width of the corridors between the rooms of the rooms layout (default: 0, none)')
+    parser.add_argument('--plan-cache', metavar='FILE',
+                        help='keep planned paths in FILE, shared by later runs')
+    parser.add_argument('--dirt-rate', type=float, metavar='RATE',
+                        help='keep dirt arriving at RATE per room and unit of time, simulated by events')
+    parser.add_argument('--horizon', type=float, default=604800,
+                        help='units of time to simulate with --dirt-rate (default: a week of seconds)')
+    parser.add_argument('--check-import-budget', action='store_true',
+                        help='measure the start-up cost of the engine modules and exit')
+    parser.add_argument('--profile', metavar='PREFIX',
+                        help='profile the steps and plans of the session, writing PREFIX.<phase>.pstats and '
+                             'PREFIX.collapsed on exit')
+    parser.add_argument('--sample-ms', type=float, default=5,
+                        help='interval of the stack sampling done with --profile, 0 for none (default: 5)')
+    parser.add_argument('--trace', metavar='FILE',
+                        help='record when steps, actions and plans run and write them to FILE as a Chrome trace')
+    parser.add_argument('--trace-capacity', type=int, default=1 << 16,
+                        help='number of most recent spans kept by --trace (default: 65536)')
+    parser.add_argument('--record', metavar='FILE',
+                        help='record every action of the episode to FILE (FILE.<episode> with several '
+                             'episodes) as an episode trace, to replay with episode_trace.TraceReplay')
+    parser.add_argument('--benchmark-wavefront', action='store_true',
+                        help='time BFS against the Wavefront search on an open --width x --height floor and exit')
+    args = parser.parse_args()
+
+    if args.check_import_budget:
+        sys.exit(0 if check_import_budget() else 1)
+    if args.benchmark_wavefront:
+        benchmark_wavefront(args.width, args.height)
+        sys.exit(0)
+
+    if args.trace:
+        from span_trace import trace_session
+
+        trace_session(args.trace, args.trace_capacity, [(HeadlessVacuumEnvironment, 'update_env'),
+                                                        (HeadlessVacuumEnvironment, 'step'),
+                                                        (HeadlessVacuumEnvironment, 'execute_action'),
+                                                        (HeadlessVacuumEnvironment, 'read_env'),
+                                                        (HeadlessVacuumEnvironment, 'display_explored'),
+                                                        (VacuumPlanning, 'generateSolution')])
+    if args.profile:
+        from session_profiler import profile_session
+
+        profile_session(args.profile, args.sample_ms, [(HeadlessVacuumEnvironment, 'update_env'),
+                                                       (HeadlessVacuumEnvironment, 'decide'),
+                                                       (VacuumPlanning, 'generateSolution')])
+    if args.plan_cache:
+        planCache.open(args.plan_cache)
+    scenario = dict(layout=args.layout, wall_density=args.wall_density, dirt_count=args.dirt_count,
+                    dirt_density=args.dirt_density, room_size=args.room_size, corridor_width=args.corridor_width)
+    for episode in range(args.episodes):
+        seed = None if args.seed is None else args.seed + episode
+        record = args.record and (args.record if args.episodes == 1 else '{}.{}'.format(args.record, episode))
+        if args.dirt_rate is not None:
+            print(run_continuous(args.width, args.height, args.search, seed, args.dirt_rate, args.horizon,
+                                 record, **scenario))
+        else:
+            print(run_episode(args.width, args.height, args.search, seed, args.max_steps, record, **scenario))
+    print('plan cache:', planCache.stats())
+    planCache.close()
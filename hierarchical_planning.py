@@ -0,0 +1,235 @@
+"""
+Hierarchical path-finding (HPA*) for large vacuum worlds.
+
+HierarchicalMap ## Splits the grid into square clusters joined by entrances and
+                   answers path queries on that small abstract graph
+
+Where two neighbouring clusters share a run of free cells along their border,
+the run becomes an entrance: a pair of abstract nodes, one on each side, joined
+by a single step (short runs get one entrance in the middle, long runs one at
+each end). Inside every cluster the distances between its entrance nodes are
+precomputed by BFS. A query runs A* over the abstract graph, plus the start and
+the goals wired into their own clusters, and only the segments of the route it
+picks are refined into cell-by-cell moves.
+
+A changed cell only rebuilds the entrances on the borders it lies on and the
+distances inside the clusters touching them, so a map can be kept in sync with
+an environment whose walls are edited while the simulation runs.
+"""
+
+import collections
+import heapq
+import itertools
+
+from coverage_planning import MOVES, path_actions
+
+# Runs of free border cells at least this long get an entrance at each end.
+LONG_ENTRANCE = 6
+
+
+class HierarchicalMap:
+    """The cluster abstraction of a width x height grid with the given walls.
+    Cells outside the grid count as walls. Paths found are near-optimal in the
+    number of moves: a route is only as good as the entrances it goes through."""
+
+    def __init__(self, width, height, walls, cluster_size=10):
+        self.width = width
+        self.height = height
+        self.cluster_size = cluster_size
+        self.walls = set(walls)
+        self.synced = walls  # the wall set last synced from, so an unchanged snapshot costs nothing
+        self.borders = {}  # (cluster, cluster) -> [(cell, cell)], the entrances between them
+        self.inter = collections.defaultdict(set)  # cell -> cells across a border, one step away
+        self.nodes = {}  # cluster -> set of its entrance cells
+        self.intra = {}  # cluster -> {cell: {cell: distance}} between its entrance cells
+        self.searches = {}  # cluster -> {source: (distances, parents)}, BFS results kept for refinement
+        self.columns = -(-width // cluster_size)
+        self.rows = -(-height // cluster_size)
+        clusters = list(itertools.product(range(self.columns), range(self.rows)))
+        for cluster in clusters:
+            for neighbour in self.upper_neighbours(cluster):
+                self.build_border(cluster, neighbour)
+        for cluster in clusters:
+            self.build_cluster(cluster)
+
+    def cluster_of(self, cell):
+        return (cell[0] // self.cluster_size, cell[1] // self.cluster_size)
+
+    def bounds(self, cluster):
+        """Return (x0, y0, x1, y1), the half-open range of cells in cluster."""
+        x0, y0 = cluster[0] * self.cluster_size, cluster[1] * self.cluster_size
+        return x0, y0, min(x0 + self.cluster_size, self.width), min(y0 + self.cluster_size, self.height)
+
+    def is_free(self, cell):
+        return 0 <= cell[0] < self.width and 0 <= cell[1] < self.height and cell not in self.walls
+
+    def upper_neighbours(self, cluster):
+        """The clusters to the right of and above cluster, each border being stored once."""
+        cx, cy = cluster
+        return [c for c in ((cx + 1, cy), (cx, cy + 1)) if c[0] < self.columns and c[1] < self.rows]
+
+    def neighbours(self, cluster):
+        cx, cy = cluster
+        return [c for c in ((cx - 1, cy), (cx, cy - 1)) if c[0] >= 0 and c[1] >= 0] + self.upper_neighbours(cluster)
+
+    def build_border(self, lower, upper):
+        """Find the entrances between lower and the cluster upper, to its right or above it."""
+        for a, b in self.borders.get((lower, upper), ()):
+            self.inter[a].discard(b)
+            self.inter[b].discard(a)
+        x0, y0, x1, y1 = self.bounds(lower)
+        if upper[0] > lower[0]:
+            pairs = [((x1 - 1, y), (x1, y)) for y in range(y0, y1)]
+        else:
+            pairs = [((x, y1 - 1), (x, y1)) for x in range(x0, x1)]
+        entrances = []
+        run = []
+        for a, b in pairs + [(None, None)]:
+            if a is not None and self.is_free(a) and self.is_free(b):
+                run.append((a, b))
+                continue
+            if len(run) >= LONG_ENTRANCE:
+                entrances += [run[0], run[-1]]
+            elif run:
+                entrances.append(run[len(run) // 2])
+            run = []
+        for a, b in entrances:
+            self.inter[a].add(b)
+            self.inter[b].add(a)
+        self.borders[(lower, upper)] = entrances
+
+    def build_cluster(self, cluster):
+        """Collect the entrance cells of cluster and the distances between them."""
+        nodes = set()
+        for neighbour in self.neighbours(cluster):
+            key = (cluster, neighbour) if neighbour in self.upper_neighbours(cluster) else (neighbour, cluster)
+            for pair in self.borders.get(key, ()):
+                nodes.update(cell for cell in pair if self.cluster_of(cell) == cluster)
+        self.nodes[cluster] = nodes
+        self.searches[cluster] = {}
+        self.intra[cluster] = {}
+        for node in nodes:
+            distances = self.search(cluster, node)[0]
+            self.intra[cluster][node] = {other: distances[other] for other in nodes
+                                         if other != node and other in distances}
+
+    def search(self, cluster, source):
+        """Breadth-first search from source, staying inside cluster.
+        Returns (distances, parents); results are kept until cluster changes."""
+        searches = self.searches[cluster]
+        if source in searches:
+            return searches[source]
+        x0, y0, x1, y1 = self.bounds(cluster)
+        distances = {source: 0}
+        parents = {source: None}
+        frontier = collections.deque([source])
+        while frontier:
+            x, y = cell = frontier.popleft()
+            for dx, dy in MOVES:
+                child = (x + dx, y + dy)
+                if child not in distances and x0 <= child[0] < x1 and y0 <= child[1] < y1 and child not in self.walls:
+                    distances[child] = distances[cell] + 1
+                    parents[child] = cell
+                    frontier.append(child)
+        searches[source] = (distances, parents)
+        return searches[source]
+
+    def update(self, cells):
+        """Rebuild the abstraction around cells, whose walls have changed."""
+        borders, clusters = set(), set()
+        for cell in cells:
+            cluster = self.cluster_of(cell)
+            clusters.add(cluster)
+            x0, y0, x1, y1 = self.bounds(cluster)
+            cx, cy = cluster
+            on_edge = {(cx - 1, cy): cell[0] == x0, (cx + 1, cy): cell[0] == x1 - 1,
+                       (cx, cy - 1): cell[1] == y0, (cx, cy + 1): cell[1] == y1 - 1}
+            for neighbour in self.neighbours(cluster):
+                if on_edge[neighbour]:
+                    borders.add((min(cluster, neighbour), max(cluster, neighbour)))
+                    clusters.add(neighbour)
+        for lower, upper in borders:
+            self.build_border(lower, upper)
+        for cluster in clusters:
+            self.build_cluster(cluster)
+
+    def sync(self, walls):
+        """Bring the map in line with a new set of walls, rebuilding only what changed."""
+        if walls is self.synced:
+            return
+        changed = self.walls.symmetric_difference(walls)
+        self.walls = set(walls)
+        self.synced = walls
+        self.update(changed)
+
+    def find_path(self, start, goals):
+        """A* over the abstract graph from start to the nearest of goals.
+        Returns (actions, explored): the list of moves, or None if no goal can be
+        reached, and the set of abstract nodes expanded."""
+        start = tuple(start)
+        goals = {goal for goal in goals if self.is_free(goal)}
+        if start in goals:
+            return [], set()
+        if not goals or not self.is_free(start):
+            return None, set()
+        goals_in = collections.defaultdict(list)
+        for goal in goals:
+            goals_in[self.cluster_of(goal)].append(goal)
+
+        def h(cell):
+            return min(abs(cell[0] - goal[0]) + abs(cell[1] - goal[1]) for goal in goals)
+
+        def successors(cell):
+            cluster = self.cluster_of(cell)
+            if cell == start:
+                distances = self.search(cluster, start)[0]
+                for other in self.nodes[cluster] | set(goals_in[cluster]):
+                    if other != start and other in distances:
+                        yield other, distances[other]
+            else:
+                yield from self.intra[cluster].get(cell, {}).items()
+                for goal in goals_in[cluster]:
+                    distance = self.search(cluster, goal)[0].get(cell)
+                    if distance is not None:
+                        yield goal, distance
+            for other in self.inter.get(cell, ()):
+                yield other, 1
+
+        parents = {start: None}
+        costs = {start: 0}
+        explored = set()
+        frontier = [(h(start), 0, start)]
+        while frontier:
+            _, cost, cell = heapq.heappop(frontier)
+            if cost > costs[cell] or cell in explored:
+                continue
+            if cell in goals:
+                return self.refine(self.route(parents, cell)), explored
+            explored.add(cell)
+            for other, distance in successors(cell):
+                if cost + distance < costs.get(other, float('inf')):
+                    costs[other] = cost + distance
+                    parents[other] = cell
+                    heapq.heappush(frontier, (cost + distance + h(other), cost + distance, other))
+        return None, explored
+
+    @staticmethod
+    def route(parents, cell):
+        route = []
+        while cell is not None:
+            route.append(cell)
+            cell = parents[cell]
+        return route[::-1]
+
+    def refine(self, route):
+        """Turn a route of abstract nodes into the moves between neighbouring cells."""
+        actions = []
+        for a, b in zip(route, route[1:]):
+            cluster = self.cluster_of(a)
+            if self.cluster_of(b) != cluster:  # a step across a border
+                cells = [a, b]
+            else:
+                parents = self.search(cluster, a)[1]
+                cells = self.route(parents, b)
+            actions += path_actions(cells)
+        return actions
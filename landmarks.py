@@ -0,0 +1,163 @@
+"""
+Landmark (ALT) heuristics: A* with landmarks and the triangle inequality.
+
+GraphLandmarks ## Distances between a few landmarks and every node of a graph
+GridLandmarks  ## Distances between a few landmarks and every room of a grid world
+
+A few landmarks are picked far apart, each one the node farthest from those
+already picked, and the distances between every landmark and every node are
+computed once: by Dijkstra's algorithm on a graph, by a breadth-first wavefront
+on a grid. For a landmark L and nodes v and t the triangle inequality gives
+d(v, t) >= d(L, t) - d(L, v), and d(v, t) >= d(v, L) - d(t, L), so the largest
+of these over the landmarks is a lower bound on the distance from v to t. As an
+A* heuristic it is admissible and, around walls and detours, far tighter than
+straight-line or Manhattan distance, so A* expands far fewer nodes.
+
+The preprocessing pays off over repeated queries on the same map. bounds()
+computes the heuristic towards a set of goals for every node at once with NumPy,
+so during the search each heuristic value is a single lookup.
+"""
+
+import heapq
+
+from search_algorithms import CSRGraph
+from utilities import np
+from wavefront import free_mask, wavefront
+
+
+def dijkstra_distances(offsets, targets, weights, source):
+    """Distances from node number source along the links of a graph in CSR form
+    (see CSRGraph), as an array over the node numbers; np.inf where out of reach."""
+    offsets, targets, weights = memoryview(offsets), memoryview(targets), memoryview(weights)
+    distances = [float('inf')] * (len(offsets) - 1)
+    distances[source] = 0
+    frontier = [(0, source)]
+    while frontier:
+        distance, node = heapq.heappop(frontier)
+        if distance > distances[node]:
+            continue
+        for k in range(offsets[node], offsets[node + 1]):
+            other = targets[k]
+            if distance + weights[k] < distances[other]:
+                distances[other] = distance + weights[k]
+                heapq.heappush(frontier, (distances[other], other))
+    return np.array(distances)
+
+
+def reversed_links(graph):
+    """The (offsets, targets, weights) arrays of a CSRGraph with every link turned around."""
+    n = len(graph.names)
+    sources = np.repeat(np.arange(n, dtype=graph.targets.dtype), np.diff(graph.offsets))
+    order = np.lexsort((sources, graph.targets))
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(graph.targets, minlength=n), out=offsets[1:])
+    return offsets, sources[order], graph.weights[order]
+
+
+def grid_distances(free, source):
+    """Breadth-first distances from source to every room marked in the bool array
+    free, indexed [x, y], as an array like free; np.inf for walls and rooms out of
+    reach. The search is a wavefront (see wavefront.py)."""
+    distances = wavefront(free, [tuple(source)])[0]
+    return np.where(distances >= 0, distances, np.inf)
+
+
+class Landmarks:
+    """Landmark distances over nodes numbered 0..size-1. distances(i) returns the
+    array of distances from node i to every node; on a directed graph backward(i)
+    returns those from every node to i. Only nodes marked in the boolean array
+    free can be landmarks. count landmarks are picked among the nodes reachable
+    from start (the first free node by default), each the one farthest from those
+    before it. Bounds only help for nodes the landmarks reach; elsewhere they are 0."""
+
+    def __init__(self, size, count, distances, backward=None, free=None, start=None):
+        self.size = size
+        free = np.ones(size, dtype=bool) if free is None else free
+        self.landmarks = []
+        forward, behind = [], []
+        if count > 0 and free.any():
+            reach = distances(int(np.argmax(free)) if start is None else start)
+            farthest = np.where(free & np.isfinite(reach), reach, -1)
+            while len(self.landmarks) < count:
+                landmark = int(np.argmax(farthest))
+                if farthest[landmark] <= 0:  # every reachable node is already a landmark
+                    break
+                row = distances(landmark)
+                self.landmarks.append(landmark)
+                forward.append(row)
+                behind.append(row if backward is None else backward(landmark))
+                farthest = np.minimum(farthest, row)
+        self.forward = np.array(forward).reshape(len(forward), size)
+        self.backward = self.forward if backward is None else np.array(behind).reshape(len(behind), size)
+
+    def reaches(self, node):
+        """True if the landmarks can give bounds for node."""
+        return bool(self.landmarks) and bool(np.isfinite(self.forward[0, node]))
+
+    def bound(self, goal):
+        """Lower bounds on the distance from every node to node goal."""
+        if not self.landmarks:
+            return np.zeros(self.size)
+        with np.errstate(invalid='ignore'):  # inf - inf where a landmark reaches neither node
+            ahead = self.forward[:, goal, None] - self.forward
+            behind = self.backward - self.backward[:, goal, None]
+            bound = np.fmax(np.fmax.reduce(ahead, axis=0), np.fmax.reduce(behind, axis=0))
+        return np.maximum(np.nan_to_num(bound, nan=0.0, posinf=np.inf), 0)
+
+    def bounds(self, goals):
+        """Lower bounds on the distance from every node to the nearest of goals,
+        node numbers; np.inf for nodes known not to reach any of them."""
+        bounds = np.full(self.size, np.inf)
+        for goal in goals:
+            np.minimum(bounds, self.bound(goal), out=bounds)
+        return bounds
+
+
+class GraphLandmarks(Landmarks):
+    """Landmark distances over the nodes of a CSRGraph. A Graph is frozen first.
+    index maps a node to its number, as for the graph."""
+
+    def __init__(self, graph, count=8):
+        if not isinstance(graph, CSRGraph):
+            graph = graph.freeze()
+        self.graph = graph
+        self.index = graph.index
+        links = (graph.offsets, graph.targets, graph.weights)
+        reverse = reversed_links(graph) if graph.directed else None
+
+        def distances(node):
+            return dijkstra_distances(*links, node)
+
+        def backward(node):
+            return dijkstra_distances(*reverse, node)
+
+        super().__init__(len(graph.names), count, distances, backward if graph.directed else None)
+
+
+class GridLandmarks(Landmarks):
+    """Landmark distances, in moves, over the rooms of a width x height grid with
+    the given walls, picked among the rooms reachable from start if given.
+    Room (x, y) is node number x * height + y."""
+
+    def __init__(self, width, height, walls, count=8, start=None):
+        self.width = width
+        self.height = height
+        free = free_mask(width, height, walls)
+
+        def distances(node):
+            return grid_distances(free, divmod(node, height)).ravel()
+
+        if start is not None:
+            start = start[0] * height + start[1]
+        super().__init__(width * height, count, distances, None, free.ravel(), start)
+
+    def grid_bounds(self, goals):
+        """Lower bounds on the number of moves from every room to the nearest of
+        goals, as a width x height array: for each goal the larger of the landmark
+        bound and the Manhattan distance, then the smallest over the goals."""
+        xs, ys = np.divmod(np.arange(self.size), self.height)
+        bounds = np.full(self.size, np.inf)
+        for x, y in goals:
+            manhattan = np.abs(xs - x) + np.abs(ys - y)
+            np.minimum(bounds, np.maximum(self.bound(x * self.height + y), manhattan), out=bounds)
+        return bounds.reshape(self.width, self.height)
@@ -0,0 +1,155 @@
+"""
+Reachability index for grid worlds.
+
+ReachabilityIndex ## Labels the connected components of the free cells of a grid,
+                     so whether one cell can reach another is a dictionary lookup
+
+The labels are found by flood fill once, then kept up to date as walls come and
+go. A cell that becomes free joins the components around it, the smaller ones
+being relabelled into the largest. A cell that becomes a wall can only split its
+component if it had two or more free neighbours; the index then runs a
+breadth-first search from each of those neighbours in lockstep, merging searches
+that meet, and relabels any search that runs dry on its own. The cost of a split
+is therefore bounded by the size of the pieces cut off, not by the whole map.
+"""
+
+import collections
+import itertools
+
+# The four moves of the vacuum agent.
+NEIGHBOURS = ((0, 1), (0, -1), (-1, 0), (1, 0))
+
+
+class ReachabilityIndex:
+    """Connected components of the free cells of a width x height grid.
+    Cells outside the grid count as walls."""
+
+    def __init__(self, width, height, walls):
+        self.width = width
+        self.height = height
+        self.walls = set(walls)
+        self.synced = walls  # the wall set last synced from, so an unchanged snapshot costs nothing
+        self.labels = {}  # free cell -> component label
+        self.members = {}  # component label -> set of its cells
+        self.new_label = itertools.count()
+        for cell in itertools.product(range(width), range(height)):
+            if cell not in self.walls and cell not in self.labels:
+                self.fill(cell, next(self.new_label))
+
+    def is_free(self, cell):
+        return 0 <= cell[0] < self.width and 0 <= cell[1] < self.height and cell not in self.walls
+
+    def free_neighbours(self, cell):
+        x, y = cell
+        return [n for n in ((x + dx, y + dy) for dx, dy in NEIGHBOURS) if self.is_free(n)]
+
+    def fill(self, cell, label):
+        """Flood fill the component of cell with label."""
+        members = {cell}
+        self.labels[cell] = label
+        frontier = collections.deque([cell])
+        while frontier:
+            for neighbour in self.free_neighbours(frontier.popleft()):
+                if self.labels.get(neighbour) != label:
+                    self.labels[neighbour] = label
+                    members.add(neighbour)
+                    frontier.append(neighbour)
+        self.members[label] = members
+
+    def label(self, cell):
+        """The component label of cell, or None if it is a wall or off the grid."""
+        return self.labels.get(tuple(cell))
+
+    def reachable(self, a, b):
+        """True if a path of free cells leads from a to b."""
+        label = self.label(a)
+        return label is not None and label == self.label(b)
+
+    def component(self, cell):
+        """The set of cells reachable from cell."""
+        return self.members.get(self.label(cell), set())
+
+    def relabel(self, cells, label):
+        for cell in cells:
+            self.labels[cell] = label
+        self.members[label] = set(cells)
+
+    def remove_wall(self, cell):
+        """Mark cell as free, merging the components around it."""
+        cell = tuple(cell)
+        self.walls.discard(cell)
+        if not self.is_free(cell) or cell in self.labels:
+            return
+        labels = {self.labels[n] for n in self.free_neighbours(cell)}
+        if not labels:
+            self.relabel([cell], next(self.new_label))
+            return
+        largest = max(labels, key=lambda label: len(self.members[label]))
+        members = self.members[largest]
+        for label in labels - {largest}:
+            for member in self.members.pop(label):
+                self.labels[member] = largest
+                members.add(member)
+        self.labels[cell] = largest
+        members.add(cell)
+
+    def add_wall(self, cell):
+        """Mark cell as a wall, splitting its component if that cuts it apart."""
+        cell = tuple(cell)
+        self.walls.add(cell)
+        label = self.labels.pop(cell, None)
+        if label is None:
+            return
+        self.members[label].discard(cell)
+        if not self.members[label]:
+            del self.members[label]
+        neighbours = self.free_neighbours(cell)
+        if len(neighbours) > 1:
+            self.split(label, neighbours)
+
+    def split(self, label, starts):
+        """Search from each of starts in lockstep. Searches that meet join up;
+        one that runs dry on its own has found a piece cut off from the rest,
+        which gets a new label. Stops as soon as at most one search is left."""
+        owner = {start: i for i, start in enumerate(starts)}
+        parent = list(range(len(starts)))
+        frontiers = [collections.deque([start]) for start in starts]
+        visited = [[start] for start in starts]
+
+        def find(i):
+            while parent[i] != i:
+                i = parent[i]
+            return i
+
+        groups = set(range(len(starts)))  # the roots of the searches still running
+        while len(groups) > 1:
+            for group in list(groups):
+                searches = [i for i in range(len(starts)) if find(i) == group]
+                if len(groups) > 1 and not any(frontiers[i] for i in searches):
+                    cells = [cell for i in searches for cell in visited[i]]
+                    self.members[label].difference_update(cells)
+                    self.relabel(cells, next(self.new_label))
+                    groups.discard(group)
+            for i in range(len(starts)):
+                if not frontiers[i] or find(i) not in groups:
+                    continue
+                for neighbour in self.free_neighbours(frontiers[i].popleft()):
+                    j = owner.get(neighbour)
+                    if j is None:
+                        owner[neighbour] = i
+                        visited[i].append(neighbour)
+                        frontiers[i].append(neighbour)
+                    elif find(j) != find(i):
+                        groups.discard(find(j))
+                        parent[find(j)] = find(i)
+
+    def sync(self, walls):
+        """Bring the index in line with a new set of walls, one changed cell at a time."""
+        if walls is self.synced:
+            return
+        for cell in self.walls.symmetric_difference(walls):
+            if cell in walls:
+                self.add_wall(cell)
+            else:
+                self.remove_wall(cell)
+        self.synced = walls
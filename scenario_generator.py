@@ -0,0 +1,129 @@
+"""
+Random floor plans for the simulator: walls, dirt and the agent's start.
+
+generate ## A seeded Scenario: walls scattered at random, or rooms joined by
+            doors and corridors, and dirt in rooms drawn without replacement
+Scenario ## The walls as a bool array, the dirty rooms and the start
+
+Everything is drawn from a NumPy Generator seeded with seed, so a seed always
+gives the same scenario, whatever else used the random module meanwhile. Walls
+and dirt are drawn for the whole floor at once: walls by comparing an array of
+uniform numbers with the wall density, dirt by choosing among the free rooms
+without replacement. Both take one pass, so a floor of a million rooms takes
+milliseconds, and asking for more dirt than there are free rooms gives every
+free room dirt instead of looping forever.
+
+The 'rooms' layout cuts the floor into rooms by wall lines at jittered
+intervals of room_size, with a door on every side a room shares with a
+neighbour. With corridor_width > 0 each cut is a corridor of that width between
+two wall lines instead, and every room opens onto the corridors around it.
+"""
+
+import collections
+
+from utilities import np
+
+LAYOUTS = ('random', 'rooms')
+
+
+class Scenario(collections.namedtuple('Scenario', 'width height walls dirt start')):
+    """walls is a width x height bool array indexed [x, y], the outer edge
+    included; dirt is an n x 2 array of the (x, y) of the dirty rooms."""
+    __slots__ = ()
+
+    def wall_cells(self, interior=True):
+        """The (x, y) of the walls, leaving out the outer edge if interior is set."""
+        walls = self.walls
+        if interior:
+            walls = np.zeros_like(walls)
+            walls[1:-1, 1:-1] = self.walls[1:-1, 1:-1]
+        return [tuple(cell) for cell in np.argwhere(walls).tolist()]
+
+    def dirt_cells(self):
+        return [tuple(cell) for cell in self.dirt.tolist()]
+
+
+def cuts(length, step, jitter, random):
+    """Positions of the wall lines across an axis of length rooms: every step
+    rooms, give or take jitter, keeping off the outer edge."""
+    positions = np.arange(step, length - step // 2, step)
+    if jitter and positions.size:
+        positions = positions + random.integers(-jitter, jitter + 1, positions.size)
+    return positions[(positions > 1) & (positions < length - 2)]
+
+
+def spans(positions, width, length):
+    """The [start, stop) ranges of the rooms between wall bands of the given width."""
+    starts = np.concatenate(([1], positions + width))
+    stops = np.concatenate((positions, [length - 1]))
+    keep = stops > starts
+    return starts[keep], stops[keep]
+
+
+def doors(walls, lines, starts, stops, random, vertical):
+    """Open one door in each room-long segment of each wall line."""
+    if not len(lines) or not len(starts):
+        return
+    offsets = (random.random((len(lines), len(starts))) * (stops - starts)).astype(int)
+    along = starts + offsets
+    across = np.broadcast_to(np.asarray(lines)[:, None], along.shape)
+    if vertical:
+        walls[across, along] = False
+    else:
+        walls[along, across] = False
+
+
+def room_walls(width, height, room_size, corridor_width, random):
+    """The walls of the 'rooms' layout, doors open, outer edge not included."""
+    walls = np.zeros((width, height), dtype=bool)
+    band = corridor_width + 1 if corridor_width else 0  # distance from a cut's first wall line to its second
+    step, jitter = room_size + band, room_size // 4
+    xs, ys = cuts(width - band, step, jitter, random), cuts(height - band, step, jitter, random)
+    x_starts, x_stops = spans(xs, band + 1, width)
+    y_starts, y_stops = spans(ys, band + 1, height)
+    lines_x = np.concatenate((xs, xs + band)) if band else xs
+    lines_y = np.concatenate((ys, ys + band)) if band else ys
+    walls[lines_x, :] = True
+    walls[:, lines_y] = True
+    if band:  # clear the corridors, which also joins them where they cross
+        for offset in range(1, band):
+            walls[xs + offset, 1:-1] = False
+            walls[1:-1, ys + offset] = False
+    doors(walls, lines_x, y_starts, y_stops, random, vertical=True)
+    doors(walls, lines_y, x_starts, x_stops, random, vertical=False)
+    return walls
+
+
+def generate(width, height, seed=None, layout='random', wall_density=None, dirt_count=5, dirt_density=None,
+             start=None, room_size=8, corridor_width=0):
+    """A Scenario for a width x height floor, walled around its edge.
+    With layout 'random', each inner room is a wall with probability
+    wall_density, by default itself drawn between 1/7 and 1/3; with 'rooms',
+    wall_density (by default 0) scatters extra walls inside the rooms.
+    dirt_density, if given, is the share of the free rooms to make dirty,
+    otherwise dirt_count rooms are, or all free rooms if there are fewer.
+    start, by default the middle of the floor, is never a wall nor dirty."""
+    if layout not in LAYOUTS:
+        raise ValueError('layout must be one of {}, not {!r}'.format(LAYOUTS, layout))
+    random = np.random.default_rng(seed)
+    start = (width // 2, height // 2) if start is None else tuple(start)
+    if layout == 'rooms':
+        walls = room_walls(width, height, room_size, corridor_width, random)
+        wall_density = wall_density or 0.0
+    else:
+        walls = np.zeros((width, height), dtype=bool)
+        if wall_density is None:
+            wall_density = random.uniform(1 / 7, 1 / 3)
+    if wall_density > 0:
+        walls |= random.random((width, height)) < wall_density
+    walls[[0, -1], :] = True
+    walls[:, [0, -1]] = True
+    walls[start] = False
+
+    free = ~walls.ravel()
+    free[start[0] * height + start[1]] = False
+    rooms = np.flatnonzero(free)
+    count = dirt_count if dirt_density is None else int(round(dirt_density * rooms.size))
+    chosen = random.choice(rooms, size=min(count, rooms.size), replace=False)
+    dirt = np.stack(np.divmod(chosen, height), axis=1)
+    return Scenario(width, height, walls, dirt, start)
@@ -6,7 +6,14 @@ then create problem instances and solve them with calls to the various search
 functions.
 """
 
+import bisect
+import heapq
+import itertools
+import math
+import multiprocessing
+import os
 import sys
+import time
 from collections import deque
 
 from utilities import *
@@ -130,6 +137,103 @@ class Node:
 
 
 # ______________________________________________________________________________
+# Explored sets
+
+
+class ExploredGrid:
+    """A set of the cells (x, y) of a width x height grid, kept as one byte per
+    cell instead of one tuple per cell, for the explored set of a search over a
+    grid world. mask is a width x height NumPy bool array view of it, indexed
+    [x, y], which a renderer can use directly. Pickled (for the plan cache or
+    another process) it takes one bit per cell. Adding a cell outside the grid
+    raises ValueError; such cells are never in it."""
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.cells = bytearray(width * height)  # indexed by x * height + y
+        self.size = 0
+
+    @property
+    def mask(self):
+        return np.frombuffer(self.cells, dtype=bool).reshape(self.width, self.height)
+
+    def add(self, cell):
+        x, y = cell
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            raise ValueError('cell {} is outside the {}x{} grid'.format(cell, self.width, self.height))
+        i = x * self.height + y
+        if not self.cells[i]:
+            self.cells[i] = 1
+            self.size += 1
+
+    def discard(self, cell):
+        if cell in self:
+            self.cells[cell[0] * self.height + cell[1]] = 0
+            self.size -= 1
+
+    def remove(self, cell):
+        if cell not in self:
+            raise KeyError(cell)
+        self.discard(cell)
+
+    def copy(self):
+        grid = ExploredGrid(self.width, self.height)
+        grid.cells[:] = self.cells
+        grid.size = self.size
+        return grid
+
+    def __contains__(self, cell):
+        x, y = cell
+        return 0 <= x < self.width and 0 <= y < self.height and self.cells[x * self.height + y] == 1
+
+    def __iter__(self):
+        for i in np.flatnonzero(np.frombuffer(self.cells, dtype=bool)).tolist():
+            yield divmod(i, self.height)
+
+    def __len__(self):
+        return self.size
+
+    def __repr__(self):
+        return '<ExploredGrid {}x{}: {} cells>'.format(self.width, self.height, self.size)
+
+    def __reduce__(self):
+        return unpack_explored_grid, (self.width, self.height, np.packbits(self.mask).tobytes(), self.size)
+
+
+def unpack_explored_grid(width, height, bits, size):
+    grid = ExploredGrid(width, height)
+    grid.cells[:] = np.unpackbits(np.frombuffer(bits, dtype=np.uint8), count=width * height).tobytes()
+    grid.size = size
+    return grid
+
+
+def explored_grid(mask):
+    """An ExploredGrid of the cells marked in a width x height bool array indexed [x, y]."""
+    grid = ExploredGrid(*mask.shape)
+    grid.cells[:] = np.ascontiguousarray(mask, dtype=bool).tobytes()
+    grid.size = int(np.count_nonzero(mask))
+    return grid
+
+
+def explored_mask(explored, width, height):
+    """A width x height bool array, indexed [x, y], of the cells in explored,
+    which may be an ExploredGrid or any collection of cells."""
+    if isinstance(explored, ExploredGrid) and (explored.width, explored.height) == (width, height):
+        return explored.mask
+    mask = np.zeros((width, height), dtype=bool)
+    for x, y in explored or ():
+        if 0 <= x < width and 0 <= y < height:
+            mask[x, y] = True
+    return mask
+
+
+def explored_set(problem):
+    """A new, empty explored set for a search on problem: what problem.explored_set()
+    returns if it has one, such as an ExploredGrid for a grid world, else a set."""
+    make = getattr(problem, 'explored_set', None)
+    return set() if make is None else make()
+
 
 # ______________________________________________________________________________
 # Uninformed Search algorithms
@@ -144,9 +248,12 @@ def breadth_first_graph_search(problem):
     if problem.goal_test(node.state):
         return node, None  
     frontier = collections.deque([node])
-    explored = set()
+    frontier_states = explored_set(problem)
+    frontier_states.add(tuple(node.state))
+    explored = explored_set(problem)
     while frontier:
         node = frontier.popleft()
+        frontier_states.remove(tuple(node.state))
         if problem.goal_test(node.state):
             return node, explored
         explored.add(tuple(node.state))
@@ -154,15 +261,9 @@ def breadth_first_graph_search(problem):
         for action in problem.actions(node.state):
             child = Node.child_node(node, problem, action)
             child_state_tuple = tuple(child.state)
-            if child_state_tuple not in explored:
-                in_frontier = False
-                for front_node in frontier:
-                    if child_state_tuple == tuple(front_node.state):
-                        in_frontier = True
-                        break
-
-                if not in_frontier:
-                    frontier.append(child)
+            if child_state_tuple not in explored and child_state_tuple not in frontier_states:
+                frontier.append(child)
+                frontier_states.add(child_state_tuple)
     return None, None
 
 
@@ -178,9 +279,12 @@ def depth_first_graph_search(problem):
     if problem.goal_test(node.state):
         return node, None  
     frontier = collections.deque([node])
-    explored = set()
+    frontier_states = explored_set(problem)
+    frontier_states.add(tuple(node.state))
+    explored = explored_set(problem)
     while frontier:
         node = frontier.pop()
+        frontier_states.remove(tuple(node.state))
         if problem.goal_test(node.state):
             return node, explored
         explored.add(tuple(node.state))
@@ -188,22 +292,37 @@ def depth_first_graph_search(problem):
         for action in problem.actions(node.state):
             child = Node.child_node(node, problem, action)
             child_state_tuple = tuple(child.state)
-            if child_state_tuple not in explored:
-                in_frontier = False
-                for front_node in frontier:
-                    if child_state_tuple == tuple(front_node.state):
-                        in_frontier = True
-                        break
-                if not in_frontier:
-                    frontier.append(child)
+            if child_state_tuple not in explored and child_state_tuple not in frontier_states:
+                frontier.append(child)
+                frontier_states.add(child_state_tuple)
     return None, None
 
 
-def best_first_graph_search(problem, f=None):
+def prefer_high_g(node):
+    """Tie-breaking key for the frontier: of nodes with equal f, expand the one
+    with the higher path cost first. With f = g + h that is the one h puts
+    nearest the goal, so on open floors A* runs along one of the many equally
+    short paths instead of expanding the whole plateau of equal f."""
+    return -node.path_cost
+
+
+def prefer_low_g(node):
+    return node.path_cost
+
+
+# Tie-breaking policies of best_first_graph_search by name; None breaks ties by
+# insertion order alone.
+tie_breakers = {'high g': prefer_high_g, 'low g': prefer_low_g, 'fifo': None}
+
+
+def best_first_graph_search(problem, f=None, tie=prefer_high_g):
     """Search the nodes with the lowest f scores first.
     You specify the function f(node) that you want to minimise; for example,
     if f is a heuristic estimate to the goal, then we have greedy best
     first search; if f is node.depth then we have breadth-first search.
+    Ties in f are broken by the smallest tie(node), then by the order nodes were
+    added to the frontier (first in, first out), so the result of a search does
+    not depend on how states compare; see tie_breakers.
     There is a subtlety: the line "f = memoize(f, 'f')" means that the f
     values will be cached on the nodes as they are computed. So after doing
     a best first search you can examine the f values of the path returned."""
@@ -211,10 +330,11 @@ def best_first_graph_search(problem, f=None):
     node = Node(problem.initial)
     if problem.goal_test(node.state):
         return node, None
-    frontier = PriorityQueue('min', f)
+    frontier = PriorityQueue('min', f, tie)
     frontier.append(node)
-    frontier_states = set([tuple(node.state)]) 
-    explored = set()
+    frontier_states = explored_set(problem)
+    frontier_states.add(tuple(node.state))
+    explored = explored_set(problem)
     while frontier:
         node = frontier.pop()
         frontier_states.remove(tuple(node.state)) 
@@ -230,12 +350,11 @@ def best_first_graph_search(problem, f=None):
                 if f(child) < frontier[child]:
                     del frontier[child]
                     frontier.append(child)
-                break
     return None, None
 
 
-def uniform_cost_search(problem):
-    return best_first_graph_search(problem)
+def uniform_cost_search(problem, tie=prefer_high_g):
+    return best_first_graph_search(problem, lambda node: node.path_cost, tie)
 
 
 # ______________________________________________________________________________
@@ -248,12 +367,329 @@ greedy_best_first_graph_search = best_first_graph_search
 # Greedy best-first search is accomplished by specifying f(n) = h(n).
 
 
-def astar_search(problem, h=None):
+def astar_search(problem, h=None, tie=prefer_high_g):
     """A* search is best-first graph search with f(n) = g(n)+h(n).
     You need to specify the h function when you call astar_search, or
-    else in your Problem subclass."""
+    else in your Problem subclass. tie breaks ties in f, as for
+    best_first_graph_search."""
     h = memoize(h or problem.h, 'h')
-    return best_first_graph_search(problem, lambda n: n.path_cost + h(n))
+    return best_first_graph_search(problem, lambda n: n.path_cost + h(n), tie)
+
+
+# ______________________________________________________________________________
+# Memory-bounded heuristic search
+
+
+def state_key(state):
+    """A hashable key for a state; list states (as in VacuumPlanning) become tuples."""
+    return tuple(state) if isinstance(state, list) else state
+
+
+def iterative_deepening_astar_search(problem, h=None, table_size=1 << 20, stats=None):
+    """IDA*: depth-first searches bounded by f = g + h, raising the bound to the
+    smallest f that exceeded it until a goal is found. Only the current path is
+    kept, plus a transposition table of at most table_size states with the lowest
+    g they were reached at in this iteration; no cheaper path means prune.
+    Returns (node, None), as no explored set is kept. If stats is a dict it is
+    filled with 'peak_nodes' (the most nodes on the path and states in the table
+    at once), 'expanded', 'iterations' and 'table_size'."""
+    h = memoize(h or problem.h, 'h')
+    root = Node(problem.initial)
+    if stats is None:
+        stats = {}
+    stats.update(peak_nodes=1, expanded=0, iterations=0, table_size=0)
+    if problem.goal_test(root.state):
+        return root, None
+    bound = h(root)
+    while bound < np.inf:
+        stats['iterations'] += 1
+        table = {state_key(root.state): 0}
+        next_bound = np.inf
+        stack = [(root, iter(problem.actions(root.state)))]
+        while stack:
+            node, actions = stack[-1]
+            action = next(actions, None)
+            if action is None:
+                stack.pop()
+                continue
+            child = node.child_node(problem, action)
+            f = child.path_cost + h(child)
+            if f > bound:
+                next_bound = min(next_bound, f)
+                continue
+            key = state_key(child.state)
+            if table.get(key, np.inf) <= child.path_cost:
+                continue
+            if key in table or len(table) < table_size:
+                table[key] = child.path_cost
+            if problem.goal_test(child.state):
+                stats['table_size'] = max(stats['table_size'], len(table))
+                return child, None
+            stats['expanded'] += 1
+            stack.append((child, iter(problem.actions(child.state))))
+            stats['peak_nodes'] = max(stats['peak_nodes'], len(stack) + len(table))
+        stats['table_size'] = max(stats['table_size'], len(table))
+        bound = next_bound
+    return None, None
+
+
+def simplified_memory_bounded_astar_search(problem, h=None, max_nodes=10000, stats=None):
+    """SMA*: A* that never holds more than max_nodes search nodes. Successors are
+    generated one at a time, from the node whose next successor has the lowest f
+    (the deepest such node on ties). When memory is full, the leaf with the
+    highest f (the shallowest on ties) is forgotten first: its parent remembers
+    that f, and backs it up into its own f straight away, so the subtree is only
+    regenerated once everything else turns out worse. A node one short of
+    max_nodes deep that is not a goal gets f = infinity, as no path through it
+    fits in memory. A successor is skipped when its state is already in memory
+    with no greater path cost. Optimal whenever the solution path fits in
+    memory; fails once the lowest f left is infinite, i.e. every path either
+    dead-ends or runs out of memory. Returns (node, None); if stats is a dict it
+    is filled with 'peak_nodes' and 'expanded'."""
+    h = memoize(h or problem.h, 'h')
+    if stats is None:
+        stats = {}
+    stats.update(peak_nodes=1, expanded=0)
+    counter = itertools.count()
+    best_heap, worst_heap = [], []  # (f of the next successor, -depth, ...) and (-f, depth, ...) of the leaves
+    in_memory = {}
+
+    def remember(node, f):
+        node.f = node.own_f = f  # own_f bounds the successors not generated yet
+        node.pending = None  # those successors' actions; computed on first expansion
+        node.children, node.forgotten = [], {}  # forgotten maps an action to the f of its subtree
+        node.version, node.alive = 0, True
+        in_memory[state_key(node.state)] = node
+
+    def next_f(node):
+        """The f of the successor node generates next, None if there is none."""
+        if node.pending is None or node.pending:
+            return node.own_f
+        if node.forgotten:
+            return min(node.forgotten.values())
+        return None
+
+    def requeue(node):
+        """Queue node again after its f, successors or children changed."""
+        node.version += 1
+        f = next_f(node)
+        if f is not None:
+            heapq.heappush(best_heap, (f, -node.depth, next(counter), node.version, node))
+        if not node.children and node.parent is not None:
+            heapq.heappush(worst_heap, (-node.f, node.depth, next(counter), node.version, node))
+
+    def backup(node):
+        """A node's f is the lowest f of what lies below it: the children in
+        memory, the forgotten ones and the successors still to be generated."""
+        changed = True
+        while node is not None and changed:
+            fs = [child.f for child in node.children] + list(node.forgotten.values())
+            if node.pending is None or node.pending:
+                fs.append(node.own_f)
+            f = min(fs, default=np.inf)
+            changed = f != node.f
+            node.f = f
+            requeue(node)
+            node = node.parent
+
+    def forget(keep):
+        """Forget the worst leaf other than keep. Returns False if there is none."""
+        kept = []
+        try:
+            while worst_heap:
+                entry = heapq.heappop(worst_heap)
+                worst = entry[-1]
+                if not worst.alive or entry[-2] != worst.version or worst.children:
+                    continue
+                if worst is keep:
+                    kept.append(entry)
+                    continue
+                worst.alive = False
+                parent = worst.parent
+                parent.children.remove(worst)
+                parent.forgotten[worst.action] = worst.f
+                if in_memory.get(state_key(worst.state)) is worst:
+                    del in_memory[state_key(worst.state)]
+                backup(parent)
+                return True
+            return False
+        finally:
+            for entry in kept:
+                heapq.heappush(worst_heap, entry)
+
+    root = Node(problem.initial)
+    remember(root, h(root))
+    requeue(root)
+    used = 1
+    while best_heap:
+        f, _, _, version, best = best_heap[0]
+        if not best.alive or version != best.version:
+            heapq.heappop(best_heap)
+            continue
+        if f == np.inf:
+            break
+        if problem.goal_test(best.state):
+            return best, None
+
+        if best.pending is None:
+            best.pending = list(problem.actions(best.state))[::-1]
+            stats['expanded'] += 1
+        if best.pending:
+            action, floor = best.pending.pop(), best.own_f
+        else:
+            action = min(best.forgotten, key=best.forgotten.get)
+            floor = best.forgotten.pop(action)
+        child = best.child_node(problem, action)
+        twin = in_memory.get(state_key(child.state))
+        if twin is not None and twin.path_cost <= child.path_cost:
+            backup(best)  # no better way to that state
+            continue
+        if used >= max_nodes:
+            if not forget(best):
+                break  # best is the only leaf left: not even one path fits
+            used -= 1
+        if not problem.goal_test(child.state) and child.depth >= max_nodes - 1:
+            remember(child, np.inf)
+        else:
+            remember(child, max(floor, child.path_cost + h(child)))
+        best.children.append(child)
+        used += 1
+        stats['peak_nodes'] = max(stats['peak_nodes'], used)
+        requeue(child)
+        backup(best)
+    return None, None
+
+
+# ______________________________________________________________________________
+# Anytime search
+
+
+class AnytimeRepairingAstar:
+    """ARA*: a weighted A* search (f = g + weight * h) that finds a first path
+    quickly, then lowers the weight by weight_step and repairs the search,
+    reusing the work already done, until weight reaches 1 and the path is optimal.
+    run() can be stopped by a deadline and called again to carry on where it
+    left off. After each run, solution is the best goal node found so far and
+    bound is how many times costlier than optimal it can be at most (inf while
+    there is no solution yet); done is True once nothing better can be found."""
+
+    def __init__(self, problem, h=None, weight=3.0, weight_step=0.5):
+        self.problem = problem
+        self.h = memoize(h or problem.h, 'h')
+        self.weight = max(weight, 1.0)
+        self.weight_step = weight_step
+        self.solution = None
+        self.bound = float('inf')
+        self.done = False
+        self.expanded = 0
+        self.improvements = 0
+        self.best = {}  # state key -> the cheapest node reaching it so far
+        self.closed = set()
+        self.incons = set()  # closed states reached more cheaply since they were expanded
+        self.explored = explored_set(problem)
+        self.counter = itertools.count()
+        self.open = []
+        root = Node(problem.initial)
+        self.best[state_key(root.state)] = root
+        if problem.goal_test(root.state):
+            self.solution = root
+            self.bound = 1.0
+            self.done = True
+        else:
+            self.push(root)
+
+    def f(self, node):
+        return node.path_cost + self.weight * self.h(node)
+
+    def push(self, node):
+        heapq.heappush(self.open, (self.f(node), next(self.counter), node))
+
+    def open_nodes(self):
+        """The nodes on the open list, skipping entries that are stale."""
+        return [node for _, _, node in self.open
+                if self.best[state_key(node.state)] is node and state_key(node.state) not in self.closed]
+
+    def improve_path(self, deadline):
+        """Expand nodes until the solution is no costlier than any open f.
+        Returns False if the deadline passed first."""
+        problem = self.problem
+        while self.open:
+            f, _, node = self.open[0]
+            if self.solution is not None and self.solution.path_cost <= f:
+                return True
+            if deadline is not None and time.perf_counter() > deadline:
+                return False
+            heapq.heappop(self.open)
+            key = state_key(node.state)
+            if self.best[key] is not node or key in self.closed:
+                continue
+            self.closed.add(key)
+            self.explored.add(key)
+            self.expanded += 1
+            for child in node.expand(problem):
+                child_key = state_key(child.state)
+                old = self.best.get(child_key)
+                if old is not None and old.path_cost <= child.path_cost:
+                    continue
+                self.best[child_key] = child
+                if problem.goal_test(child.state):
+                    if self.solution is None or child.path_cost < self.solution.path_cost:
+                        self.solution = child
+                        self.improvements += 1
+                if child_key in self.closed:
+                    self.incons.add(child_key)
+                else:
+                    self.push(child)
+        return True
+
+    def update_bound(self):
+        """Bound the suboptimality of the solution by the lowest g + h still to expand."""
+        if self.solution is None:
+            self.bound = float('inf')
+            self.done = not self.open and not self.incons
+            return
+        nodes = self.open_nodes() + [self.best[key] for key in self.incons]
+        lowest = min((node.path_cost + self.h(node) for node in nodes), default=float('inf'))
+        if lowest >= self.solution.path_cost:
+            self.bound = 1.0
+        else:
+            self.bound = min(self.weight, self.solution.path_cost / lowest) if lowest > 0 else self.weight
+        self.done = self.bound <= 1.0
+
+    def run(self, deadline_ms=None):
+        """Search until done, or for at most deadline_ms milliseconds.
+        Returns (node, explored), the node being None if no path is known yet."""
+        deadline = None if deadline_ms is None else time.perf_counter() + deadline_ms / 1000
+        while not self.done:
+            finished = self.improve_path(deadline)
+            self.update_bound()
+            if not finished or self.done:
+                break
+            # Repair: lower the weight, re-open the inconsistent states and re-key the open list.
+            self.weight = max(1.0, self.weight - self.weight_step)
+            nodes = self.open_nodes() + [self.best[key] for key in self.incons]
+            self.closed.clear()
+            self.incons.clear()
+            self.open = [(self.f(node), next(self.counter), node) for node in nodes]
+            heapq.heapify(self.open)
+            if deadline is not None and time.perf_counter() > deadline:
+                break
+        return self.solution, self.explored.copy()
+
+    def stats(self):
+        return {'bound': self.bound, 'weight': self.weight, 'expanded': self.expanded,
+                'improvements': self.improvements, 'done': self.done}
+
+
+def anytime_repairing_astar_search(problem, h=None, deadline_ms=None, weight=3.0, weight_step=0.5, stats=None):
+    """Run ARA* (see AnytimeRepairingAstar) for at most deadline_ms milliseconds,
+    returning the best (node, explored) found. If stats is a dict it is filled
+    with the suboptimality 'bound', the final 'weight' and 'expanded'."""
+    search = AnytimeRepairingAstar(problem, h, weight, weight_step)
+    result = search.run(deadline_ms)
+    if stats is not None:
+        stats.update(search.stats())
+    return result
 
 
 # ______________________________________________________________________________
@@ -279,20 +715,18 @@ class PeakFindingProblem(Problem):
         assert self.n > 0
         self.m = len(grid[0])
         assert self.m > 0
+        self.grid_values = None
 
     def actions(self, state):
         """Returns the list of actions which are allowed to be taken from the given state"""
-        allowed_actions = []
-        for action in self.defined_actions:
-            next_state = vector_add(state, self.defined_actions[action])
-            if 0 <= next_state[0] <= self.n - 1 and 0 <= next_state[1] <= self.m - 1:
-                allowed_actions.append(action)
-
-        return allowed_actions
+        x, y = state
+        return [action for action, (dx, dy) in self.defined_actions.items()
+                if 0 <= x + dx < self.n and 0 <= y + dy < self.m]
 
     def result(self, state, action):
         """Moves in the direction specified by action"""
-        return vector_add(state, self.defined_actions[action])
+        dx, dy = self.defined_actions[action]
+        return state[0] + dx, state[1] + dy
 
     def value(self, state):
         """Value of a state is the value it is the index to"""
@@ -301,6 +735,336 @@ class PeakFindingProblem(Problem):
         assert 0 <= y < self.m
         return self.grid[x][y]
 
+    def grid_array(self):
+        """The grid as a float NumPy array, made on first use."""
+        if self.grid_values is None:
+            self.grid_values = np.asarray(self.grid, dtype=float)
+        return self.grid_values
+
+    def move_array(self):
+        """The moves of defined_actions as a (number of actions) x 2 array, in their order."""
+        return np.array(list(self.defined_actions.values()), dtype=np.intp).reshape(-1, 2)
+
+    def random_states(self, count, random_state):
+        """count states drawn uniformly from the grid by a NumPy Generator, as a count x 2 array."""
+        return np.stack([random_state.integers(self.n, size=count),
+                         random_state.integers(self.m, size=count)], axis=1)
+
+    def neighbour_values(self, states, moves):
+        """For each of states (a k x 2 array) and each of moves, the state moved to
+        and its value, -inf off the grid. Returns arrays of shape k x moves x 2 and
+        k x moves, computed with one fancy-indexed lookup into the grid."""
+        grid = self.grid_array()
+        neighbours = states[:, None, :] + moves[None, :, :]
+        inside = ((neighbours >= 0).all(axis=2) & (neighbours[..., 0] < self.n) & (neighbours[..., 1] < self.m))
+        x = np.clip(neighbours[..., 0], 0, self.n - 1)
+        y = np.clip(neighbours[..., 1], 0, self.m - 1)
+        return neighbours, np.where(inside, grid[x, y], -np.inf)
+
+
+# ______________________________________________________________________________
+# Local search
+
+
+def neighbor_states(problem, state):
+    """The states reachable from state in one action. Local search keeps no
+    paths, so it works on states rather than on search Nodes."""
+    return [problem.result(state, action) for action in problem.actions(state)]
+
+
+def hill_climbing(problem):
+    """From the initial state, keep choosing the neighbor with highest value,
+    stopping when no neighbor is better. [Figure 4.2]"""
+    current = problem.initial
+    while True:
+        neighbors = neighbor_states(problem, current)
+        if not neighbors:
+            break
+        neighbor = argmax_random_tie(neighbors, key=problem.value)
+        if problem.value(neighbor) <= problem.value(current):
+            break
+        current = neighbor
+    return current
+
+
+def exp_schedule(k=20, lam=0.005, limit=100):
+    """One possible schedule function for simulated annealing"""
+    return lambda t: (k * math.exp(-lam * t) if t < limit else 0)
+
+
+def simulated_annealing(problem, schedule=exp_schedule()):
+    """Move to a random neighbor, always if it is better and with probability
+    exp(delta / T) if it is worse, T falling according to schedule. [Figure 4.5]"""
+    current = problem.initial
+    for t in range(sys.maxsize):
+        T = schedule(t)
+        if T == 0:
+            return current
+        neighbors = neighbor_states(problem, current)
+        if not neighbors:
+            return current
+        next_choice = random.choice(neighbors)
+        delta_e = problem.value(next_choice) - problem.value(current)
+        if delta_e > 0 or probability(math.exp(delta_e / T)):
+            current = next_choice
+
+
+def peak_hill_climbing(problem, starts):
+    """Steepest-ascent hill climbing on a PeakFindingProblem for many walkers at
+    once, one from each of starts (a k x 2 array of states). Each round looks up
+    the values of all the neighbors of all the walkers still climbing with NumPy,
+    and moves each to its best neighbor (the first in defined_actions among
+    equals) if that is higher. Returns (states, values): the peaks reached."""
+    moves = problem.move_array()
+    grid = problem.grid_array()
+    states = np.array(starts, dtype=np.intp).reshape(-1, 2)
+    values = grid[states[:, 0], states[:, 1]]
+    climbing = np.arange(len(states))
+    while len(climbing):
+        neighbours, neighbour_values = problem.neighbour_values(states[climbing], moves)
+        best = neighbour_values.argmax(axis=1)
+        rows = np.arange(len(climbing))
+        higher = neighbour_values[rows, best] > values[climbing]
+        climbing, rows, best = climbing[higher], rows[higher], best[higher]
+        states[climbing] = neighbours[rows, best]
+        values[climbing] = neighbour_values[rows, best]
+    return states, values
+
+
+def peak_restart_worker(problem, restarts, seed):
+    """Process body for peak_random_restarts: climb from restarts random states
+    and return the (state, value) of the highest peak found."""
+    starts = problem.random_states(restarts, np.random.default_rng(seed))
+    states, values = peak_hill_climbing(problem, starts)
+    best = int(values.argmax())
+    return tuple(states[best].tolist()), float(values[best])
+
+
+def peak_random_restarts(problem, restarts=1000, seed=None, processes=None):
+    """Random-restart hill climbing on a PeakFindingProblem: climb from restarts
+    random states and return the (state, value) of the highest peak found. The
+    restarts are shared out over a pool of processes (os.cpu_count() by
+    default), each climbing its share in one vectorised batch; with processes=1
+    everything runs in this process. seed makes the result reproducible for a
+    given number of processes."""
+    processes = max(1, min(processes or os.cpu_count() or 1, restarts))
+    seeds = np.random.SeedSequence(seed).spawn(processes)
+    shares = [restarts // processes + (i < restarts % processes) for i in range(processes)]
+    tasks = list(zip(itertools.repeat(problem), shares, seeds))
+    if processes == 1:
+        results = [peak_restart_worker(*tasks[0])]
+    else:
+        with multiprocessing.Pool(processes) as pool:
+            results = pool.starmap(peak_restart_worker, tasks)
+    return max(results, key=lambda result: result[1])
+
+
+def peak_simulated_annealing(problem, walkers=100, schedule=exp_schedule(), seed=None):
+    """Simulated annealing on a PeakFindingProblem with many walkers at once,
+    starting at the initial state and at walkers - 1 random ones. At each step
+    every walker tries one random move, accepted as in simulated_annealing;
+    moves off the grid are not taken. Returns the (state, value) of the highest
+    state any walker visited."""
+    random_state = np.random.default_rng(seed)
+    moves = problem.move_array()
+    grid = problem.grid_array()
+    states = problem.random_states(walkers, random_state)
+    states[0] = problem.initial
+    values = grid[states[:, 0], states[:, 1]]
+    best = int(values.argmax())
+    best_state, best_value = states[best].copy(), values[best]
+    rows = np.arange(walkers)
+    for t in range(sys.maxsize):
+        T = schedule(t)
+        if T == 0:
+            break
+        neighbours, neighbour_values = problem.neighbour_values(states, moves)
+        choice = random_state.integers(len(moves), size=walkers)
+        delta = neighbour_values[rows, choice] - values
+        accept = np.isfinite(delta) & ((delta > 0) | (random_state.random(walkers) < np.exp(np.minimum(delta, 0) / T)))
+        states[accept] = neighbours[accept, choice[accept]]
+        values[accept] = neighbour_values[accept, choice[accept]]
+        best = int(values.argmax())
+        if values[best] > best_value:
+            best_state, best_value = states[best].copy(), values[best]
+    return tuple(best_state.tolist()), float(best_value)
+
+
+# ______________________________________________________________________________
+# Searching nondeterministic problems
+
+
+def and_or_graph_search(problem, stats=None):
+    """[Figure 4.11] Find a conditional plan for a problem whose result() returns
+    the list of states an action may lead to. A plan is [] at a goal, or
+    [action, {state: plan, ...}] with a plan for every outcome of action; plans
+    of states reached along several branches are shared, not copied.
+    Every state solved keeps its plan, and every state that fails whatever
+    path led to it is remembered as failed (a transposition table), so shared
+    subproblems are solved once. A state failing only because its outcomes lead
+    back onto the current path is not remembered, as it may succeed from
+    elsewhere. Returns the plan, or None if there is no plan without loops;
+    stats, if given, gets the numbers of states expanded and of table hits."""
+    solved = {}
+    failed = set()
+    path = set()
+    counts = {'expanded': 0, 'table_hits': 0}
+
+    def or_search(state):
+        """Return (plan, cut): a plan for state, or None and whether the failure
+        depended on the path."""
+        key = state_key(state)
+        if problem.goal_test(state):
+            return [], False
+        if key in solved or key in failed:
+            counts['table_hits'] += 1
+            return solved.get(key), False
+        if key in path:
+            return None, True
+        counts['expanded'] += 1
+        path.add(key)
+        cut = False
+        try:
+            for action in problem.actions(state):
+                plan, action_cut = and_search(problem.result(state, action))
+                cut = cut or action_cut
+                if plan is not None:
+                    solved[key] = [action, plan]
+                    return solved[key], False
+        finally:
+            path.discard(key)
+        if not cut:
+            failed.add(key)
+        return None, cut
+
+    def and_search(states):
+        plan = {}
+        cut = False
+        for s in states:
+            subplan, state_cut = or_search(s)
+            cut = cut or state_cut
+            if subplan is None:
+                return None, cut
+            plan[s] = subplan
+        return plan, cut
+
+    plan = or_search(problem.initial)[0]
+    if stats is not None:
+        stats.update(counts)
+    return plan
+
+
+def lao_star_search(problem, h=None, epsilon=1e-6, max_iterations=100000, stats=None):
+    """LAO* for nondeterministic problems whose plans may need loops, such as a
+    vacuum whose moves can fail. Each outcome of an action counts as equally
+    likely, an action costing problem.outcomes(state, action)[1] if the problem
+    has outcomes(), 1 otherwise. Starting from the initial state only, the best
+    partial policy is followed depth first; states it reaches that were never
+    expanded are expanded, their successors valued by h (0 by default, which is
+    admissible), and every state on the way is given a Bellman backup on the way
+    back. This stops once a pass expands nothing, changes no value by more
+    than epsilon and leaves the policy as it was. Values are memoized per state,
+    so a state shared by several branches, or reached again through a loop, is
+    expanded once. Returns the policy {state: action} over every non-goal state
+    it can reach from the initial state, whatever the outcomes, or None if
+    no policy reaches a goal within max_iterations passes; stats, if given,
+    gets the expected cost, the states expanded and the passes made."""
+    h = h or (lambda state: 0)
+    outcomes = getattr(problem, 'outcomes', lambda state, action: (problem.result(state, action), 1))
+    inf = float('inf')
+    values = {}
+    actions = {}  # state key -> [(action, [(successor, key)], cost)] once expanded
+    policy = {}
+    states = {}
+
+    def value(key, state):
+        if key not in values:
+            values[key] = 0 if problem.goal_test(state) else h(state)
+            states[key] = state
+        return values[key]
+
+    def expand(key, state):
+        options = []
+        for action in problem.actions(state):
+            results, cost = outcomes(state, action)
+            options.append((action, [(s, state_key(s)) for s in results], cost))
+        actions[key] = options
+
+    def chosen(key):
+        """The (successor, key) pairs the policy's action at key may lead to."""
+        for action, successors, cost in actions[key]:
+            if action == policy[key]:
+                return successors
+        return []
+
+    def backup(key):
+        """Bellman backup of key; returns how much its value changed."""
+        best, best_action = inf, None
+        for action, successors, cost in actions[key]:
+            q = cost + sum(value(k, s) for s, k in successors) / len(successors)
+            if q < best:
+                best, best_action = q, action
+        change = abs(best - values[key]) if best < inf or values[key] < inf else 0
+        values[key] = best
+        policy[key] = best_action
+        return change
+
+    start_key = state_key(problem.initial)
+    value(start_key, problem.initial)
+    expanded_count = 0
+    for iteration in range(1, max_iterations + 1):
+        expanded = False
+        residual = 0.0
+        previous = dict(policy)
+        visited = {start_key}
+        stack = [(start_key, False)]
+        while stack:  # depth-first over the best partial policy, backing up in postorder
+            key, done = stack.pop()
+            state = states[key]
+            if done:
+                residual = max(residual, backup(key))
+                continue
+            if problem.goal_test(state):
+                continue
+            if key not in actions:
+                expand(key, state)
+                expanded = True
+                expanded_count += 1
+                backup(key)
+                residual = inf
+            stack.append((key, True))
+            if policy.get(key) is None:
+                continue
+            for s, k in chosen(key):
+                if k not in visited:
+                    visited.add(k)
+                    value(k, s)
+                    stack.append((k, False))
+        if not expanded and residual < epsilon and policy == previous:
+            break
+    else:
+        iteration = None
+    cost = values[start_key]
+    if stats is not None:
+        stats.update(cost=cost, expanded=expanded_count, iterations=iteration)
+    if iteration is None or cost == inf:
+        return None
+    # Walk the final policy from the initial state, following every outcome.
+    result = {}
+    reached = {start_key}
+    stack = [start_key]
+    while stack:
+        key = stack.pop()
+        if problem.goal_test(states[key]):
+            continue
+        result[states[key]] = policy[key]
+        for s, k in chosen(key):
+            if k not in reached:
+                reached.add(k)
+                stack.append(k)
+    return result
+
+
 # _____________________________________________________________________________
 # The remainder of this file implements examples for the search algorithms.
 
@@ -320,7 +1084,8 @@ class Graph:
     inverse link is also added. You can use g.nodes() to get a list of nodes,
     g.get('A') to get a dict of links out of A, and g.get('A', 'B') to get the
     length of the link from A to B. 'Lengths' can actually be any object at
-    all, and nodes can be any hashable object."""
+    all, and nodes can be any hashable object. Once built, g.freeze() gives a
+    compact read-only copy for searching (see CSRGraph)."""
 
     def __init__(self, graph_dict=None, directed=True):
         self.graph_dict = graph_dict or {}
@@ -349,7 +1114,9 @@ class Graph:
         """Return a link distance or a dict of {node: distance} entries.
         .get(a,b) returns the distance or None;
         .get(a) returns a dict of {node: distance} entries, possibly {}."""
-        links = self.graph_dict.setdefault(a, {})
+        links = self.graph_dict.get(a)
+        if links is None:
+            return {} if b is None else None
         if b is None:
             return links
         else:
@@ -357,17 +1124,112 @@ class Graph:
 
     def nodes(self):
         """Return a list of nodes in the graph."""
-        s1 = set([k for k in self.graph_dict.keys()])
-        s2 = set([k2 for v in self.graph_dict.values() for k2, v2 in v.items()])
-        nodes = s1.union(s2)
+        nodes = set(self.graph_dict)
+        for links in self.graph_dict.values():
+            nodes.update(links)
         return list(nodes)
 
+    def freeze(self):
+        """Return a CSRGraph with the same nodes and links."""
+        return CSRGraph(self)
+
 
 def UndirectedGraph(graph_dict=None):
     """Build a Graph where every edge (including future ones) goes both ways."""
     return Graph(graph_dict=graph_dict, directed=False)
 
 
+class CSRGraph:
+    """A read-only graph in compressed sparse row form, made by Graph.freeze().
+    Node i is names[i] and index maps a node back to its number. The links out
+    of node i go to the nodes targets[offsets[i]:offsets[i + 1]], in increasing
+    order, with the matching lengths in weights. Three flat NumPy arrays take a
+    fraction of the memory of a dict per node, which matters for graphs of
+    millions of links such as road networks. get() and nodes() behave as for
+    Graph, so GraphProblem can search either; lengths must be numbers.
+    Single nodes are looked up through memoryviews of the arrays, which cost
+    no copies and avoid the overhead of NumPy calls on tiny slices."""
+
+    def __init__(self, graph):
+        self.directed = graph.directed
+        graph_dict = graph.graph_dict
+        self.index = {node: i for i, node in enumerate(graph_dict)}
+        for links in graph_dict.values():
+            for node in links:
+                if node not in self.index:
+                    self.index[node] = len(self.index)
+        self.names = list(self.index)
+        if hasattr(graph, 'locations'):
+            self.locations = graph.locations
+
+        n = len(self.names)
+        count = sum(len(links) for links in graph_dict.values())
+        dtype = np.int32 if n < 2 ** 31 else np.int64
+        index = self.index
+        sources = np.fromiter((index[a] for a, links in graph_dict.items() for _ in links), dtype, count)
+        targets = np.fromiter((index[b] for links in graph_dict.values() for b in links), dtype, count)
+        weights = np.array([d for links in graph_dict.values() for d in links.values()])
+        if weights.dtype.kind not in 'iuf' and count:
+            raise ValueError('CSRGraph needs numeric link lengths, not {}'.format(weights.dtype))
+        order = np.lexsort((targets, sources))
+        self.targets = targets[order]
+        self.weights = weights[order]
+        self.offsets = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=n), out=self.offsets[1:])
+        self.offset_view = memoryview(self.offsets)
+        self.target_view = memoryview(self.targets)
+        self.weight_view = memoryview(self.weights)
+
+    def span(self, a):
+        """Return (start, end), the range of the links out of a, empty if a is unknown."""
+        i = self.index.get(a)
+        if i is None:
+            return 0, 0
+        return self.offset_view[i], self.offset_view[i + 1]
+
+    def links(self, a):
+        """Return (targets, weights), the arrays of the links out of a."""
+        start, end = self.span(a)
+        return self.targets[start:end], self.weights[start:end]
+
+    def get(self, a, b=None):
+        """As Graph.get: .get(a, b) returns the distance or None;
+        .get(a) returns a new dict of {node: distance} entries, possibly {}."""
+        start, end = self.span(a)
+        if b is None:
+            names = self.names
+            return {names[j]: d for j, d in zip(self.target_view[start:end].tolist(),
+                                                 self.weight_view[start:end].tolist())}
+        j = self.index.get(b)
+        if j is None:
+            return None
+        k = bisect.bisect_left(self.target_view, j, start, end)
+        if k < end and self.target_view[k] == j:
+            return self.weight_view[k]
+        return None
+
+    def neighbours(self, a):
+        """Return a list of the nodes a links to."""
+        start, end = self.span(a)
+        names = self.names
+        return [names[j] for j in self.target_view[start:end].tolist()]
+
+    def expand(self, ids):
+        """Follow the links out of all the nodes numbered ids at once, as a whole
+        frontier is expanded in a breadth-first or Dijkstra sweep.
+        Returns (sources, targets, weights), one entry per link, in node numbers."""
+        ids = np.asarray(ids, dtype=self.targets.dtype)
+        starts = self.offsets[ids]
+        counts = self.offsets[ids + 1] - starts
+        firsts = np.cumsum(counts) - counts
+        positions = np.arange(counts.sum()) + np.repeat(starts - firsts, counts)
+        return np.repeat(ids, counts), self.targets[positions], self.weights[positions]
+
+    def nodes(self):
+        """Return a list of nodes in the graph."""
+        return list(self.names)
+
+
 def RandomGraph(nodes=list(range(10)), min_links=2, width=400, height=300,
                 curvature=lambda: random.uniform(1.1, 1.5)):
     """Construct a random graph, with the specified nodes, and random links.
@@ -375,50 +1237,107 @@ def RandomGraph(nodes=list(range(10)), min_links=2, width=400, height=300,
     Then each node is connected to the min_links nearest neighbors.
     Because inverse links are added, some nodes will have more connections.
     The distance between nodes is the hypotenuse times curvature(),
-    where curvature() defaults to a random number between 1.1 and 1.5."""
+    where curvature() defaults to a random number between 1.1 and 1.5.
+    Nearest neighbors are looked up in a LocationGrid, so graphs of 100k
+    nodes build in seconds."""
     g = UndirectedGraph()
     g.locations = {}
     # Build the cities
     for node in nodes:
         g.locations[node] = (random.randrange(width), random.randrange(height))
+        g.graph_dict.setdefault(node, {})
+    grid = LocationGrid(nodes, g.locations, width, height)
     # Build roads from each city to at least min_links nearest neighbors.
     for i in range(min_links):
         for node in nodes:
             if len(g.get(node)) < min_links:
                 here = g.locations[node]
-
-                def distance_to_node(n):
-                    if n is node or g.get(node, n):
-                        return np.inf
-                    return distance(g.locations[n], here)
-
-                neighbor = min(nodes, key=distance_to_node)
+                neighbor = grid.nearest(here, lambda n: n is node or g.get(node, n))
                 d = distance(g.locations[neighbor], here) * curvature()
                 g.connect(node, neighbor, int(d))
     return g
 
 
+class LocationGrid:
+    """Buckets nodes with integer locations on a width x height rectangle into
+    square cells holding about two nodes each, for nearest neighbor queries."""
+
+    def __init__(self, nodes, locations, width, height):
+        self.nodes = list(nodes)
+        self.locations = locations
+        self.size = max(1, int(math.sqrt(2 * width * height / max(len(self.nodes), 1))))
+        self.columns = width // self.size + 1
+        self.rows = height // self.size + 1
+        self.buckets = {}
+        for i, node in enumerate(self.nodes):
+            x, y = locations[node]
+            self.buckets.setdefault((x // self.size, y // self.size), []).append(i)
+
+    @staticmethod
+    def ring(cx, cy, r):
+        """The cells r steps away from cell (cx, cy), counting diagonal steps."""
+        if r == 0:
+            yield cx, cy
+            return
+        for x in range(cx - r, cx + r + 1):
+            yield x, cy - r
+            yield x, cy + r
+        for y in range(cy - r + 1, cy + r):
+            yield cx - r, y
+            yield cx + r, y
+
+    def nearest(self, here, excluded):
+        """The node nearest to here for which excluded(node) is false, the first
+        in order among equally near ones, as min() over the nodes would pick.
+        If every node is excluded, that is the first node."""
+        hx, hy = here
+        cx, cy = hx // self.size, hy // self.size
+        best = None
+        for r in range(max(cx, cy, self.columns - cx, self.rows - cy) + 1):
+            for cell in self.ring(cx, cy, r):
+                for i in self.buckets.get(cell, ()):
+                    x, y = self.locations[self.nodes[i]]
+                    key = ((x - hx) ** 2 + (y - hy) ** 2, i)
+                    if (best is None or key < best) and not excluded(self.nodes[i]):
+                        best = key
+            # Cells further out are more than r * size away.
+            if best is not None and best[0] <= (r * self.size) ** 2:
+                break
+        return self.nodes[best[1] if best is not None else 0]
+
+
 
 class GraphProblem(Problem):
-    """The problem of searching a graph from one node to another."""
+    """The problem of searching a graph from one node to another.
+    landmarks, if given, is a GraphLandmarks for the graph (see landmarks.py)
+    whose bounds sharpen the heuristic."""
 
-    def __init__(self, initial, goal, graph):
+    def __init__(self, initial, goal, graph, landmarks=None):
         super().__init__(initial, goal)
         self.graph = graph
+        self.landmarks = landmarks
+        self.landmark_bounds = None
+        if landmarks is not None:
+            self.landmark_bounds = landmarks.bounds([landmarks.index[goal]]).tolist()
 
     def actions(self, A):
         """The actions at a graph node are just its neighbors."""
+        if isinstance(self.graph, CSRGraph):
+            return self.graph.neighbours(A)
         return list(self.graph.get(A).keys())
 
     def result(self, state, action):
         """The result of going to a neighbor is just that neighbor."""
         return action
 
-    def path_cost(self, cost_so_far, A, action, B):
-        return cost_so_far + (self.graph.get(A, B) or np.inf)
+    def path_cost(self, curNode, A, action, B):
+        """Node.child_node passes the node reached so far, as for VacuumPlanning."""
+        return curNode.path_cost + (self.graph.get(A, B) or np.inf)
 
     def find_min_edge(self):
         """Find minimum value of edges."""
+        if isinstance(self.graph, CSRGraph):
+            return self.graph.weights.min() if len(self.graph.weights) else np.inf
         m = np.inf
         for d in self.graph.graph_dict.values():
             local_min = min(d.values())
@@ -427,15 +1346,15 @@ class GraphProblem(Problem):
         return m
 
     def h(self, node):
-        """h function is straight-line distance from a node's state to goal."""
+        """h function is straight-line distance from a node's state to goal, or
+        the landmark bound if that is larger."""
+        state = node if type(node) is str else node.state
         locs = getattr(self.graph, 'locations', None)
-        if locs:
-            if type(node) is str:
-                return int(distance(locs[node], locs[self.goal]))
-
-            return int(distance(locs[node.state], locs[self.goal]))
-        else:
-            return np.inf
+        h = int(distance(locs[state], locs[self.goal])) if locs else None
+        if self.landmark_bounds is not None:
+            bound = self.landmark_bounds[self.landmarks.index[state]]
+            h = bound if h is None else max(h, bound)
+        return np.inf if h is None else h
 
 
 class GraphProblemStochastic(GraphProblem):
@@ -444,14 +1363,44 @@ class GraphProblemStochastic(GraphProblem):
     nondeterministic output i.e. multiple possible states.
 
     Define the graph as dict(A = dict(Action = [[<Result 1>, <Result 2>, ...], <cost>], ...), ...)
+    or, for actions that cost 1, as dict(A = dict(Action = [<Result 1>, <Result 2>, ...], ...), ...).
     A the dictionary format is different, make sure the graph is created as a directed graph.
+    Search it with and_or_graph_search, or lao_star_search if plans may need loops.
     """
 
-    def result(self, state, action):
-        return self.graph.get(state, action)
+    def outcomes(self, state, action):
+        """Return (results, cost): the list of states action may lead to and its cost."""
+        entry = self.graph.get(state, action)
+        if len(entry) == 2 and isinstance(entry[0], list):
+            return entry[0], entry[1]
+        return entry, 1
 
-    def path_cost(self):
-        raise NotImplementedError
+    def result(self, state, action):
+        return self.outcomes(state, action)[0]
+
+    def path_cost(self, curNode, state1, action, state2):
+        return curNode.path_cost + self.outcomes(state1, action)[1]
+
+
+# The erratic vacuum world of [Figure 4.9]: two rooms, Left and Right. Sucking a
+# dirty room sometimes cleans the other one too; sucking a clean one sometimes
+# leaves dirt behind. State_7 and State_8 are the clean states.
+erratic_vacuum_world = Graph(dict(
+    State_1=dict(Suck=['State_7', 'State_5'], Right=['State_2']),
+    State_2=dict(Suck=['State_8', 'State_4'], Left=['State_1']),
+    State_3=dict(Suck=['State_7'], Right=['State_4']),
+    State_4=dict(Suck=['State_4', 'State_2'], Left=['State_3']),
+    State_5=dict(Suck=['State_5', 'State_1'], Right=['State_6']),
+    State_6=dict(Suck=['State_8'], Left=['State_5']),
+    State_7=dict(Suck=['State_7', 'State_3'], Right=['State_8']),
+    State_8=dict(Suck=['State_8', 'State_6'], Left=['State_7'])
+))
+
+# The same world for a vacuum whose wheels slip: a move may leave it where it
+# was. Only plans with loops ("move until you get there") solve it.
+slippery_vacuum_world = Graph({state: {action: results + [state] if action != 'Suck' else results
+                                       for action, results in actions.items()}
+                               for state, actions in erratic_vacuum_world.graph_dict.items()})
 
 
 # ______________________________________________________________________________
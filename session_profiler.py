@@ -0,0 +1,157 @@
+"""
+Profiling a whole session of the simulator, phase by phase.
+
+SessionProfiler ## Runs cProfile around each call of the instrumented methods,
+                   keeping separate statistics per phase, while a sampling
+                   thread collects the stacks the time is spent in
+
+A phase is a method instrumented with instrument(), e.g. Gui.update_env or
+VacuumPlanning.generateSolution. Each phase has its own cProfile.Profile, which
+is enabled for the duration of every call and so adds up over the session. A
+phase called from within another (generateSolution from update_env) is counted
+in the inner phase only: cProfile can only run one profiler at a time, so the
+outer one is paused meanwhile. The time printed for a phase is the wall-clock
+time of its calls, phases called from within included.
+
+The sampling thread looks at the stack of the profiled thread every interval
+seconds while a phase runs and counts each stack it sees. Those counts are
+written as collapsed stacks, one "phase;outermost;...;innermost count" line per
+stack, the input of flame graph tools such as flamegraph.pl or speedscope.
+
+dump() writes PREFIX.<phase>.pstats for each phase (read them with pstats or
+snakeviz) and PREFIX.collapsed, and prints the time spent in each phase. The
+entry points call it when the session ends, see --profile.
+"""
+
+import atexit
+import collections
+import contextlib
+import cProfile
+import functools
+import os.path
+import pstats
+import sys
+import threading
+import time
+
+
+class SessionProfiler:
+    """Per-phase profiles of the calls made on thread (the current one by
+    default), written to files starting with prefix. Stacks are sampled every
+    interval seconds; no sampling thread is started if interval is 0."""
+
+    def __init__(self, prefix, interval=0.005, thread=None):
+        self.prefix = prefix
+        self.interval = interval
+        self.thread_id = (thread or threading.current_thread()).ident
+        self.profiles = {}
+        self.calls = collections.Counter()
+        self.seconds = collections.Counter()
+        self.samples = collections.Counter()
+        self.active = []  # the phases being run, innermost last
+        self.stopped = threading.Event()
+        self.sampler = None
+        if interval > 0:
+            self.sampler = threading.Thread(target=self.sample, name='SessionProfiler', daemon=True)
+            self.sampler.start()
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """Profile the body of the with statement as part of phase name."""
+        profile = self.profiles.get(name)
+        if profile is None:
+            profile = self.profiles[name] = cProfile.Profile()
+        outer = self.profiles[self.active[-1]] if self.active else None
+        if outer is not None:
+            outer.disable()
+        self.active.append(name)
+        start = time.perf_counter()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            self.seconds[name] += time.perf_counter() - start
+            self.calls[name] += 1
+            self.active.pop()
+            if outer is not None:
+                outer.enable()
+
+    def instrument(self, cls, name, phase=None):
+        """Replace method name of cls by one that runs as phase, by default
+        'Class.method'. Returns the original method."""
+        method = getattr(cls, name)
+        phase = phase or '{}.{}'.format(cls.__name__, name)
+
+        @functools.wraps(method)
+        def profiled(*args, **kwargs):
+            with self.phase(phase):
+                return method(*args, **kwargs)
+
+        setattr(cls, name, profiled)
+        return method
+
+    def sample(self):
+        """Body of the sampling thread."""
+        while not self.stopped.wait(self.interval):
+            try:
+                phase = self.active[-1]
+            except IndexError:  # no phase running
+                continue
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                if code.co_filename != __file__:  # leave out the wrappers of instrument()
+                    stack.append('{} ({}:{})'.format(code.co_name, os.path.basename(code.co_filename),
+                                                     code.co_firstlineno))
+                frame = frame.f_back
+            if stack:
+                stack.append(phase)
+                self.samples[';'.join(reversed(stack))] += 1
+
+    def stop(self):
+        """Stop the sampling thread."""
+        self.stopped.set()
+        if self.sampler is not None:
+            self.sampler.join()
+
+    def dump(self):
+        """Stop sampling, write the statistics of each phase and the collapsed
+        stacks, and print a summary. Returns the names of the files written."""
+        self.stop()
+        written = []
+        for name, profile in sorted(self.profiles.items()):
+            path = '{}.{}.pstats'.format(self.prefix, name)
+            profile.dump_stats(path)
+            written.append(path)
+        path = self.prefix + '.collapsed'
+        with open(path, 'w') as out:
+            for stack, count in sorted(self.samples.items()):
+                out.write('{} {}\n'.format(stack, count))
+        written.append(path)
+        print(self.summary())
+        print('profile written to', ', '.join(written))
+        return written
+
+    def summary(self, top=5):
+        """The time spent in each phase, with the functions that took most of it."""
+        lines = ['{:<36} {:>7} {:>10} {:>10}'.format('phase', 'calls', 'total s', 'per call ms')]
+        for name, seconds in self.seconds.most_common():
+            calls = self.calls[name]
+            lines.append('{:<36} {:>7} {:>10.3f} {:>10.2f}'.format(name, calls, seconds, seconds / calls * 1000))
+            stats = pstats.Stats(self.profiles[name])
+            for (filename, line, function), (_, _, own, _, _) in sorted(
+                    stats.stats.items(), key=lambda item: -item[1][2])[:top]:
+                lines.append('    {:>8.3f} s  {} ({}:{})'.format(own, function, os.path.basename(filename), line))
+        return '\n'.join(lines)
+
+
+def profile_session(prefix, interval_ms, methods):
+    """Instrument methods, (class, name) pairs, with a new SessionProfiler that
+    dumps its files when the interpreter exits. Returns the profiler."""
+    profiler = SessionProfiler(prefix, interval_ms / 1000)
+    for cls, name in methods:
+        profiler.instrument(cls, name)
+    atexit.register(profiler.dump)
+    return profiler
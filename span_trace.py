@@ -0,0 +1,103 @@
+"""
+Timeline tracing of a session: when each step, plan and redraw ran, and for how long.
+
+SpanTracer ## Records spans, i.e. named calls with their start and end times,
+              in a ring buffer, and writes them as a Chrome trace
+
+instrument() wraps a method so that each call is recorded as a span. Nothing is
+wrapped unless tracing is asked for (see --trace), so the simulator runs exactly
+as before when it is off. When it is on, recording a span costs two clock reads
+and a few stores into arrays allocated up front; once the buffer is full the
+oldest spans are overwritten, so a long session keeps its last capacity spans in
+constant memory.
+
+write() saves the spans in the Chrome trace event format, as "complete" events
+with microsecond timestamps, one row per thread. Open the file in Perfetto
+(ui.perfetto.dev) or chrome://tracing to see the calls nested in time.
+"""
+
+import array
+import atexit
+import functools
+import itertools
+import json
+import os
+import threading
+import time
+
+
+class SpanTracer:
+    """A ring buffer of the last capacity spans."""
+
+    def __init__(self, capacity=1 << 16):
+        self.capacity = capacity
+        self.names = [None] * capacity
+        self.starts = array.array('q', bytes(8 * capacity))  # time.perf_counter_ns() at the start and the end
+        self.ends = array.array('q', bytes(8 * capacity))
+        self.threads = array.array('Q', bytes(8 * capacity))
+        self.counter = itertools.count()  # next() is atomic, so spans can come from several threads
+        self.origin = time.perf_counter_ns()
+
+    def record(self, name, start, end):
+        i = next(self.counter) % self.capacity
+        self.names[i] = name
+        self.starts[i] = start
+        self.ends[i] = end
+        self.threads[i] = threading.get_ident()
+
+    def instrument(self, cls, name, span=None):
+        """Replace method name of cls by one that records each call as a span
+        named span, by default 'Class.method'. Returns the original method."""
+        method = getattr(cls, name)
+        span = span or '{}.{}'.format(cls.__name__, name)
+        clock = time.perf_counter_ns
+        record = self.record
+
+        @functools.wraps(method)
+        def traced(*args, **kwargs):
+            start = clock()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                record(span, start, clock())
+
+        setattr(cls, name, traced)
+        return method
+
+    def spans(self):
+        """The recorded spans as (name, start, end, thread) tuples, oldest first."""
+        spans = [(self.names[i], self.starts[i], self.ends[i], self.threads[i])
+                 for i in range(self.capacity) if self.names[i] is not None]
+        spans.sort(key=lambda span: span[1])
+        return spans
+
+    def trace_events(self):
+        """The spans as a list of Chrome trace events."""
+        pid = os.getpid()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        events = []
+        threads = set()
+        for name, start, end, thread in self.spans():
+            threads.add(thread)
+            events.append({'name': name, 'ph': 'X', 'pid': pid, 'tid': thread,
+                           'ts': (start - self.origin) / 1000, 'dur': (end - start) / 1000})
+        for thread in sorted(threads):
+            events.append({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': thread,
+                           'args': {'name': names.get(thread, 'thread {}'.format(thread))}})
+        return events
+
+    def write(self, path):
+        """Write the spans to path as a Chrome trace JSON file."""
+        with open(path, 'w') as out:
+            json.dump({'traceEvents': self.trace_events(), 'displayTimeUnit': 'ms'}, out)
+        print('trace of {} spans written to {}'.format(sum(name is not None for name in self.names), path))
+
+
+def trace_session(path, capacity, methods):
+    """Instrument methods, (class, name) pairs, with a new SpanTracer that writes
+    its trace to path when the interpreter exits. Returns the tracer."""
+    tracer = SpanTracer(capacity)
+    for cls, name in methods:
+        tracer.instrument(cls, name)
+    atexit.register(tracer.write, path)
+    return tracer
@@ -0,0 +1,45 @@
+"""Reference implementations shared by the tests of the grid planners."""
+
+import collections
+
+from coverage_planning import MOVES
+
+# The step of each move action.
+STEPS = {action: move for move, action in MOVES.items()}
+
+
+def random_walls(rng, width, height, density=0.25):
+    """Each room of a width x height grid is a wall with probability density."""
+    return {(x, y) for x in range(width) for y in range(height) if rng.random() < density}
+
+
+def replay(width, height, walls, start, actions):
+    """Follow actions from start, checking that every move stays on the grid and
+    off the walls. Returns the rooms along the way, start included, and the
+    rooms sucked."""
+    x, y = start
+    rooms, sucked = [(x, y)], []
+    for action in actions:
+        if action == 'Suck':
+            sucked.append((x, y))
+            continue
+        dx, dy = STEPS[action]
+        x, y = x + dx, y + dy
+        assert 0 <= x < width and 0 <= y < height and (x, y) not in walls
+        rooms.append((x, y))
+    return rooms, sucked
+
+
+def bfs_distances(width, height, walls, sources):
+    """Moves from the nearest of sources to every room of a width x height grid
+    they can reach, by plain breadth-first search, as a dict."""
+    distances = {tuple(source): 0 for source in sources if tuple(source) not in walls}
+    frontier = collections.deque(distances)
+    while frontier:
+        x, y = cell = frontier.popleft()
+        for dx, dy in MOVES:
+            child = (x + dx, y + dy)
+            if 0 <= child[0] < width and 0 <= child[1] < height and child not in walls and child not in distances:
+                distances[child] = distances[cell] + 1
+                frontier.append(child)
+    return distances
@@ -0,0 +1,107 @@
+from agents_and_environments import Agent, Dirt, Wall, XYEnvironment
+from vacuum_planning import plan_snapshot
+
+
+def small_world():
+    env = XYEnvironment(6, 5)
+    env.add_walls()
+    agent = Agent(lambda percept: 'NoOp')
+    env.add_thing(agent, (1, 1))
+    env.add_thing(Wall(), (3, 2))
+    env.add_thing(Dirt(), (4, 3))
+    return env, agent
+
+
+def test_snapshot_does_not_follow_later_changes():
+    env, agent = small_world()
+    before = env.snapshot()
+    env.add_thing(Dirt(), (2, 3))
+    env.move_to(agent, (2, 1))
+    after = env.snapshot()
+    assert before.dirt == {(4, 3)} and before.agents == ((1, 1),)
+    assert after.dirt == {(4, 3), (2, 3)} and after.agents == ((2, 1),)
+    assert before.fingerprint != after.fingerprint
+
+
+def test_consecutive_snapshots_share_unchanged_sets():
+    env, agent = small_world()
+    first = env.snapshot()
+    assert env.snapshot() is first
+    env.move_to(agent, (2, 1))
+    moved = env.snapshot()
+    assert moved.walls is first.walls and moved.dirt is first.dirt
+    env.add_thing(Dirt(), (2, 3))
+    dirtier = env.snapshot()
+    assert dirtier.walls is first.walls and dirtier.dirt is not first.dirt
+
+
+def test_with_changes_matches_the_same_change_made_live():
+    env, _ = small_world()
+    variant = env.snapshot().with_changes(add_walls=[(2, 2)], remove_dirt=[(4, 3)], add_dirt=[(1, 3)])
+    env.add_thing(Wall(), (2, 2))
+    for dirt in env.list_things_at((4, 3), Dirt):
+        env.delete_thing(dirt)
+    env.add_thing(Dirt(), (1, 3))
+    live = env.snapshot()
+    assert (variant.walls, variant.dirt) == (live.walls, live.dirt)
+    assert variant.fingerprint == live.fingerprint
+    assert variant.with_changes(agents=[(2, 1)]).walls is variant.walls
+
+
+def test_plan_snapshot_needs_no_environment():
+    env, _ = small_world()
+    snapshot = env.snapshot()
+    path, _ = plan_snapshot(snapshot, 'BFS')
+    assert tuple(path.state) == (4, 3)
+    assert path.path_cost == 5
+    assert env.snapshot() is snapshot
+
+
+def test_map_things_at_follows_adds_moves_and_deletes():
+    env, agent = small_world()
+    wall = env.list_things_at((3, 2), Wall)[0]
+    assert env.map_things_at((3, 2)) == [wall] and env.map_things_at((1, 1)) == ()
+    env.move_to(wall, (3, 3))
+    dirt = Dirt()
+    env.add_thing(dirt, (3, 3))
+    assert env.map_things_at((3, 2)) == () and env.map_things_at([3, 3]) == [wall, dirt]
+    env.delete_thing(wall)
+    assert env.map_things_at((3, 3)) == [dirt]
+
+
+class Recorder:
+    def __init__(self):
+        self.batches = []
+
+    def things_changed(self, changes):
+        self.batches.append(changes)
+
+
+def test_changes_inside_a_block_are_netted_into_one_batch():
+    env, agent = small_world()
+    recorder = Recorder()
+    env.add_observer(recorder)
+    dirt, wall = env.list_things_at((4, 3), Dirt)[0], env.list_things_at((3, 2), Wall)[0]
+    with env.changes():
+        passing = Dirt()
+        env.add_thing(passing, (2, 2))
+        env.delete_thing(passing)
+        env.move_to(agent, (2, 1))
+        env.move_to(agent, (1, 1))
+        env.delete_thing(dirt)
+        env.move_to(wall, (3, 3))
+        env.move_to(wall, (4, 2))
+    assert len(recorder.batches) == 1
+    changes = recorder.batches[0]
+    assert changes.added == {} and changes.deleted == {dirt: (4, 3)}
+    assert changes.moved == {wall: ((3, 2), (4, 2))}
+
+
+def test_nothing_changed_means_no_batch():
+    env, agent = small_world()
+    recorder = Recorder()
+    env.add_observer(recorder)
+    with env.changes():
+        env.move_to(agent, (2, 1))
+        env.move_to(agent, (1, 1))
+    assert recorder.batches == []
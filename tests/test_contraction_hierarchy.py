@@ -0,0 +1,61 @@
+import random
+
+from contraction_hierarchy import ContractionHierarchy, grid_graph
+from coverage_planning import path_actions
+from grid_helpers import random_walls
+from landmarks import dijkstra_distances
+from search_algorithms import Graph
+
+
+def path_length(graph, path):
+    return sum(graph.get(a, b) for a, b in zip(path, path[1:]))
+
+
+def test_queries_match_dijkstra_on_weighted_graphs():
+    rng = random.Random(0)
+    for _ in range(5):
+        graph = Graph(directed=False)
+        for _ in range(150):
+            a, b = rng.randrange(50), rng.randrange(50)
+            if a != b:
+                graph.connect(a, b, rng.randrange(1, 20))
+        hierarchy = ContractionHierarchy(graph)
+        frozen = graph.freeze()
+        for source in rng.sample(graph.nodes(), 6):
+            expected = dijkstra_distances(frozen.offsets, frozen.targets, frozen.weights, frozen.index[source])
+            for target in graph.nodes():
+                distance, path = hierarchy.query(source, target)
+                assert distance == expected[frozen.index[target]]
+                if path is not None:
+                    assert path[0] == source and path[-1] == target and path_length(graph, path) == distance
+
+
+def test_grid_paths_are_legal_moves_of_the_shortest_length():
+    rng = random.Random(1)
+    width, height = 20, 15
+    walls = random_walls(rng, width, height)
+    graph = grid_graph(width, height, walls)
+    hierarchy = ContractionHierarchy(graph)
+    frozen = graph.freeze()
+    free = sorted(graph.nodes())
+    for source in rng.sample(free, 5):
+        expected = dijkstra_distances(frozen.offsets, frozen.targets, frozen.weights, frozen.index[source])
+        for target in rng.sample(free, 20):
+            distance, path = hierarchy.query(source, target)
+            assert distance == expected[frozen.index[target]]
+            if path is not None:
+                assert len(path_actions(path)) == distance and not set(path) & walls
+
+
+def test_nearest_picks_the_closest_target():
+    graph = grid_graph(12, 12, {(6, y) for y in range(11)})
+    hierarchy = ContractionHierarchy(graph)
+    distance, target, path, _ = hierarchy.nearest((2, 2), [(7, 2), (2, 9), (0, 0)])
+    assert (distance, target) == (4, (0, 0)) and path[0] == (2, 2) and path[-1] == (0, 0)
+    assert hierarchy.nearest((2, 2), [(20, 20)])[:3] == (float('inf'), None, None)
+
+
+def test_unreachable_and_unknown_nodes_have_no_path():
+    hierarchy = ContractionHierarchy(grid_graph(8, 4, {(4, y) for y in range(4)}))
+    assert hierarchy.query((0, 0), (7, 3)) == (float('inf'), None)
+    assert hierarchy.query((0, 0), (4, 1)) == (float('inf'), None)
@@ -0,0 +1,52 @@
+import random
+
+from agents_and_environments import XYSnapshot
+from coverage_planning import actions_cost, cell_rooms, decompose, plan_coverage
+from grid_helpers import random_walls, replay
+from reachability import ReachabilityIndex
+from vacuum_planning import VacuumPlanning
+
+def test_every_reachable_room_is_visited_on_random_floors():
+    rng = random.Random(0)
+    for _ in range(40):
+        width, height = rng.randrange(3, 25), rng.randrange(3, 25)
+        walls = random_walls(rng, width, height)
+        free = [(x, y) for x in range(width) for y in range(height) if (x, y) not in walls]
+        start = rng.choice(free)
+        dirt = set(rng.sample(free, min(5, len(free))))
+        rooms = ReachabilityIndex(width, height, walls).component(start)
+        actions, _ = plan_coverage(rooms, start, dirt)
+        visited, sucked = replay(width, height, walls, start, actions)
+        assert set(visited) == rooms
+        assert sorted(sucked) == sorted(dirt & rooms)
+
+
+def test_cells_partition_the_rooms():
+    rooms = ReachabilityIndex(10, 10, {(4, y) for y in range(2, 8)} | {(7, 5)}).component((0, 0))
+    cells, adjacent = decompose(rooms)
+    covered = [cell_rooms(cell) for cell in cells]
+    assert set().union(*covered) == rooms and sum(map(len, covered)) == len(rooms)
+    assert all(index in adjacent[other] for index in adjacent for other in adjacent[index])
+
+
+def test_an_open_floor_is_swept_without_revisits():
+    rooms = {(x, y) for x in range(6) for y in range(4)}
+    actions, cells = plan_coverage(rooms, (0, 0))
+    assert cells == 1 and len(actions) == len(rooms) - 1
+
+
+def test_turn_costs_pick_the_orientation_with_fewer_turns():
+    rooms = {(x, y) for x in range(12) for y in range(3)}
+    actions, _ = plan_coverage(rooms, (0, 0), turn_cost=lambda previous, action: 5)
+    assert actions_cost(actions)[1] == 4  # three long rows, not twelve short columns
+
+
+def test_coverage_search_sweeps_the_component_of_the_agent():
+    walls = {(x, y) for x in range(10) for y in range(8) if x in (0, 9) or y in (0, 7) or x == 5}
+    empty = XYSnapshot(10, 8, frozenset(), frozenset(), ((2, 3),), None, 0, 0)
+    snapshot = empty.with_changes(add_walls=walls, add_dirt=[(3, 5), (7, 2)])  # (7, 2) is behind the wall
+    planner = VacuumPlanning(None, 'Coverage')
+    path, _ = planner.plan(snapshot, (2, 3))
+    assert planner.stats['rooms'] == 4 * 6 and planner.reachability.synced is snapshot.walls
+    visited, sucked = replay(10, 8, walls, (2, 3), path.solution())
+    assert set(visited) == planner.reachability.component((2, 3)) and sucked == [(3, 5)]
@@ -0,0 +1,72 @@
+import subprocess
+import sys
+
+from agents_and_environments import Dirt
+from episode_trace import TraceRecorder, TraceReplay
+from headless_runner import HeadlessVacuumEnvironment, run_episode
+
+
+def test_replay_rescores_like_the_live_run(tmp_path):
+    path = str(tmp_path / 'episode.trace')
+    result = run_episode(12, 10, 'A*', seed=3, record=path)
+    replay = TraceReplay(path)
+    assert 0 < len(replay) <= result['steps']
+    assert replay.rescore({'Suck': 10})[-1] == result['performance']
+    assert replay.state_at(replay.records['tick'][-1]).dirt == set()
+
+
+def test_suck_on_a_clean_room_scores_nothing_on_replay(tmp_path):
+    env = HeadlessVacuumEnvironment(8, 8, seed=1, dirt_count=1)
+    (dirty,) = env.dirtyRooms
+    path = str(tmp_path / 'suck.trace')
+    env.recorder = TraceRecorder(path, env)
+    env.execute_action(env.agent, 'Suck')  # the start is never dirty
+    env.agent.location = dirty
+    env.stepCount = 1
+    env.execute_action(env.agent, 'Suck')
+    env.stepCount = 2
+    env.execute_action(env.agent, 'Suck')  # clean by now
+    env.recorder.close()
+
+    replay = TraceReplay(path)
+    assert replay.records['cleaned'].tolist() == [0, 1, 0]
+    assert replay.rescore({'Suck': 10}).tolist() == [0, 10, 10]
+    assert replay.state_at(0).dirt == {dirty}
+    assert replay.state_at(1).dirt == set()
+
+
+def test_the_environment_says_whether_dirt_was_cleaned(tmp_path):
+    env = HeadlessVacuumEnvironment(8, 8, seed=1, dirt_count=1)
+    path = str(tmp_path / 'cleaned.trace')
+    with TraceRecorder(path, env) as recorder:
+        recorder.record(0, 0, 'Suck', (1, 1), 10, cleaned=False)  # scored, but the environment knows better
+        recorder.record(1, 0, 'Suck', (1, 1), 10, cleaned=True)  # cleaned without scoring
+        recorder.record(2, 0, 'Suck', (1, 1), 20)  # not said: guessed from the score
+        recorder.record(3, 0, 'Suck', (1, 1), 20)
+    assert TraceReplay(path).records['cleaned'].tolist() == [0, 1, 1, 0]
+
+
+def test_state_at_rebuilds_from_the_nearest_keyframe(tmp_path):
+    path = str(tmp_path / 'keyframes.trace')
+    env = HeadlessVacuumEnvironment(14, 12, seed=5, dirt_count=8)
+    env.recorder = TraceRecorder(path, env, keyframe_interval=4)
+    env.setSearchEngine('BFS')
+    live = {}
+    for _ in range(200):
+        if env.done:
+            break
+        env.update_env()
+        live[env.stepCount - 1] = {tuple(t.location) for t in env.things if isinstance(t, Dirt)}
+    env.recorder.close()
+
+    replay = TraceReplay(path)
+    assert len(replay.key_steps) > 2
+    for tick in sorted(live)[::3]:
+        assert replay.state_at(tick).dirt == live[tick]
+
+
+def test_record_flag_of_the_headless_runner(tmp_path):
+    path = str(tmp_path / 'cli.trace')
+    subprocess.run([sys.executable, 'headless_runner.py', '--seed', '2', '--record', path],
+                   check=True, capture_output=True)
+    assert len(TraceReplay(path)) > 0
@@ -0,0 +1,61 @@
+from agents_and_environments import Agent, Dirt, Wall, XYEnvironment
+from event_simulation import DirtArrivals, EventSimulation, rate_map
+from headless_runner import run_continuous
+from utilities import np
+
+
+def test_rate_map_fills_regions_over_the_base_rate():
+    rates = rate_map(6, 4, 0.5, [((1, 1, 3, 2), 2.0)])
+    assert rates.shape == (6, 4) and rates[1, 1] == rates[2, 1] == 2.0
+    assert rates.sum() == 0.5 * 22 + 2.0 * 2
+
+
+def test_arrivals_land_in_proportion_to_the_rates_at_the_total_rate():
+    rates = rate_map(4, 3, 0.0, [((0, 0, 1, 3), 1.0), ((3, 2, 4, 3), 3.0)])
+    arrivals = DirtArrivals(rates, np.random.default_rng(0))
+    now, counts = 0.0, {}
+    for _ in range(6000):
+        now, location = arrivals.next_arrival(now)
+        counts[location] = counts.get(location, 0) + 1
+    assert set(counts) == {(0, 0), (0, 1), (0, 2), (3, 2)}
+    assert 0.45 < counts[(3, 2)] / 6000 < 0.55
+    assert 0.9 < now / 6000 * 6 < 1.1  # mean gap 1 / 6
+
+
+def test_no_rate_means_no_arrivals():
+    assert DirtArrivals(rate_map(3, 3), np.random.default_rng(0)).next_arrival(5.0) is None
+
+
+def test_idle_agents_sleep_until_dirt_arrives():
+    env = XYEnvironment(5, 5)
+    env.add_thing(Wall(), (0, 0))
+    agent = Agent(lambda percept: 'NoOp')
+    env.add_thing(agent, (2, 2))
+    woken = []
+
+    def decide(agent):
+        woken.append(env.tick)
+        return None
+
+    simulation = EventSimulation(env, rate_map(5, 5, 0.01), seed=1, decide=decide)
+    simulation.run(10000)
+    dirt = [thing for thing in env.things if isinstance(thing, Dirt)]
+    assert len(dirt) == simulation.arrivals_added and len(woken) == 1 + simulation.arrivals_added
+    assert not env.list_things_at((0, 0), Dirt)
+    assert simulation.events < 2 * 10000 * 0.25 and env.tick == 10000
+
+
+def test_actions_take_their_duration():
+    env = XYEnvironment(3, 3)
+    agent = Agent(lambda percept: 'Wait')
+    env.add_thing(agent, (1, 1))
+    env.execute_action = lambda agent, action: None
+    simulation = EventSimulation(env, durations={'Wait': 2.5})
+    simulation.run(10)
+    assert simulation.decisions == 5  # at 0, 2.5, 5, 7.5 and 10
+
+
+def test_continuous_runs_clean_what_arrives():
+    stats = run_continuous(12, 10, 'A*', seed=3, dirt_rate=0.001, horizon=5000, dirt_count=5)
+    cleaned = 5 + stats['dirt_arrived'] - stats['dirt_left']
+    assert stats['dirt_arrived'] > 100 and stats['performance'] == 10 * cleaned
@@ -0,0 +1,80 @@
+import collections
+import random
+
+from agents_and_environments import Dirt, Wall, XYEnvironment
+from exploration import FREE, UNKNOWN, WALL, OccupancyMap
+from grid_helpers import random_walls, replay
+from headless_runner import run_episode
+
+
+def seen_world(width, height, walls, dirt):
+    env = XYEnvironment(width, height)
+    for cell in walls:
+        env.add_thing(Wall(), cell)
+    for cell in dirt:
+        env.add_thing(Dirt(), cell)
+    return env
+
+
+def nearest_goal(occupancy, start):
+    """Moves from start to the nearest dirt or frontier room other than start, by plain BFS."""
+    distances = {start: 0}
+    frontier = collections.deque([start])
+    while frontier:
+        cell = frontier.popleft()
+        if cell != start and occupancy.is_goal(cell):
+            return distances[cell]
+        for child in occupancy.neighbours(cell):
+            if child not in distances and occupancy.state(child) == FREE:
+                distances[child] = distances[cell] + 1
+                frontier.append(child)
+    return None
+
+
+def test_observe_records_only_the_rooms_in_view():
+    env = seen_world(9, 9, {(4, 5)}, {(5, 4), (8, 8)})
+    occupancy = OccupancyMap(9, 9)
+    changed = occupancy.observe((4, 4), env.map_things_at, 1.5)
+    assert sorted(changed) == sorted((x, y) for x in range(3, 6) for y in range(3, 6))
+    assert occupancy.state((4, 5)) == WALL and occupancy.state((3, 3)) == FREE
+    assert occupancy.state((4, 6)) == UNKNOWN and occupancy.dirt == {(5, 4)}
+    assert (4, 4) not in occupancy.frontier and (3, 3) in occupancy.frontier
+
+
+def test_line_of_sight_hides_rooms_behind_walls():
+    env = seen_world(9, 9, {(4, 5)}, {(4, 6)})
+    occupancy = OccupancyMap(9, 9)
+    occupancy.observe((4, 4), env.map_things_at, 3, line_of_sight=True)
+    assert occupancy.state((4, 6)) == UNKNOWN and occupancy.state((4, 7)) == UNKNOWN
+    assert occupancy.state((4, 1)) == FREE and not occupancy.dirt
+    occupancy.observe((4, 4), env.map_things_at, 3)
+    assert occupancy.dirt == {(4, 6)}
+
+
+def test_plans_lead_to_the_nearest_goal_on_random_floors():
+    rng = random.Random(0)
+    for _ in range(30):
+        width, height = rng.randrange(5, 20), rng.randrange(5, 20)
+        cells = [(x, y) for x in range(width) for y in range(height)]
+        walls = random_walls(rng, width, height)
+        env = seen_world(width, height, walls, rng.sample([c for c in cells if c not in walls], 3))
+        occupancy = OccupancyMap(width, height)
+        free = [cell for cell in cells if cell not in walls]
+        for center in rng.sample(free, 6):
+            occupancy.observe(center, env.map_things_at, rng.choice((1, 2, 3)), line_of_sight=True)
+        known = [cell for cell in free if occupancy.state(cell) == FREE]
+        for start in rng.sample(known, min(5, len(known))):
+            actions, route, _ = occupancy.plan(start)
+            expected = nearest_goal(occupancy, start)
+            if expected is None:
+                assert actions is None
+                continue
+            rooms, _ = replay(width, height, walls, start, actions)
+            assert rooms[1:] == route and all(occupancy.state(room) == FREE for room in route)
+            assert len(actions) == expected and occupancy.is_goal(rooms[-1])
+
+
+def test_explore_cleans_a_floor_it_starts_out_knowing_nothing_of():
+    for seed in range(3):
+        stats = run_episode(20, 16, 'Explore', seed)
+        assert stats['dirt_left'] == 0
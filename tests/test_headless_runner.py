@@ -0,0 +1,24 @@
+import subprocess
+import sys
+
+from headless_runner import measure_import_time, run_episode
+
+
+def test_engine_imports_without_gui_notebook_or_numpy():
+    for module in ('vacuum_planning', 'headless_runner'):
+        _, loaded = measure_import_time(module, repeat=1)
+        assert loaded == [], module
+
+
+def test_numpy_is_only_loaded_once_used():
+    code = ('import sys, types, utilities; '
+            'print(type(sys.modules.get("numpy")) is types.ModuleType and "float64" in vars(sys.modules["numpy"])); '
+            'utilities.np.zeros(1); print("float64" in vars(sys.modules["numpy"]))')
+    out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+    assert out.split() == ['False', 'True']
+
+
+def test_episode_cleans_every_dirty_room():
+    result = run_episode(16, 12, 'A*', seed=7, dirt_count=6)
+    assert result['dirt_left'] == 0
+    assert result['performance'] == 60
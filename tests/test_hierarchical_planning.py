@@ -0,0 +1,62 @@
+import random
+
+from grid_helpers import bfs_distances, random_walls, replay
+from hierarchical_planning import HierarchicalMap
+
+
+def walk(start, actions, width, height, walls):
+    """The room actions lead to from start."""
+    return replay(width, height, walls, start, actions)[0][-1]
+
+
+def test_paths_are_legal_and_found_exactly_when_reachable():
+    rng = random.Random(0)
+    for _ in range(20):
+        width, height = rng.randrange(8, 40), rng.randrange(8, 40)
+        walls = random_walls(rng, width, height)
+        hpa = HierarchicalMap(width, height, walls, cluster_size=rng.choice((3, 5, 10)))
+        free = [(x, y) for x in range(width) for y in range(height) if (x, y) not in walls]
+        for _ in range(10):
+            start, goal = rng.sample(free, 2)
+            actions, _ = hpa.find_path(start, [goal])
+            distances = bfs_distances(width, height, walls, [start])
+            if goal not in distances:
+                assert actions is None
+            else:
+                assert walk(start, actions, width, height, walls) == goal
+                assert len(actions) >= distances[goal]
+
+
+def test_open_floor_paths_are_optimal():
+    hpa = HierarchicalMap(30, 30, set(), cluster_size=10)
+    actions, _ = hpa.find_path((2, 3), [(27, 25)])
+    assert len(actions) == 25 + 22
+
+
+def test_the_nearest_of_several_goals_is_reached():
+    hpa = HierarchicalMap(20, 20, set(), cluster_size=5)
+    actions, _ = hpa.find_path((0, 0), [(19, 19), (3, 4)])
+    assert walk((0, 0), actions, 20, 20, set()) == (3, 4)
+
+
+def test_sync_matches_a_map_built_from_scratch():
+    rng = random.Random(1)
+    width, height = 30, 24
+    walls = random_walls(rng, width, height, 0.2)
+    hpa = HierarchicalMap(width, height, walls, cluster_size=6)
+    for _ in range(10):
+        walls = walls ^ random_walls(rng, width, height, 0.02)
+        hpa.sync(walls)
+        fresh = HierarchicalMap(width, height, walls, cluster_size=6)
+        assert hpa.borders == fresh.borders and hpa.intra == fresh.intra
+        assert {cell: others for cell, others in hpa.inter.items() if others} == \
+            {cell: others for cell, others in fresh.inter.items() if others}
+
+
+def test_a_wall_closing_the_only_door_cuts_the_path():
+    walls = {(5, y) for y in range(10) if y != 4}
+    hpa = HierarchicalMap(10, 10, walls, cluster_size=5)
+    assert walk((0, 0), hpa.find_path((0, 0), [(9, 9)])[0], 10, 10, walls) == (9, 9)
+    walls = walls | {(5, 4)}
+    hpa.sync(walls)
+    assert hpa.find_path((0, 0), [(9, 9)])[0] is None
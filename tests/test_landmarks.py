@@ -0,0 +1,58 @@
+import random
+
+from grid_helpers import bfs_distances
+from landmarks import GraphLandmarks, GridLandmarks, dijkstra_distances
+from search_algorithms import Graph, GraphProblem, astar_search, uniform_cost_search
+from utilities import np
+
+
+def random_digraph(seed, nodes=80, links=320):
+    rng = random.Random(seed)
+    graph = Graph()
+    for _ in range(links):
+        graph.connect('v{}'.format(rng.randrange(nodes)), 'v{}'.format(rng.randrange(nodes)), rng.randrange(1, 30))
+    return graph
+
+
+def test_graph_bounds_never_overestimate_on_a_directed_graph():
+    frozen = random_digraph(0).freeze()
+    landmarks = GraphLandmarks(frozen, count=4)
+    for goal in range(0, len(frozen.names), 9):
+        bounds = landmarks.bound(goal)
+        for node in range(len(frozen.names)):
+            true = dijkstra_distances(frozen.offsets, frozen.targets, frozen.weights, node)[goal]
+            assert bounds[node] <= true
+
+
+def test_alt_finds_optimal_paths_with_fewer_expansions():
+    graph = random_digraph(1)
+    landmarks = GraphLandmarks(graph, count=6)
+    explored_alt = explored_ucs = 0
+    for goal in ['v{}'.format(i) for i in range(1, 80, 5)]:
+        expected, explored = uniform_cost_search(GraphProblem('v0', goal, graph))
+        node, alt = astar_search(GraphProblem('v0', goal, graph, landmarks))
+        assert (node is None) == (expected is None)
+        if node is not None:
+            assert node.path_cost == expected.path_cost
+            explored_alt += len(alt)
+            explored_ucs += len(explored)
+    assert explored_alt < explored_ucs
+
+
+def test_grid_bounds_sit_between_manhattan_and_the_true_distance():
+    width, height = 16, 12
+    walls = {(8, y) for y in range(0, 11)}
+    landmarks = GridLandmarks(width, height, walls, count=4)
+    goal = (12, 2)
+    bounds = landmarks.grid_bounds([goal])
+    true = bfs_distances(width, height, walls, [goal])
+    for (x, y), moves in true.items():
+        assert abs(x - goal[0]) + abs(y - goal[1]) <= bounds[x, y] <= moves
+    assert bounds[4, 2] > 8  # around the wall, not through it
+
+
+def test_rooms_cut_off_from_the_landmarks_are_known_not_to_reach_them():
+    walls = {(5, y) for y in range(8)}
+    landmarks = GridLandmarks(10, 8, walls, count=3, start=(1, 1))
+    assert landmarks.reaches(1 * 8 + 1) and not landmarks.reaches(8 * 8 + 1)
+    assert np.all(landmarks.bound(1 * 8 + 1)[6 * 8:] == np.inf)
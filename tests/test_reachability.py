@@ -0,0 +1,40 @@
+import random
+
+from reachability import ReachabilityIndex
+
+
+def partition(index):
+    """The components of index as a set of frozensets, checked against its labels."""
+    for label, members in index.members.items():
+        assert all(index.labels[cell] == label for cell in members)
+    assert sum(len(members) for members in index.members.values()) == len(index.labels)
+    return {frozenset(members) for members in index.members.values()}
+
+
+def test_a_wall_across_a_room_splits_it_and_removing_it_merges_again():
+    index = ReachabilityIndex(9, 5, set())
+    assert index.reachable((0, 0), (8, 4))
+    for y in range(5):
+        index.add_wall((4, y))
+    assert not index.reachable((0, 0), (8, 4))
+    assert len(index.component((0, 0))) == len(index.component((8, 4))) == 20
+    index.remove_wall((4, 2))
+    assert index.reachable((0, 0), (8, 4)) and len(index.component((4, 2))) == 41
+
+
+def test_walls_and_off_grid_cells_reach_nothing():
+    index = ReachabilityIndex(4, 4, {(1, 1)})
+    assert index.label((1, 1)) is None and index.label((-1, 0)) is None and index.label((4, 0)) is None
+    assert not index.reachable((1, 1), (1, 1)) and index.component((9, 9)) == set()
+
+
+def test_incremental_edits_match_a_fresh_index():
+    rng = random.Random(0)
+    width, height = 16, 12
+    walls = {(rng.randrange(width), rng.randrange(height)) for _ in range(60)}
+    index = ReachabilityIndex(width, height, walls)
+    for _ in range(300):
+        walls = walls ^ {(rng.randrange(width), rng.randrange(height))}
+        index.sync(walls)
+        assert partition(index) == partition(ReachabilityIndex(width, height, walls))
+
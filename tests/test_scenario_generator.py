@@ -0,0 +1,79 @@
+import pytest
+
+from agents_and_environments import Wall
+from headless_runner import HeadlessVacuumEnvironment
+from scenario_generator import generate
+from utilities import np
+from wavefront import wavefront
+
+
+def reachable(scenario):
+    distances, _ = wavefront(~scenario.walls, [scenario.start])
+    return distances >= 0
+
+
+def check_floor(scenario):
+    walls = scenario.walls
+    assert walls.shape == (scenario.width, scenario.height)
+    assert walls[[0, -1], :].all() and walls[:, [0, -1]].all()
+    assert not walls[scenario.start]
+    dirt = scenario.dirt_cells()
+    assert len(set(dirt)) == len(dirt) and scenario.start not in dirt
+    assert not any(walls[room] for room in dirt)
+    assert all(0 < x < scenario.width - 1 and 0 < y < scenario.height - 1 for x, y in scenario.wall_cells())
+
+
+def test_a_seed_always_gives_the_same_scenario():
+    first = generate(40, 30, seed=5, dirt_count=12)
+    again = generate(40, 30, seed=5, dirt_count=12)
+    other = generate(40, 30, seed=6, dirt_count=12)
+    assert (first.walls == again.walls).all() and first.dirt_cells() == again.dirt_cells()
+    assert (first.walls != other.walls).any()
+    check_floor(first)
+    assert len(first.dirt_cells()) == 12
+
+
+def test_wall_and_dirt_densities():
+    scenario = generate(300, 200, seed=1, wall_density=0.2, dirt_density=0.1)
+    check_floor(scenario)
+    inner = scenario.walls[1:-1, 1:-1]
+    assert inner.mean() == pytest.approx(0.2, abs=0.01)
+    assert len(scenario.dirt) == round(0.1 * (inner.size - inner.sum() - 1))
+    drawn = [generate(20, 20, seed=seed).walls[1:-1, 1:-1].mean() for seed in range(20)]
+    assert 1 / 7 - 0.05 < min(drawn) and max(drawn) < 1 / 3 + 0.05
+
+
+def test_more_dirt_than_free_rooms_makes_every_free_room_dirty():
+    scenario = generate(12, 10, seed=2, wall_density=0.6, dirt_count=10 ** 6)
+    check_floor(scenario)
+    free = ~scenario.walls
+    free[scenario.start] = False
+    assert set(scenario.dirt_cells()) == {tuple(room) for room in np.argwhere(free).tolist()}
+
+
+@pytest.mark.parametrize('corridor_width', [0, 1, 3])
+def test_rooms_layouts_are_one_connected_floor(corridor_width):
+    for seed in range(5):
+        scenario = generate(80, 50, seed=seed, layout='rooms', room_size=7, corridor_width=corridor_width,
+                            dirt_count=30)
+        check_floor(scenario)
+        assert (reachable(scenario) == ~scenario.walls).all()
+        assert 0.05 < scenario.walls[1:-1, 1:-1].mean() < 0.6  # walled into rooms, but not solid
+
+
+def test_unknown_layouts_are_refused():
+    with pytest.raises(ValueError, match='layout'):
+        generate(10, 10, layout='maze')
+
+
+def test_a_large_floor_in_one_pass():
+    scenario = generate(1000, 1000, seed=3, dirt_density=0.01)
+    assert len(scenario.dirt) == round(0.01 * ((~scenario.walls).sum() - 1))  # the start is never dirty
+
+
+def test_headless_environment_is_built_from_its_scenario():
+    env = HeadlessVacuumEnvironment(30, 20, seed=4, layout='rooms', room_size=6, dirt_count=9)
+    scenario = generate(30, 20, seed=4, start=env.agent.location, layout='rooms', room_size=6, dirt_count=9)
+    walls = {tuple(thing.location) for thing in env.things if isinstance(thing, Wall)}
+    assert set(scenario.wall_cells()) <= walls and all(scenario.walls[room] for room in walls)
+    assert env.dirtyRooms == set(scenario.dirt_cells()) and env.dirtCount == 9
@@ -0,0 +1,362 @@
+import random
+import time
+
+import pytest
+
+from search_algorithms import (AnytimeRepairingAstar, ExploredGrid, Graph, GraphProblem, LocationGrid, PeakFindingProblem,
+                               GraphProblemStochastic, Problem, RandomGraph, and_or_graph_search,
+                               anytime_repairing_astar_search, astar_search, breadth_first_graph_search,
+                               directions8, erratic_vacuum_world, hill_climbing, lao_star_search,
+                               iterative_deepening_astar_search, peak_hill_climbing, peak_random_restarts,
+                               peak_simulated_annealing, simplified_memory_bounded_astar_search,
+                               slippery_vacuum_world, tie_breakers, uniform_cost_search, explored_grid,
+                               explored_mask)
+from utilities import np
+
+
+class Grid(Problem):
+    """Moves between the free rooms of a walled floor, to any of the goals."""
+
+    def __init__(self, width, height, walls, start, goals):
+        super().__init__(start, frozenset(goals))
+        self.width, self.height, self.walls = width, height, frozenset(walls)
+
+    def actions(self, state):
+        x, y = state
+        return [(dx, dy) for dx, dy in ((0, 1), (0, -1), (-1, 0), (1, 0))
+                if 0 <= x + dx < self.width and 0 <= y + dy < self.height and (x + dx, y + dy) not in self.walls]
+
+    def result(self, state, action):
+        return state[0] + action[0], state[1] + action[1]
+
+    def goal_test(self, state):
+        return state in self.goal
+
+    def path_cost(self, node, state1, action, state2):
+        return node.path_cost + 1
+
+    def h(self, node):
+        x, y = node.state
+        return min(abs(x - gx) + abs(y - gy) for gx, gy in self.goal)
+
+
+def border(width, height):
+    return {(x, y) for x in range(width) for y in range(height) if x in (0, width - 1) or y in (0, height - 1)}
+
+
+def random_floors(seed, count, size=14):
+    rng = random.Random(seed)
+    for _ in range(count):
+        walls = border(size, size) | {(rng.randrange(1, size - 1), rng.randrange(1, size - 1))
+                                      for _ in range(rng.randrange(10, 50))}
+        free = [(x, y) for x in range(size) for y in range(size) if (x, y) not in walls]
+        start, goal = rng.sample(free, 2)
+        yield Grid(size, size, walls, start, [goal])
+
+
+def test_sma_finds_the_optimal_path_when_the_cap_binds():
+    problem = Grid(14, 14, border(14, 14) | {(x, 8) for x in range(3, 13)}, (12, 12), [(5, 7)])
+    stats = {}
+    node, _ = simplified_memory_bounded_astar_search(problem, max_nodes=30, stats=stats)
+    assert node.path_cost == 18 and stats['peak_nodes'] == 30
+
+
+def test_sma_is_optimal_on_random_floors_whenever_the_path_fits():
+    start = time.monotonic()
+    for problem in random_floors(0, 25):
+        reference, _ = breadth_first_graph_search(problem)
+        for cap in (30, 60):
+            stats = {}
+            node, _ = simplified_memory_bounded_astar_search(problem, max_nodes=cap, stats=stats)
+            assert stats['peak_nodes'] <= cap
+            if reference is None or reference.depth >= cap - 1:
+                assert node is None or node.path_cost == reference.path_cost
+            else:
+                assert node.path_cost == reference.path_cost
+    assert time.monotonic() - start < 60
+
+
+def test_sma_fails_on_unreachable_goals_with_a_tiny_cap():
+    problem = Grid(8, 8, border(8, 8) | {(4, y) for y in range(8)}, (1, 1), [(6, 6)])
+    for cap in (2, 5, 12):
+        assert simplified_memory_bounded_astar_search(problem, max_nodes=cap)[0] is None
+
+
+def test_sma_fails_when_no_path_fits_in_memory():
+    corridor = Grid(24, 3, border(24, 3), (1, 1), [(22, 1)])  # a single path of 21 moves
+    assert simplified_memory_bounded_astar_search(corridor, max_nodes=21)[0] is None
+    assert simplified_memory_bounded_astar_search(corridor, max_nodes=23)[0].path_cost == 21
+
+
+def test_ida_counts_its_table_in_the_peak():
+    problem = Grid(14, 14, border(14, 14) | {(x, 8) for x in range(3, 13)}, (12, 12), [(5, 7)])
+    stats = {}
+    node, _ = iterative_deepening_astar_search(problem, stats=stats)
+    assert node.path_cost == 18
+    assert stats['peak_nodes'] > stats['table_size'] > 0
+
+    bounded = {}
+    node, _ = iterative_deepening_astar_search(problem, table_size=8, stats=bounded)
+    assert node.path_cost == 18 and bounded['table_size'] <= 8
+
+
+def test_ara_ends_optimal_without_a_deadline():
+    for problem in random_floors(1, 25):
+        reference, _ = breadth_first_graph_search(problem)
+        stats = {}
+        node, _ = anytime_repairing_astar_search(problem, stats=stats)
+        if reference is None:
+            assert node is None
+        else:
+            assert node.path_cost == reference.path_cost
+            assert stats['done'] and stats['bound'] == 1.0
+
+
+def test_ara_bound_holds_after_every_improvement():
+    for problem in random_floors(2, 25):
+        reference, _ = breadth_first_graph_search(problem)
+        if reference is None:
+            continue
+        search = AnytimeRepairingAstar(problem, weight=5.0, weight_step=1.0)
+        while not search.done:
+            search.improve_path(None)
+            search.update_bound()
+            assert search.solution.path_cost <= search.bound * reference.path_cost
+            if search.done:
+                break
+            search.run(0)
+
+
+def test_ara_resumes_after_its_deadline():
+    problem = Grid(14, 14, border(14, 14) | {(x, 8) for x in range(3, 13)}, (12, 12), [(5, 7)])
+    search = AnytimeRepairingAstar(problem)
+    search.run(deadline_ms=0)
+    assert not search.done and search.expanded <= 1
+    node, _ = search.run()
+    assert search.done and node.path_cost == 18
+    expanded = search.expanded
+    search.run()
+    assert search.expanded == expanded
+
+
+def test_ara_reports_no_bound_before_its_first_path():
+    problem = Grid(14, 14, border(14, 14) | {(x, 8) for x in range(1, 13)}, (12, 12), [(5, 7)])
+    stats = {}
+    node, _ = anytime_repairing_astar_search(problem, stats=stats)
+    assert node is None and stats['bound'] == float('inf') and stats['done']
+
+
+def random_digraph(seed, nodes=60, links=200):
+    rng = random.Random(seed)
+    graph = Graph()
+    for _ in range(links):
+        graph.connect(rng.randrange(nodes), 'n{}'.format(rng.randrange(nodes)) if rng.random() < 0.2
+                      else rng.randrange(nodes), rng.randrange(1, 20))
+    return graph
+
+
+def test_frozen_graph_answers_like_the_dicts():
+    graph = random_digraph(0)
+    frozen = graph.freeze()
+    assert sorted(map(str, frozen.nodes())) == sorted(map(str, graph.nodes()))
+    for a in graph.nodes() + ['missing']:
+        assert frozen.get(a) == graph.get(a)
+        assert sorted(map(str, frozen.neighbours(a))) == sorted(map(str, graph.get(a)))
+        for b in graph.nodes()[:20] + ['missing']:
+            assert frozen.get(a, b) == graph.get(a, b)
+
+
+def test_expand_follows_every_link_of_a_frontier():
+    frozen = random_digraph(1).freeze()
+    ids = [frozen.index[a] for a in frozen.nodes()[::3]]
+    sources, targets, weights = frozen.expand(ids)
+    expanded = sorted(zip(sources.tolist(), targets.tolist(), weights.tolist()))
+    expected = sorted((i, frozen.index[b], d) for i in ids for b, d in frozen.get(frozen.names[i]).items())
+    assert expanded == expected
+
+
+def test_searches_cost_the_same_on_a_frozen_graph():
+    random.seed(2)
+    graph = RandomGraph(['c{}'.format(i) for i in range(200)], min_links=3, width=300, height=300)
+    frozen = graph.freeze()
+    for goal in range(1, 40, 7):
+        expected, _ = uniform_cost_search(GraphProblem('c0', 'c{}'.format(goal), graph))
+        node, _ = astar_search(GraphProblem('c0', 'c{}'.format(goal), frozen))
+        assert node.path_cost == expected.path_cost
+
+
+def test_freezing_needs_numeric_lengths():
+    with pytest.raises(ValueError):
+        Graph({'A': {'B': 'far'}}).freeze()
+
+
+def test_location_grid_finds_the_same_neighbour_as_a_scan():
+    rng = random.Random(3)
+    nodes = list(range(300))
+    locations = {node: (rng.randrange(500), rng.randrange(200)) for node in nodes}
+    grid = LocationGrid(nodes, locations, 500, 200)
+    for _ in range(200):
+        here = (rng.randrange(500), rng.randrange(200))
+        banned = set(rng.sample(nodes, 30))
+        expected = min((n for n in nodes if n not in banned),
+                       key=lambda n: (locations[n][0] - here[0]) ** 2 + (locations[n][1] - here[1]) ** 2)
+        assert grid.nearest(here, banned.__contains__) == expected
+
+
+def test_random_graph_gives_every_node_min_links_both_ways():
+    random.seed(4)
+    nodes = list(range(500))
+    graph = RandomGraph(nodes, min_links=3, width=1000, height=1000)
+    assert all(len(graph.get(node)) >= 3 for node in nodes)
+    assert all(graph.get(b, a) == d for a in nodes for b, d in graph.get(a).items())
+
+
+def bumpy_grid(seed, n=30, m=25):
+    """Distinct values, so that climbing never meets a tie."""
+    values = list(range(n * m))
+    random.Random(seed).shuffle(values)
+    return [values[i * m:(i + 1) * m] for i in range(n)]
+
+
+def test_batched_climbing_ends_where_single_climbs_do():
+    grid = bumpy_grid(0)
+    starts = [(x, y) for x in range(0, 30, 3) for y in range(0, 25, 4)]
+    for actions in (None, directions8):
+        problems = [PeakFindingProblem(start, grid, *([actions] if actions else [])) for start in starts]
+        states, values = peak_hill_climbing(problems[0], np.array(starts))
+        assert [tuple(state) for state in states.tolist()] == [hill_climbing(problem) for problem in problems]
+        assert values.tolist() == [grid[x][y] for x, y in states.tolist()]
+
+
+def test_random_restarts_find_the_highest_peak_reproducibly():
+    grid = bumpy_grid(1, 12, 10)
+    problem = PeakFindingProblem((0, 0), grid)
+    state, value = peak_random_restarts(problem, restarts=400, seed=5, processes=1)
+    assert value == 119 and grid[state[0]][state[1]] == 119
+    assert peak_random_restarts(problem, restarts=60, seed=7, processes=2) == \
+        peak_random_restarts(problem, restarts=60, seed=7, processes=2)
+
+
+def test_batched_annealing_reports_the_best_state_it_visited():
+    grid = bumpy_grid(2)
+    problem = PeakFindingProblem((4, 4), grid)
+    state, value = peak_simulated_annealing(problem, walkers=50, seed=3)
+    assert value == grid[state[0]][state[1]] >= grid[4][4]
+    assert value > max(max(row) for row in grid) * 0.9
+
+
+CLEAN = ['State_7', 'State_8']
+DIRTY = ['State_{}'.format(i) for i in range(1, 7)]
+
+
+def reaches_a_goal(problem, state, plan):
+    """True if following the conditional plan from state ends at a goal whatever happens."""
+    if plan == []:
+        return problem.goal_test(state)
+    action, branches = plan
+    return all(reaches_a_goal(problem, s, branches[s]) for s in problem.result(state, action))
+
+
+def policy_cost(problem, policy, sweeps=2000):
+    """The expected cost of following policy, by repeated evaluation sweeps."""
+    cost = {state: 0.0 for state in policy}
+    for _ in range(sweeps):
+        for state, action in policy.items():
+            results, step = problem.outcomes(state, action)
+            cost[state] = step + sum(cost.get(s, 0.0) for s in results) / len(results)
+    return cost[problem.initial]
+
+
+def test_and_or_plans_reach_a_goal_whatever_happens():
+    for start in DIRTY:
+        problem = GraphProblemStochastic(start, CLEAN, erratic_vacuum_world)
+        plan = and_or_graph_search(problem)
+        assert plan is not None and reaches_a_goal(problem, start, plan)
+
+
+def test_and_or_finds_no_loop_free_plan_when_moves_slip():
+    assert and_or_graph_search(GraphProblemStochastic('State_5', CLEAN, slippery_vacuum_world)) is None
+
+
+def test_lao_policies_cover_every_state_they_can_reach():
+    for world in (erratic_vacuum_world, slippery_vacuum_world):
+        for start in DIRTY:
+            problem = GraphProblemStochastic(start, CLEAN, world)
+            policy = lao_star_search(problem)
+            assert start in policy
+            for state, action in policy.items():
+                for s in problem.result(state, action):
+                    assert problem.goal_test(s) or s in policy
+
+
+def test_lao_reports_the_expected_cost_of_its_policy():
+    for world in (erratic_vacuum_world, slippery_vacuum_world):
+        for start in ('State_1', 'State_2', 'State_5'):
+            problem = GraphProblemStochastic(start, CLEAN, world)
+            stats = {}
+            policy = lao_star_search(problem, stats=stats)
+            assert abs(policy_cost(problem, policy) - stats['cost']) < 1e-3
+    assert stats['cost'] > 2  # slipping makes the way from State_5 longer
+
+
+def test_every_tie_breaker_keeps_a_star_and_ucs_optimal():
+    for problem in random_floors(3, 25):
+        reference, _ = breadth_first_graph_search(problem)
+        for tie in tie_breakers.values():
+            for search in (lambda p: astar_search(p, tie=tie), lambda p: uniform_cost_search(p, tie=tie)):
+                node, _ = search(problem)
+                assert (node is None) == (reference is None)
+                if node is not None:
+                    assert node.path_cost == reference.path_cost
+
+
+def test_preferring_high_g_crosses_an_open_floor_without_the_plateau():
+    problem = Grid(40, 40, set(), (0, 0), [(39, 39)])
+    expanded = {}
+    for name, tie in tie_breakers.items():
+        node, explored = astar_search(problem, tie=tie)
+        assert node.path_cost == 78
+        expanded[name] = len(explored)
+    assert expanded['high g'] <= 79 < 10 * 79 < expanded['low g']
+
+
+def test_explored_grid_behaves_like_a_set_of_cells():
+    grid, cells = ExploredGrid(5, 3), set()
+    rng = random.Random(4)
+    for _ in range(60):
+        cell = (rng.randrange(5), rng.randrange(3))
+        if rng.random() < 0.6:
+            grid.add(cell)
+            cells.add(cell)
+        else:
+            grid.discard(cell)
+            cells.discard(cell)
+        assert len(grid) == len(cells)
+        assert set(grid) == cells
+    assert all((cell in grid) == (cell in cells) for cell in [(x, y) for x in range(5) for y in range(3)])
+    with pytest.raises(KeyError):
+        ExploredGrid(5, 3).remove((1, 1))
+
+
+@pytest.mark.parametrize('cell', [(-1, 0), (0, -1), (5, 0), (0, 3), (5, 3)])
+def test_explored_grid_rejects_cells_outside_it(cell):
+    grid = ExploredGrid(5, 3)
+    with pytest.raises(ValueError, match='outside the 5x3 grid'):
+        grid.add(cell)
+    assert cell not in grid and len(grid) == 0 and not grid.cells.count(1)
+    grid.discard(cell)
+    with pytest.raises(KeyError):
+        grid.remove(cell)
+
+
+def test_explored_grid_round_trips_through_pickle_and_masks():
+    import pickle
+    grid = ExploredGrid(7, 4)
+    for cell in [(0, 0), (6, 3), (3, 1), (2, 2)]:
+        grid.add(cell)
+    copy = pickle.loads(pickle.dumps(grid))
+    assert set(copy) == set(grid) and len(copy) == 4
+    assert (explored_mask(grid, 7, 4) == grid.mask).all()
+    assert set(explored_grid(grid.mask)) == set(grid)
+    mask = explored_mask({(3, 1), (9, 9), (-1, 2)}, 7, 4)
+    assert mask.sum() == 1 and mask[3, 1]
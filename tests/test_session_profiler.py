@@ -0,0 +1,78 @@
+import pstats
+import time
+
+import pytest
+
+from session_profiler import SessionProfiler
+
+
+def functions(profiler, phase):
+    return {function for _, _, function in pstats.Stats(profiler.profiles[phase]).stats}
+
+
+def busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+class Robot:
+    def plan(self):
+        busy(0.01)
+        return 'plan'
+
+    def step(self):
+        busy(0.005)
+        return self.plan()
+
+
+def test_nested_phases_are_counted_in_the_inner_one():
+    profiler = SessionProfiler('unused', interval=0)
+    original = profiler.instrument(Robot, 'step')
+    profiler.instrument(Robot, 'plan', 'planning')
+    try:
+        robot = Robot()
+        assert [robot.step() for _ in range(3)] == ['plan'] * 3
+        assert robot.plan() == 'plan'
+    finally:
+        Robot.step = original
+        Robot.plan = Robot.plan.__wrapped__
+    assert profiler.calls == {'Robot.step': 3, 'planning': 4}
+    assert 'step' in functions(profiler, 'Robot.step') and 'busy' in functions(profiler, 'Robot.step')
+    assert 'plan' not in functions(profiler, 'Robot.step')
+    assert 'plan' in functions(profiler, 'planning') and 'step' not in functions(profiler, 'planning')
+    assert profiler.seconds['Robot.step'] > profiler.seconds['planning'] * 3 / 4  # includes the plans it made
+    assert profiler.active == []
+
+
+def test_a_phase_that_raises_is_still_closed():
+    profiler = SessionProfiler('unused', interval=0)
+    with pytest.raises(ZeroDivisionError):
+        with profiler.phase('outer'):
+            with profiler.phase('inner'):
+                1 / 0
+    assert profiler.active == [] and profiler.calls == {'outer': 1, 'inner': 1}
+    with profiler.phase('outer'):
+        busy(0.001)
+    assert profiler.calls['outer'] == 2
+
+
+def test_sampled_stacks_start_with_their_phase(tmp_path, capsys):
+    profiler = SessionProfiler(str(tmp_path / 'run'), interval=0.001)
+    with profiler.phase('Robot.step'):
+        busy(0.1)
+    busy(0.02)  # not sampled: no phase is running
+    written = profiler.dump()
+    assert not profiler.sampler.is_alive()
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['run.Robot.step.pstats', 'run.collapsed']
+    assert written == [str(tmp_path / 'run.Robot.step.pstats'), str(tmp_path / 'run.collapsed')]
+    lines = (tmp_path / 'run.collapsed').read_text().splitlines()
+    assert lines
+    for line in lines:
+        stack, count = line.rsplit(' ', 1)
+        assert stack.startswith('Robot.step;') and stack.endswith(')') and int(count) > 0
+        assert not any(frame.endswith('(session_profiler.py') for frame in stack.split(':'))
+    assert any('busy (' in line for line in lines)
+    assert pstats.Stats(str(tmp_path / 'run.Robot.step.pstats')).total_calls > 0
+    out = capsys.readouterr().out
+    assert 'Robot.step' in out and 'profile written to' in out
@@ -0,0 +1,66 @@
+import json
+import threading
+
+import pytest
+
+from span_trace import SpanTracer
+
+
+class Robot:
+    def step(self, fail=False):
+        return self.plan(fail)
+
+    def plan(self, fail):
+        if fail:
+            raise RuntimeError('no plan')
+        return 'plan'
+
+
+@pytest.fixture
+def traced():
+    tracer = SpanTracer(capacity=8)
+    originals = {name: tracer.instrument(Robot, name) for name in ('step', 'plan')}
+    yield tracer
+    for name, method in originals.items():
+        setattr(Robot, name, method)
+
+
+def test_calls_are_recorded_nested_in_time(traced):
+    assert Robot().step() == 'plan'
+    with pytest.raises(RuntimeError):
+        Robot().step(fail=True)  # still recorded
+    spans = traced.spans()
+    assert [name for name, _, _, _ in spans] == ['Robot.step', 'Robot.plan'] * 2
+    for (_, outer_start, outer_end, _), (_, inner_start, inner_end, _) in [spans[:2], spans[2:]]:
+        assert outer_start <= inner_start <= inner_end <= outer_end
+    assert spans[1][2] <= spans[2][1]
+    assert {thread for _, _, _, thread in spans} == {threading.get_ident()}
+
+
+def test_the_ring_keeps_the_most_recent_spans():
+    tracer = SpanTracer(capacity=5)
+    for i in range(12):
+        tracer.record('span {}'.format(i), 1000 * i, 1000 * i + 10)
+    assert [name for name, _, _, _ in tracer.spans()] == ['span {}'.format(i) for i in range(7, 12)]
+    assert SpanTracer(capacity=5).spans() == []
+
+
+def test_chrome_trace_has_a_complete_event_per_span_and_a_row_per_thread(traced, tmp_path, capsys):
+    worker = threading.Thread(target=Robot().step, name='planner')
+    worker.start()
+    worker.join()
+    Robot().step()
+    path = tmp_path / 'trace.json'
+    traced.write(str(path))
+    assert 'trace of 4 spans' in capsys.readouterr().out
+    trace = json.loads(path.read_text())
+    assert trace['displayTimeUnit'] == 'ms'
+    complete = [event for event in trace['traceEvents'] if event['ph'] == 'X']
+    assert [event['name'] for event in complete] == ['Robot.step', 'Robot.plan'] * 2
+    assert all(event['ts'] >= 0 and event['dur'] >= 0 for event in complete)
+    for (_, start, end, _), event in zip(traced.spans(), complete):
+        assert event['ts'] == pytest.approx((start - traced.origin) / 1000)
+        assert event['dur'] == pytest.approx((end - start) / 1000)
+    rows = {event['tid']: event['args']['name'] for event in trace['traceEvents'] if event['ph'] == 'M'}
+    assert set(rows) == {event['tid'] for event in complete} and len(rows) == 2
+    assert rows[threading.get_ident()] == threading.current_thread().name
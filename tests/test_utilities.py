@@ -0,0 +1,22 @@
+from utilities import PriorityQueue
+
+
+class Item:
+    """Has no ordering, so the queue must never compare two of them."""
+
+    def __init__(self, f, g):
+        self.f, self.g = f, g
+
+
+def test_ties_go_by_the_tie_key_then_insertion_order():
+    items = [Item(2, 0), Item(1, 5), Item(1, 3), Item(1, 5), Item(0, 9)]
+    queue = PriorityQueue('min', lambda item: item.f, lambda item: item.g)
+    queue.extend(items)
+    assert [queue.pop() for _ in items] == [items[4], items[2], items[1], items[3], items[0]]
+
+
+def test_max_order_without_a_tie_key_is_first_in_first_out_among_equals():
+    items = [Item(1, 0), Item(3, 0), Item(3, 0), Item(2, 0)]
+    queue = PriorityQueue('max', lambda item: item.f)
+    queue.extend(items)
+    assert [queue.pop() for _ in items] == [items[1], items[2], items[3], items[0]]
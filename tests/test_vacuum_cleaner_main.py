@@ -0,0 +1,72 @@
+from agents_and_environments import Dirt, VacuumEnvironment, Wall
+from headless_runner import HeadlessVacuumEnvironment
+from vacuum_cleaner_main import Gui
+
+
+class Recorder:
+    def __init__(self):
+        self.batches = []
+
+    def things_changed(self, changes):
+        self.batches.append(changes)
+
+
+def button_grid(width, height, walls=(), dirt=()):
+    """A Gui wired to plain dicts standing in for its buttons, so no display is needed."""
+    gui = Gui.__new__(Gui)
+    VacuumEnvironment.__init__(gui, width, height)
+    gui.buttons = [[{'bg': 'red' if (i, j) in walls else 'grey' if (i, j) in dirt else 'white'}
+                    for i in range(width)] for j in range(height)]
+    gui.read_env()
+    return gui
+
+
+def test_read_env_changes_only_the_rooms_whose_color_changed():
+    gui = button_grid(6, 5, walls={(2, 2), (3, 2)}, dirt={(1, 3), (4, 1)})
+    recorder = Recorder()
+    gui.add_observer(recorder)
+    with gui.changes():
+        gui.read_env()
+    assert recorder.batches == []
+    wall = gui.list_things_at((2, 2), Wall)[0]
+    gui.buttons[2][2]['bg'] = 'white'
+    gui.buttons[3][3]['bg'] = 'grey'
+    gui.buttons[1][4]['bg'] = 'red'
+    with gui.changes():
+        gui.read_env()
+    changes = recorder.batches[-1]
+    assert changes.deleted.get(wall) == (2, 2) and len(changes.deleted) == 2 and len(changes.added) == 2
+    assert {type(thing): location for thing, location in changes.added.items()} == {Dirt: (3, 3), Wall: (4, 1)}
+    assert gui.dirtCount == 2 and gui.snapshot().walls & {(2, 2), (3, 2), (4, 1)} == {(3, 2), (4, 1)}
+
+
+def test_headless_batches_carry_the_step_they_belong_to():
+    env = HeadlessVacuumEnvironment(10, 8, seed=0)
+    env.setSearchEngine('A*')
+    recorder = Recorder()
+    env.add_observer(recorder)
+    for _ in range(4):
+        env.update_env()
+    assert [changes.tick for changes in recorder.batches] == [0, 1, 2, 3]
+
+
+def test_each_environment_gets_its_own_trace_closed_by_one_exit_handler(tmp_path, monkeypatch):
+    import vacuum_cleaner_main
+
+    handlers = []
+    monkeypatch.setattr(vacuum_cleaner_main.atexit, 'register', handlers.append)
+    monkeypatch.setattr(Gui, 'recordPath', str(tmp_path / 'gui.trace'))
+    monkeypatch.setattr(Gui, 'recording', None)
+    monkeypatch.setattr(Gui, 'recordingClosedAtExit', False)
+    gui = button_grid(6, 5)
+    recorders = []
+    for n in range(3):
+        monkeypatch.setattr(Gui, 'scenarioCount', n + 1)
+        gui.start_recording()
+        recorders.append(gui.recorder)
+    assert handlers == [Gui.stop_recording] and Gui.recording is recorders[-1]
+    assert [recorder.steps_file.closed for recorder in recorders] == [True, True, False]
+    assert sorted(path.name for path in tmp_path.glob('gui.trace*')) == [
+        'gui.trace', 'gui.trace.1', 'gui.trace.1.key', 'gui.trace.2', 'gui.trace.2.key', 'gui.trace.key']
+    handlers[0]()
+    assert recorders[-1].steps_file.closed and Gui.recording is None
@@ -0,0 +1,108 @@
+import pytest
+
+import vacuum_planning
+from agents_and_environments import XYSnapshot
+from vacuum_planning import PlanCache, PortfolioPool, VacuumPlanning, plan_snapshot
+
+
+def maze(width, height, dirt, start=(1, 1)):
+    """A floor walled around its edge, with a wall across every fourth column
+    that leaves a gap at alternating ends."""
+    walls = {(x, y) for x in range(width) for y in range(height) if x in (0, width - 1) or y in (0, height - 1)}
+    for x in range(4, width - 1, 4):
+        gap = 1 if x % 8 else height - 2
+        walls |= {(x, y) for y in range(1, height - 1) if y != gap}
+    empty = XYSnapshot(width, height, frozenset(), frozenset(), (start,), None, 0, 0)
+    return empty.with_changes(add_walls=walls, add_dirt=dirt)  # which fills in the fingerprints
+
+
+def portfolio(snapshot, strategies=None):
+    planner = VacuumPlanning(None, 'Portfolio')
+    planner.snapshot = snapshot
+    planner.initial = snapshot.agents[0]
+    path, _ = planner.portfolioSearch(strategies)
+    return planner, path
+
+
+@pytest.fixture
+def pooled(monkeypatch):
+    monkeypatch.setattr(vacuum_planning, 'portfolioInlineRooms', 0)
+    yield PortfolioPool.session()
+    PortfolioPool.session().close()
+
+
+def test_small_floors_are_searched_inline(monkeypatch):
+    monkeypatch.setattr(PortfolioPool, 'session', lambda: pytest.fail('the pool was used'))
+    snapshot = maze(20, 10, [(17, 8)])
+    planner, path = portfolio(snapshot)
+    assert planner.winner == 'A*'
+    assert path.path_cost == plan_snapshot(snapshot, 'BFS')[0].path_cost
+
+
+def test_pool_keeps_its_workers_between_plans(pooled):
+    snapshot = maze(20, 10, [(17, 8)])
+    portfolio(snapshot, ('BFS',))
+    process, _ = pooled.workers['BFS']
+    portfolio(snapshot, ('BFS',))
+    assert pooled.workers['BFS'][0] is process and process.is_alive()
+
+
+def test_each_plan_gets_its_own_answer(pooled):
+    for goal in [(17, 8), (2, 8), (11, 1), (6, 5), (18, 1)]:
+        snapshot = maze(20, 10, [goal])
+        planner, path = portfolio(snapshot, ('A*', 'BFS', 'Greedy', 'DFS'))
+        assert tuple(path.state) == goal
+        assert path.path_cost == plan_snapshot(snapshot, 'BFS')[0].path_cost
+
+
+def test_no_path_from_the_pool(pooled):
+    snapshot = maze(20, 10, [(17, 8)]).with_changes(add_walls=[(16, 8), (17, 7), (18, 8), (17, 9)])
+    planner, path = portfolio(snapshot, ('BFS', 'DFS'))
+    assert path is None and planner.winner is None
+
+
+def test_plan_cache_hits_only_the_same_search_and_settings(monkeypatch):
+    cache = PlanCache()
+    snapshot = maze(20, 10, [(17, 8)])
+    plan_snapshot(snapshot, 'IDA*', cache=cache)
+    plan_snapshot(snapshot, 'IDA*', cache=cache)
+    assert (cache.hits, cache.misses) == (1, 1)
+    plan_snapshot(snapshot, 'DFS', cache=cache)
+    monkeypatch.setattr(vacuum_planning, 'idaTableSize', 1 << 10)
+    plan_snapshot(snapshot, 'IDA*', cache=cache)
+    assert (cache.hits, cache.misses) == (1, 3)
+
+    class Blind(VacuumPlanning):
+        def h(self, node):
+            return 0
+
+    Blind(None, 'A*', cache=cache).plan(snapshot, snapshot.agents[0])
+    plan_snapshot(snapshot, 'A*', cache=cache)
+    assert (cache.hits, cache.misses) == (1, 5)
+
+
+def test_plan_cache_disk_tier_is_keyed_like_memory(tmp_path, monkeypatch):
+    path = str(tmp_path / 'plans')
+    snapshot = maze(20, 10, [(17, 8)])
+    first = PlanCache(path=path)
+    expected = plan_snapshot(snapshot, 'A*', cache=first)[0].solution()
+    first.close()
+
+    second = PlanCache(path=path)
+    assert plan_snapshot(snapshot, 'A*', cache=second)[0].solution() == expected
+    assert second.disk_hits == 1
+    monkeypatch.setattr(vacuum_planning, 'tieBreaking', 'fifo')
+    plan_snapshot(snapshot, 'A*', cache=second)
+    plan_snapshot(snapshot, 'BFS', cache=second)
+    assert (second.disk_hits, second.misses) == (1, 2)
+    second.close()
+
+
+def test_plan_cache_evicts_the_least_recently_used():
+    cache = PlanCache(maxsize=2)
+    snapshots = [maze(20, 10, [goal]) for goal in [(17, 8), (2, 8), (11, 1)]]
+    for snapshot in snapshots[:2] + snapshots[:1] + snapshots[2:]:
+        plan_snapshot(snapshot, 'BFS', cache=cache)
+    plan_snapshot(snapshots[0], 'BFS', cache=cache)
+    plan_snapshot(snapshots[1], 'BFS', cache=cache)
+    assert cache.evictions == 2 and cache.hits == 2
@@ -0,0 +1,86 @@
+import random
+
+import pytest
+
+import vacuum_planning
+from agents_and_environments import XYSnapshot
+from grid_helpers import bfs_distances, random_walls, replay
+from utilities import np
+from vacuum_planning import plan_snapshot
+from wavefront import find_path, free_mask, wavefront
+
+
+def as_dict(distances):
+    return {(x, y): int(distances[x, y]) for x, y in np.argwhere(distances >= 0).tolist()}
+
+
+def rooms(mask):
+    return {(x, y) for x, y in np.argwhere(mask).tolist()}
+
+
+# Heights around and past 64 rooms cross the boundaries between packed words.
+@pytest.mark.parametrize('width, height', [(1, 1), (9, 7), (20, 63), (13, 64), (11, 65), (6, 140), (90, 4)])
+def test_distances_match_breadth_first_search(width, height):
+    for seed in range(3):
+        walls = random_walls(random.Random(seed), width, height, 0.3)
+        rng = random.Random(seed)
+        sources = [(rng.randrange(width), rng.randrange(height)) for _ in range(1 + seed)]
+        distances, reached = wavefront(free_mask(width, height, walls), sources)
+        assert reached == []
+        assert as_dict(distances) == bfs_distances(width, height, walls, sources)
+        assert all(distances[x, y] == -1 for x, y in walls)
+
+
+def test_search_stops_at_the_first_layer_with_a_goal():
+    free = np.ones((30, 100), dtype=bool)
+    goals = [(10, 90), (3, 12), (8, 7), (29, 99)]
+    distances, reached = wavefront(free, [(3, 3)], goals)
+    assert reached == [(3, 12), (8, 7)]  # both 9 moves away
+    ring = {(x, y) for x in range(30) for y in range(100) if abs(x - 3) + abs(y - 3) == 9}
+    assert distances.max() == 9 and rooms(distances == 9) == ring
+    many = [(x, y) for x in range(30) for y in range(40, 100)] + [(5, 20)]
+    assert wavefront(free, [(3, 3)], many)[1] == [(5, 20)]
+
+
+def test_paths_are_shortest_and_legal():
+    width, height = 40, 70
+    for seed in range(6):
+        walls = random_walls(random.Random(seed), width, height)
+        rng = random.Random(seed)
+        start = (rng.randrange(width), rng.randrange(height))
+        walls.discard(start)
+        goals = [(rng.randrange(width), rng.randrange(height)) for _ in range(3)]
+        distances = bfs_distances(width, height, walls, [start])
+        actions, explored = find_path(width, height, walls, start, goals)
+        reachable = [distances[goal] for goal in goals if goal in distances and goal not in walls]
+        if not reachable:
+            assert actions is None
+            assert rooms(explored) == distances.keys()
+            continue
+        assert len(actions) == min(reachable)
+        assert replay(width, height, walls, start, actions)[0][-1] in goals
+        assert rooms(explored) == {room for room, d in distances.items() if d < len(actions)}
+
+
+def test_sources_on_walls_or_off_the_grid_reach_nothing():
+    free = free_mask(5, 5, {(2, 2)})
+    distances, _ = wavefront(free, [(2, 2), (-1, 0), (5, 5)])
+    assert (distances == -1).all()
+
+
+@pytest.mark.parametrize('grid', [False, True])
+def test_wavefront_search_type_plans_like_bfs(grid, monkeypatch):
+    monkeypatch.setattr(vacuum_planning, 'exploredGrid', grid)
+    width, height = 24, 18
+    border = {(x, y) for x in range(width) for y in range(height) if x in (0, width - 1) or y in (0, height - 1)}
+    walls = (random_walls(random.Random(7), width, height, 0.2) | border) - {(1, 1)}
+    for dirt in [(22, 16), (12, 3), (5, 15)]:
+        empty = XYSnapshot(width, height, frozenset(), frozenset(), ((1, 1),), None, 0, 0)
+        snapshot = empty.with_changes(add_walls=walls - {dirt}, add_dirt=[dirt])
+        node, explored = plan_snapshot(snapshot, 'Wavefront')
+        expected, _ = plan_snapshot(snapshot, 'BFS')
+        if expected is None:
+            assert node is None
+            continue
+        assert len(node.path()) == len(expected.path())
+        assert tuple(node.state) == dirt and (1, 1) in explored and dirt not in explored
@@ -5,13 +5,35 @@ import collections
 import collections.abc
 import functools
 import heapq
+import importlib.util
+import itertools
+import math
 import operator
 import os.path
 import random
+import sys
+import zlib
 from itertools import chain, combinations
 from statistics import mean
 
-import numpy as np
+
+def lazy_import(name):
+    """Return the module called name, but defer executing it until one of its
+    attributes is first used. Modules that only need a heavy dependency in a few
+    functions can then be imported cheaply, e.g. by headless batch workers."""
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ImportError('No module named {!r}'.format(name))
+    spec.loader = importlib.util.LazyLoader(spec.loader)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+np = lazy_import('numpy')
 
 
 # ______________________________________________________________________________
@@ -377,7 +399,7 @@ def distance(a, b):
     """The distance between two (x, y) points."""
     xA, yA = a
     xB, yB = b
-    return np.hypot((xA - xB), (yA - yB))
+    return math.hypot((xA - xB), (yA - yB))
 
 
 def distance_squared(a, b):
@@ -425,6 +447,31 @@ def memoize(fn, slot=None, maxsize=32):
     return memoized_fn
 
 
+MASK64 = (1 << 64) - 1
+
+
+def splitmix64(x):
+    """The SplitMix64 mixing function: a well-scrambled 64-bit value for any 64-bit x."""
+    x = (x + 0x9E3779B97F4A7C15) & MASK64
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & MASK64
+    return x ^ (x >> 31)
+
+
+@functools.lru_cache(maxsize=1 << 16)
+def zobrist_key(*parts):
+    """Pseudo-random 64-bit key for a tuple of ints and strings, e.g. ('wall', x, y).
+    XOR-ing the keys of all features of a position gives its Zobrist hash, which
+    can be updated in O(1) as features come and go. Keys are the same in every
+    process and session, so such hashes can be stored on disk."""
+    h = 0
+    for part in parts:
+        if isinstance(part, str):
+            part = zlib.crc32(part.encode())
+        h = splitmix64(h ^ (part & MASK64))
+    return h
+
+
 def name(obj):
     """Try to find some reasonable name for the object."""
     return (getattr(obj, 'name', 0) or getattr(obj, '__name__', 0) or
@@ -724,20 +771,24 @@ class PriorityQueue:
     order) is returned first.
     If order is 'min', the item with minimum f(x) is
     returned first; if order is 'max', then it is the item with maximum f(x).
+    Items with equal f(x) come out by the smallest tie(x) if tie is given, then
+    in the order they were inserted, so the items themselves are never compared.
     Also supports dict-like lookup."""
 
-    def __init__(self, order='min', f=lambda x: x):
+    def __init__(self, order='min', f=lambda x: x, tie=None):
         self.heap = []
+        self.counter = itertools.count()
         if order == 'min':
             self.f = f
         elif order == 'max':  # now item with max f(x)
             self.f = lambda x: -f(x)  # will be popped first
         else:
             raise ValueError("Order must be either 'min' or 'max'.")
+        self.tie = tie or (lambda x: 0)
 
     def append(self, item):
         """Insert item at its correct position."""
-        heapq.heappush(self.heap, (self.f(item), item))
+        heapq.heappush(self.heap, (self.f(item), self.tie(item), next(self.counter), item))
 
     def extend(self, items):
         """Insert each item in items at its correct position."""
@@ -748,7 +799,7 @@ class PriorityQueue:
         """Pop and return the item (with min or max f(x) value)
         depending on the order."""
         if self.heap:
-            return heapq.heappop(self.heap)[1]
+            return heapq.heappop(self.heap)[-1]
         else:
             raise Exception('Trying to pop from empty PriorityQueue.')
 
@@ -758,20 +809,20 @@ class PriorityQueue:
 
     def __contains__(self, key):
         """Return True if the key is in PriorityQueue."""
-        return any([item == key for _, item in self.heap])
+        return any([entry[-1] == key for entry in self.heap])
 
     def __getitem__(self, key):
         """Returns the first value associated with key in PriorityQueue.
         Raises KeyError if key is not present."""
-        for value, item in self.heap:
-            if item == key:
-                return value
+        for entry in self.heap:
+            if entry[-1] == key:
+                return entry[0]
         raise KeyError(str(key) + " is not in the priority queue")
 
     def __delitem__(self, key):
         """Delete the first occurrence of key."""
         try:
-            del self.heap[[item == key for _, item in self.heap].index(True)]
+            del self.heap[[entry[-1] == key for entry in self.heap].index(True)]
         except ValueError:
             raise KeyError(str(key) + " is not in the priority queue")
         heapq.heapify(self.heap)
@@ -1,157 +1,16 @@
+import atexit
 import os.path
 from tkinter import *
 from tkinter import messagebox
+from time import sleep
 from agents_and_environments import *
 from search_algorithms import *
+from vacuum_planning import *
 import sys
 import math
 import copy
-from utilities import PriorityQueue
-
-
-"""
-1- BFS: Breadth first search. Using tree or graph version, whichever makes more sense for the problem
-2- DFS: Depth-First search. Again using tree or graph version.
-3- UCS: Uniform-Cost-Search. Using the following cost function to optimise the path, from initial to current state.
-4- Greedy: Uses Manhattan distance to the next closest dirty room as heuristic for greedy algorithm. To find the next closest dirty room, use Manhattan distance.
-5- A*:  Using A star search.
-"""
-searchTypes = ['None', 'BFS', 'DFS', 'UCS', 'Greedy', 'A*']
-
-
-class VacuumPlanning(Problem):
-    """ The problem of find the next room to clean in a grid of m x n rooms.
-    A state is represented by state of the grid cells locations. Each room is specified by index set
-    (i, j), i in range(m) and j in range (n). Final goal is to clean all dirty rooms. We go by performing sub-goals, each being cleaning the "next" dirty room.
-    """
-
-    def __init__(self, env, searchtype):
-        """ Define goal state and initialise a problem
-            initial is a pair (i, j) of where the agent is
-            goal is next pair(k, l) where map[k][l] is dirty
-        """
-        self.solution = None
-        self.env = env
-        self.state = env.agent.location
-        super().__init__(self.state)
-        self.map = env.things
-        self.searchType = searchtype
-        env.agent.direction = 'UP'  # initial direction of the agent.
-        self.agent = env.agent
-        self.turnCostOn = env.turnCostOn
-
-    def generateSolution(self):
-        """ generate full path to the next goal based on type of the search chosen by user"""
-        self.env.read_env()
-        self.state = env.agent.location
-        super().__init__(self.state)
-        path = None
-        explored = None
-        if self.searchType == 'BFS':
-            path, explored = breadth_first_graph_search(self)
-        elif self.searchType == 'DFS':
-            path, explored = depth_first_graph_search(self)
-        elif self.searchType == 'UCS':
-            path, explored = best_first_graph_search(self, lambda node: node.path_cost)
-        elif self.searchType == 'Greedy':
-            path, explored = best_first_graph_search(self, None)
-        elif self.searchType == 'A*':
-            path, explored = astar_search(self, None)
-        else:
-            raise 'NameError'
-
-        if (path != None):
-            self.env.set_solution(path)
-        else:
-            print("There is no solution!\n")
-        if (explored != None):
-            self.env.display_explored(explored)
-        else:
-            print("There is not explored list!\n")
-
-    def generateNextSolution(self):
-        self.generateSolution()
-
-    def actions(self, state):
-        """ Return the actions that can be executed in the given state.
-        The result would be a list, since there are only four possible actions
-        in any given state of the environment """
-
-        possible_neighbors = self.env.things_near(state)
-        possible_actions = ['UP', 'DOWN', 'LEFT', 'RIGHT']
-        for slot in possible_neighbors:
-            if isinstance(slot[0], Wall):
-                x, y = slot[0].location
-                if x == state[0] and y == state[1] + 1:
-                    possible_actions.remove('UP')
-                if x == state[0] and y == state[1] - 1:
-                    possible_actions.remove('DOWN')
-                if x == state[0] + 1 and y == state[1]:
-                    possible_actions.remove('RIGHT')
-                if x == state[0] - 1 and y == state[1]:
-                    possible_actions.remove('LEFT')
-
-        return possible_actions
-
-    def result(self, state, action):
-        """ Given state and action, return a new state that is the result of the action.
-        Action is assumed to be a valid action for the state """
-        self.agent.direction = action
-        new_state = list(state)
-        if action == 'RIGHT':
-            new_state[0] += 1
-        elif action == 'LEFT':
-            new_state[0] -= 1
-        elif action == 'UP':
-            new_state[1] += 1
-        elif action == 'DOWN':
-            new_state[1] -= 1
-
-        return new_state
-
-    def goal_test(self, state):
-        """ Given a state, return True if state is a goal state or False, otherwise """
-        return self.env.some_things_at(state, Dirt)
-
-    def path_cost(self, curNode, state1, action, state2):
-        """To be used for UCS and A* search. Returns the cost of a solution path that arrives at state2 from
-        state1 via action, assuming it costs c to get up to state1. For our problem state is (x, y) coordinate pair.
-        Rotation of the Vacuum machine costs equivalent of 0.5 unit for each 90' rotation. """
-        move_cost = 1
-        if self.turnCostOn and curNode.action != None:
-            turn_cost = self.computeTurnCost(curNode.action, action)
-        else:
-            turn_cost = 0
-        return curNode.path_cost + move_cost + turn_cost
-
-    def computeTurnCost(self, action1, action):
-        possible_actions = {"UP": 0, "DOWN": 0, "LEFT": 1, "RIGHT": 1}
-
-        diff = abs(possible_actions[action] - possible_actions[action1])
-
-        if diff == 0:
-            if action != action1:
-                return 1
-            else:
-                return 0
-        else:
-            return 0.5
-
-    def findMinManhattanDist(self, pos):
-        """find the min distance between position pos and any of the dirty rooms. Dirty rooms are maintained in
-        self.env.dirtyRooms."""
-        min_distance = float('inf')
-        for room in self.env.dirtyRooms:
-            distance = abs(pos[0] - room[0]) + abs(pos[1] - room[1])
-            if distance < min_distance:
-                min_distance = distance
-        return min_distance
-
-    def h(self, node):
-        """ Return the heuristic value for a given state. For this problem use minimum Manhattan
-        distance to a dirty room, among all the dirty rooms.
-        """
-        return self.findMinManhattanDist(node.state)
+from utilities import PriorityQueue, np
+from scenario_generator import LAYOUTS, generate
 
 
 # ______________________________________________________________________________
@@ -182,7 +41,19 @@ class Gui(VacuumEnvironment):
     """
     xi, yi = (0, 0)
 
-    # perceptible_distance = 1
+    perceptible_distance = 3  # how far the agent sees in Explore mode
+
+    # Keyword arguments of scenario_generator.generate for the walls and dirt of
+    # each new environment. With a seed, the n-th environment is drawn from seed + n.
+    scenario = dict(layout='random', wall_density=None, dirt_count=5, dirt_density=None, room_size=8,
+                    corridor_width=0)
+    seed = None
+    scenarioCount = 0
+    # Where to record each environment as an episode_trace: the first one to
+    # recordPath, the n-th after it to recordPath.n. None records nothing.
+    recordPath = None
+    recording = None  # the TraceRecorder of the environment being recorded
+    recordingClosedAtExit = False
 
     def __init__(self, root, width, height):
         self.dirtCount = 0
@@ -191,6 +62,8 @@ class Gui(VacuumEnvironment):
         self.stepCount = 0
         self.searchType = None
         self.explored = None
+        self.exploredMask = None
+        self.shownPath = []
         self.solution = None
         self.searchAgent = None
         self.turnCostOn = False
@@ -307,23 +180,44 @@ class Gui(VacuumEnvironment):
         self.agent.performance = 0
         self.direction = Direction("up")
 
-        """next create a random number of block walls inside the grid as well"""
-        roomCount = (self.width - 1) * (self.height - 1)
-        blockCount = random.choice(range(roomCount // 7, roomCount // 3))
-        for _ in range(blockCount):
-            rownum = random.choice(range(1, self.height - 1))
-            colnum = random.choice(range(1, self.width - 1))
-            while (rownum == yi and colnum == xi):
-                rownum = random.choice(range(1, self.height - 1))
-                colnum = random.choice(range(1, self.width - 1))
+        """next create the block walls inside the grid and the dirt, drawn by scenario_generator"""
+        seed = None if Gui.seed is None else Gui.seed + Gui.scenarioCount
+        Gui.scenarioCount += 1
+        scenario = generate(self.width, self.height, seed, start=self.agent.location, **self.scenario)
+        for colnum, rownum in scenario.wall_cells():
             self.buttons[rownum][colnum].config(bg='red', text='', disabledforeground='blue')
 
-        self.create_dirts()
+        self.create_dirts(scenario.dirt_cells())
         self.stepCount = 0
         self.searchType = None
         self.solution = []
         self.explored = set()
+        self.exploredMask = None
+        self.shownPath = []
         self.read_env()
+        self.start_recording()
+
+    def start_recording(self):
+        """Record the environment just set up to a trace of its own, closing the
+        trace of the previous one, if recordPath is set."""
+        Gui.stop_recording()
+        self.recorder = None
+        if Gui.recordPath:
+            from episode_trace import TraceRecorder
+
+            n = Gui.scenarioCount - 1
+            self.recorder = TraceRecorder(Gui.recordPath if n == 0 else '{}.{}'.format(Gui.recordPath, n), self)
+            Gui.recording = self.recorder
+            if not Gui.recordingClosedAtExit:
+                atexit.register(Gui.stop_recording)
+                Gui.recordingClosedAtExit = True
+
+    @staticmethod
+    def stop_recording():
+        """Close the trace being recorded, if any."""
+        if Gui.recording is not None:
+            Gui.recording.close()
+            Gui.recording = None
 
     def create_frames(self, h):
         """Adds h row frames to the GUI environment."""
@@ -356,23 +250,14 @@ class Gui(VacuumEnvironment):
                 button_row[0].config(bg='black', text='', state='disabled', disabledforeground='black')
                 button_row[len(button_row) - 1].config(bg='black', text='', state='disabled', disabledforeground='black')
 
-    def create_dirts(self):
-        """ set a small random number of rooms to be dirty at random location on the grid
+    def create_dirts(self, rooms):
+        """ set the given rooms to be dirty
         This function should be called after create_walls()"""
         self.read_env()  # this is needed to make sure wall objects are created
-        # numRooms = (self.width-1) * (self.height -1)
-        self.dirtCount = 5
-        dirtCreated = 0
-
+        self.dirtCount = len(rooms)
         self.dirtyRooms = set()
-
-        while dirtCreated != self.dirtCount:
-            rownum = random.choice(range(1, self.height - 1))
-            colnum = random.choice(range(1, self.width - 1))
-            if self.some_things_at((colnum, rownum)):
-                continue
+        for colnum, rownum in rooms:
             self.buttons[rownum][colnum].config(bg='grey')
-            dirtCreated += 1
             self.dirtyRooms.add((colnum, rownum))
 
     def setSearchEngine(self, choice):
@@ -388,27 +273,52 @@ class Gui(VacuumEnvironment):
         self.path = []
         if (self.agent == None):
             return
-        while (path.state != self.agent.location):
+        while path.parent is not None:
             self.path.append(path.state)
             path = path.parent
         if (len(self.path) > 0):
             self.path.pop(0)
 
     def display_explored(self, explored):
-        """display explored slots in a light pink color"""
-        if len(self.explored) > 0:  # means we have explored list from previous search. So need to clear their visual fist
-            for (x, y) in self.explored:
-                self.buttons[y][x].config(bg='white')
-
-        # now pink color the new explored list
+        """display explored slots in a light pink color. Only the rooms whose colour
+        changes are repainted: those explored by one of the last two searches but
+        not the other, plus the previous path and the agent's room, which were
+        painted over since."""
+        previous = self.exploredMask
+        if previous is None:
+            previous = np.zeros((self.width, self.height), dtype=bool)
+        current = explored_mask(explored, self.width, self.height)
+        changed = previous != current
+        for (x, y) in self.shownPath:
+            changed[x, y] = True
+        x, y = self.agent.location
+        changed[x, y] |= current[x, y]
+        for x, y in np.argwhere(changed).tolist():
+            self.buttons[y][x].config(bg='pink' if current[x, y] else 'white')
         self.explored = explored
-        for (x, y) in explored:
-            self.buttons[y][x].config(bg='pink')
+        self.exploredMask = current.copy()
 
         # finally color orange the found path
-        for (x, y) in self.path:
+        self.shownPath = list(self.path or [])
+        for (x, y) in self.shownPath:
             self.buttons[y][x].config(bg='orange')
 
+    def render_state(self, state):
+        """Repaint the grid from a replayed episode_trace.ReplayState."""
+        for j, btn_row in enumerate(self.buttons):
+            for i, btn in enumerate(btn_row):
+                if (j != 0 and j != len(self.buttons) - 1) and (i != 0 and i != len(btn_row) - 1):
+                    if (i, j) in state.walls:
+                        btn.config(bg='red', text='')
+                    elif (i, j) in state.dirt:
+                        btn.config(bg='grey', text='')
+                    else:
+                        btn.config(bg='white', text='')
+        (x, y), self.agent.performance = state.agents[0]
+        self.agent.location = (x, y)
+        self.buttons[y][x].config(bg='lightgreen', text=agent_label(self.agent))
+        NumSteps_label.config(text=f"Steps: {state.tick + 1}")
+
     def add_agent(self, agt, loc):
         """Add an agent to the GUI, ensuring only one agent exists."""
         if self.agents:  # If there are existing agents, remove them first
@@ -449,6 +359,7 @@ class Gui(VacuumEnvironment):
             return
 
         xi, yi = agent.location
+        dirt_list = []
         if action == 'Suck':
             dirt_list = self.list_things_at(agent.location, Dirt)
             if dirt_list:
@@ -459,34 +370,43 @@ class Gui(VacuumEnvironment):
                 self.buttons[yi][xi].config(bg='white', text='')
             self.buttons[yi][xi].config(bg='white')
         else:  # Move action
+            agent.direction = action
+            origin = agent.location
             agent.location = self.searchAgent.result(agent.location, action)
+            self.thing_changed('move', agent, origin, agent.location)
             self.buttons[yi][xi].config(text='', bg='white')
             xf, yf = agent.location
             self.buttons[yf][xf].config(text=agent_label(agent), bg='lightgreen')
 
+        self.record_action(agent, action, self.stepCount, bool(dirt_list))
         NumSteps_label.config(text=f"Steps: {self.stepCount}")
 
     def read_env(self):
         """read_env: This sets proper wall or Dirt status based on bg color"""
-        """Reads the current state of the GUI environment."""
+        """Reads the current state of the GUI environment. Only rooms whose color
+        no longer matches their wall or dirt are changed, so a step reports just those."""
         self.dirtCount = 0
         for j, btn_row in enumerate(self.buttons):
             for i, btn in enumerate(btn_row):
                 if (j != 0 and j != len(self.buttons) - 1) and (i != 0 and i != len(btn_row) - 1):
-                    if self.some_things_at((i, j)):  # and (i, j) != agt_loc:
-                        for thing in self.list_things_at((i, j)):
-                            if not isinstance(thing, Agent):
-                                self.delete_thing(thing)
-                    if btn['bg'] == 'grey':  # adding dirt
-                        self.add_thing(Dirt(), (i, j))
+                    wanted = {'grey': Dirt, 'red': Wall}.get(btn['bg'])
+                    if wanted is Dirt:
                         self.dirtCount += 1
-                    elif btn['bg'] == 'red':  # adding wall
-                        self.add_thing(Wall(), (i, j))
+                    things = list(self.map_things_at((i, j)))
+                    kept = next((thing for thing in things if type(thing) is wanted), None)
+                    for thing in things:
+                        if thing is not kept:
+                            self.delete_thing(thing)
+                    if wanted is not None and kept is None:
+                        self.add_thing(wanted(), (i, j))
 
     def update_env(self):
-        """Updates the GUI environment according to the current state."""
-        self.read_env()
-        self.step()
+        """Updates the GUI environment according to the current state.
+        Observers hear of everything that changed in the step at once."""
+        self.tick = self.stepCount
+        with self.changes():
+            self.read_env()
+            self.step()
         self.stepCount += 1
 
     def step(self):
@@ -497,12 +417,18 @@ class Gui(VacuumEnvironment):
             self.done = True
             return
 
+        if self.searchAgent is not None:
+            self.searchAgent.perceive()
+
         if len(self.solution) == 0:  # agent has reached a dirty room. So the proper action is 'suck'
             self.execute_action(self.agent, 'Suck')
             self.read_env()
             if env.dirtCount > 0 and self.searchAgent is not None:
                 self.searchAgent.generateNextSolution()
                 self.running = False
+                if self.searchAgent.exhausted():
+                    print("The remaining dirty rooms cannot be reached. DONE!")
+                    self.done = True
         else:  # agent is moving towards the next goal. So the proper action is 'move'
             move = self.solution.pop()
             self.execute_action(self.agent, move)
@@ -514,8 +440,16 @@ class Gui(VacuumEnvironment):
             if self.is_done() or self.running is False:
                 break
             self.update_env()
-            sleep(delay)
-            Tk.update(self.root)
+            self.idle(delay)
+            self.redraw()
+
+    def idle(self, delay):
+        """Wait delay seconds between the steps of run."""
+        sleep(delay)
+
+    def redraw(self):
+        """Let Tk process pending events and repaint the window."""
+        Tk.update(self.root)
 
     def reset_env(self):
         """Resets the GUI and agents environment to the initial clear state."""
@@ -535,29 +469,56 @@ class Gui(VacuumEnvironment):
         self.setupTestEnvironment()
 
 
-
-"""
-Our search Agents ignore environment percepts for planning. The planning is done based on static
-data from environment at the beginning. The environment is fully observable
-"""
-
-
-def XYSearchAgentProgram(percept):
-    pass
-
-
-class XYSearchAgent(Agent):
-    """The modified SimpleRuleAgent for the GUI environment."""
-
-    def __init__(self, program, loc):
-        super().__init__(program)
-        self.location = loc
-        self.direction = Direction("up")
-        self.searchType = searchTypes[0]
-        self.stepCount = 0
-
-
 if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='AI Vacuum Cleaner Simulator')
+    parser.add_argument('--profile', metavar='PREFIX',
+                        help='profile the steps, plans and redraws of the session, writing '
+                             'PREFIX.<phase>.pstats and PREFIX.collapsed when the window is closed')
+    parser.add_argument('--sample-ms', type=float, default=5,
+                        help='interval of the stack sampling done with --profile, 0 for none (default: 5)')
+    parser.add_argument('--trace', metavar='FILE',
+                        help='record when steps, plans and redraws run and write them to FILE as a Chrome '
+                             'trace when the window is closed')
+    parser.add_argument('--trace-capacity', type=int, default=1 << 16,
+                        help='number of most recent spans kept by --trace (default: 65536)')
+    parser.add_argument('--record', metavar='FILE',
+                        help='record every action to FILE as an episode trace, to replay with '
+                             'episode_trace.TraceReplay; environments set up later go to FILE.1, FILE.2, ...')
+    parser.add_argument('--seed', type=int, help='draw the n-th environment from SEED + n, for repeatable runs')
+    parser.add_argument('--layout', default='random', choices=LAYOUTS,
+                        help='walls scattered at random, or rooms joined by doors (default: random)')
+    parser.add_argument('--wall-density', type=float, metavar='P',
+                        help='share of the rooms that are walls (default: drawn between 1/7 and 1/3 with '
+                             'the random layout, none inside the rooms of the rooms layout)')
+    parser.add_argument('--dirt-count', type=int, default=5, help='number of dirty rooms (default: 5)')
+    parser.add_argument('--dirt-density', type=float, metavar='P',
+                        help='share of the free rooms that are dirty, instead of --dirt-count')
+    parser.add_argument('--room-size', type=int, default=8,
+                        help='distance between the wall lines of the rooms layout (default: 8)')
+    parser.add_argument('--corridor-width', type=int, default=0,
+                        help='width of the corridors between the rooms of the rooms layout (default: 0, none)')
+    args = parser.parse_args()
+    Gui.seed = args.seed
+    Gui.recordPath = args.record
+    Gui.scenario = dict(layout=args.layout, wall_density=args.wall_density, dirt_count=args.dirt_count,
+                        dirt_density=args.dirt_density, room_size=args.room_size,
+                        corridor_width=args.corridor_width)
+    if args.trace:
+        from span_trace import trace_session
+
+        trace_session(args.trace, args.trace_capacity, [(Gui, 'update_env'), (Gui, 'step'), (Gui, 'execute_action'),
+                                                        (Gui, 'read_env'), (Gui, 'display_explored'),
+                                                        (Gui, 'idle'), (Gui, 'redraw'),
+                                                        (VacuumPlanning, 'generateSolution')])
+    if args.profile:
+        from session_profiler import profile_session
+
+        profile_session(args.profile, args.sample_ms, [(Gui, 'update_env'), (Gui, 'setSearchEngine'),
+                                                       (Gui, 'display_explored'), (Gui, 'read_env'),
+                                                       (VacuumPlanning, 'generateSolution')])
+
     win = Tk()
     win.title("AI Vacuum Cleaner Simulator")
     win.iconbitmap("vacuum_icon.ico")
@@ -0,0 +1,714 @@
+"""
+Vacuum planning engine: the search problem solved by the vacuum agent and the
+agent itself, free of any GUI dependency so that batch workers can import it
+cheaply (see headless_runner.py). The Tk front end lives in vacuum_cleaner_main.py.
+"""
+
+import atexit
+import multiprocessing
+import multiprocessing.connection
+import shelve
+import time
+
+from agents_and_environments import *
+from contraction_hierarchy import ContractionHierarchy, grid_graph
+from coverage_planning import path_actions, plan_coverage
+from exploration import FREE, OccupancyMap
+from hierarchical_planning import HierarchicalMap
+from landmarks import GridLandmarks
+from reachability import ReachabilityIndex
+from search_algorithms import *
+from wavefront import find_path
+
+"""
+1- BFS: Breadth first search. Using tree or graph version, whichever makes more sense for the problem
+2- DFS: Depth-First search. Again using tree or graph version.
+3- UCS: Uniform-Cost-Search. Using the following cost function to optimise the path, from initial to current state.
+4- Greedy: Uses Manhattan distance to the next closest dirty room as heuristic for greedy algorithm. To find the next closest dirty room, use Manhattan distance.
+5- A*:  Using A star search.
+6- Portfolio: Races several of the above in worker processes kept for the session and keeps the first optimal (or best
+    in time) answer. Floors of at most portfolioInlineRooms rooms are searched in process by A* alone.
+7- IDA*: Iterative-deepening A*, memory linear in the path length plus a bounded transposition table.
+8- SMA*: Simplified memory-bounded A*, never holding more than smaMaxNodes search nodes.
+9- ARA*: Anytime weighted A*. Returns within araDeadlineMs with the best path found so far, refining it towards optimal.
+10- HPA*: Hierarchical A* over clusters of hpaClusterSize x hpaClusterSize rooms, for very large floor plans.
+11- Coverage: Not a search for the next dirty room, but one boustrophedon sweep over every reachable room, sucking on the way.
+12- Explore: The agent only sees within perceptible_distance of itself, maps what it sees and heads for the nearest known
+    dirty room or unexplored frontier.
+13- ALT: A* with a landmark heuristic: lower bounds from the distances to landmarkCount landmarks, which unlike Manhattan
+    distance take the walls into account. The landmarks are only recomputed when the walls change.
+14- CH: Shortest paths in moves from a contraction hierarchy of the floor, built once per wall layout, after which finding
+    the nearest dirty room takes a few small searches.
+15- Wavefront: BFS computed layer by layer as NumPy array operations rather than node by node; the same shortest paths
+    in moves as BFS, many times faster on large open floors.
+"""
+searchTypes = ['None', 'BFS', 'DFS', 'UCS', 'Greedy', 'A*', 'Portfolio', 'IDA*', 'SMA*', 'ARA*', 'HPA*', 'Coverage',
+               'Explore', 'ALT', 'CH', 'Wavefront']
+
+# Strategies raced by the Portfolio search type, and how many seconds it waits
+# for an optimal one before settling for the cheapest path found so far.
+portfolioStrategies = ('A*', 'BFS', 'Greedy', 'DFS')
+portfolioBudget = 0.5
+# Floors of at most this many rooms are searched in process by one optimal
+# strategy, as sending them to the workers would take longer than the search.
+portfolioInlineRooms = 10000
+
+# Memory bounds of the IDA* transposition table and of the SMA* search tree, in nodes.
+idaTableSize = 1 << 20
+smaMaxNodes = 10000
+
+# ARA* starts with f = g + araWeight * h and lowers the weight by araWeightStep
+# per repair; each planning call returns after at most araDeadlineMs milliseconds.
+araWeight = 3.0
+araWeightStep = 0.5
+araDeadlineMs = 30
+
+# Side of the square clusters that HPA* splits the map into.
+hpaClusterSize = 10
+
+# Whether walls hide what lies behind them from an exploring agent.
+exploreLineOfSight = True
+
+# Number of landmarks the ALT search type measures distances from.
+landmarkCount = 8
+
+# How UCS, Greedy, A* and ALT order nodes of equal f on the frontier: one of the
+# names in search_algorithms.tie_breakers.
+tieBreaking = 'high g'
+
+# Whether searches keep their explored and frontier sets as ExploredGrid bitmaps
+# of the floor rather than sets of rooms.
+exploredGrid = True
+
+# The settings above that each search type reads, besides exploredGrid, so that
+# the plan cache tells apart plans made with different settings.
+searchSettings = {'UCS': ('tieBreaking',), 'Greedy': ('tieBreaking',), 'A*': ('tieBreaking',),
+                  'Portfolio': ('portfolioStrategies', 'portfolioBudget', 'portfolioInlineRooms', 'tieBreaking'),
+                  'IDA*': ('idaTableSize',), 'SMA*': ('smaMaxNodes',),
+                  'ARA*': ('araWeight', 'araWeightStep', 'araDeadlineMs'), 'HPA*': ('hpaClusterSize',),
+                  'Explore': ('exploreLineOfSight',), 'ALT': ('landmarkCount', 'tieBreaking')}
+
+
+def search_settings(searchType):
+    """The settings searchType is run with, as a string such as "smaMaxNodes=10000"."""
+    return ' '.join('{}={!r}'.format(name, globals()[name])
+                    for name in searchSettings.get(searchType, ()) + ('exploredGrid',))
+
+
+class PlanCache:
+    """A bounded LRU cache of plans, with an optional on-disk tier.
+    Plans are keyed by a 64-bit Zobrist hash of the walls, the dirt, the start
+    location, the search type, its settings and heuristic, and whether turns
+    cost extra (see key()), in memory and on disk alike. Each
+    entry holds the plan's actions (None if there was no path) and the explored
+    set to display. When path is given, entries are also written to a shelve
+    file there, so plans survive across sessions and are shared by batch runs."""
+
+    def __init__(self, maxsize=256, path=None):
+        self.maxsize = maxsize
+        self.entries = collections.OrderedDict()
+        self.disk = None
+        self.hits = self.disk_hits = self.misses = self.evictions = 0
+        if path:
+            self.open(path)
+
+    def open(self, path):
+        """Attach the on-disk tier stored at path."""
+        self.close()
+        self.disk = shelve.open(path)
+
+    @staticmethod
+    def key(snapshot, start, searchType, turnCostOn, settings=''):
+        """settings tells apart plans of the same search type made differently,
+        e.g. search_settings(searchType) and the name of the heuristic."""
+        return (snapshot.fingerprint ^ zobrist_key('start', *start) ^
+                zobrist_key('search', searchType, settings) ^ zobrist_key('turns', int(bool(turnCostOn))))
+
+    def get(self, key):
+        """Return the (actions, explored) entry stored under key, or None."""
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry
+        if self.disk is not None:
+            entry = self.disk.get('{:016x}'.format(key))
+            if entry is not None:
+                self.disk_hits += 1
+                self.hits += 1
+                self.remember(key, entry)
+                return entry
+        self.misses += 1
+        return None
+
+    def put(self, key, entry):
+        self.remember(key, entry)
+        if self.disk is not None:
+            self.disk['{:016x}'.format(key)] = entry
+
+    def remember(self, key, entry):
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {'hits': self.hits, 'disk_hits': self.disk_hits, 'misses': self.misses,
+                'evictions': self.evictions, 'size': len(self.entries),
+                'hit_rate': self.hits / lookups if lookups else 0.0}
+
+    def close(self):
+        if self.disk is not None:
+            self.disk.close()
+            self.disk = None
+
+
+# Plans are shared by every VacuumPlanning in this process unless one is given its own cache.
+planCache = PlanCache()
+
+
+class VacuumPlanning(Problem):
+    """ The problem of find the next room to clean in a grid of m x n rooms.
+    A state is represented by state of the grid cells locations. Each room is specified by index set
+    (i, j), i in range(m) and j in range (n). Final goal is to clean all dirty rooms. We go by performing sub-goals, each being cleaning the "next" dirty room.
+    """
+
+    def __init__(self, env, searchtype, turnCostOn=False, cache=planCache):
+        """ Define goal state and initialise a problem
+            initial is a pair (i, j) of where the agent is
+            goal is next pair(k, l) where map[k][l] is dirty
+            env may be None for a planner that only searches snapshots (see plan_snapshot).
+            cache is the PlanCache to consult before searching, or None to always search.
+        """
+        self.solution = None
+        self.env = env
+        self.searchType = searchtype
+        self.cache = cache
+        self.snapshot = None
+        self.agent = None
+        self.state = None
+        self.winner = None
+        self.stats = {}
+        self.anytime = None
+        self.anytimeKey = None
+        self.hierarchy = None
+        self.contraction = None
+        self.contractionKey = None
+        self.landmarks = None
+        self.landmarksKey = None
+        self.landmarkBounds = None
+        self.landmarkBoundsKey = None
+        self.reachability = None
+        self.unreachable = set()
+        self.occupancy = None
+        self.route = None
+        self.turnCostOn = turnCostOn
+        if env is not None:
+            self.state = env.agent.location
+            self.map = env.things
+            env.agent.direction = 'UP'  # initial direction of the agent.
+            self.agent = env.agent
+            self.turnCostOn = env.turnCostOn
+        super().__init__(self.state)
+
+    def generateSolution(self):
+        """ generate full path to the next goal based on type of the search chosen by user"""
+        if self.searchType == 'Explore':
+            self.explore(replan=True)
+            return
+        self.env.read_env()
+        snapshot = self.reachableSnapshot(self.env.snapshot(), self.env.agent.location)
+        path, explored = self.plan(snapshot, self.env.agent.location)
+        self.applySolution(path, explored)
+
+    def submitSolution(self, executor):
+        """Plan on a snapshot of the current environment in the background.
+        Returns the executor's future of (path, explored); pass its result to
+        applySolution from the GUI thread. The environment may be edited while
+        the search runs."""
+        self.env.read_env()
+        snapshot = self.reachableSnapshot(self.env.snapshot(), self.env.agent.location)
+        return executor.submit(plan_snapshot, snapshot, self.searchType,
+                               self.turnCostOn, self.env.agent.location)
+
+    def reachabilityIndex(self, snapshot):
+        """The reachability index of the walls of snapshot. It is kept between
+        calls and only updated for the walls that changed since."""
+        index = self.reachability
+        if index is None or (index.width, index.height) != (snapshot.width, snapshot.height):
+            index = self.reachability = ReachabilityIndex(snapshot.width, snapshot.height, snapshot.walls)
+        else:
+            index.sync(snapshot.walls)
+        return index
+
+    def reachableSnapshot(self, snapshot, start):
+        """Drop the dirty rooms that cannot be reached from start, keeping them in
+        self.unreachable."""
+        index = self.reachabilityIndex(snapshot)
+        self.unreachable = {room for room in snapshot.dirt if not index.reachable(start, room)}
+        if self.unreachable:
+            snapshot = snapshot.with_changes(remove_dirt=self.unreachable)
+        return snapshot
+
+    def applySolution(self, path, explored):
+        """Hand a search result over to the environment for execution and display."""
+        if self.unreachable:
+            print("{} dirty room(s) cannot be reached: {}".format(len(self.unreachable), sorted(self.unreachable)))
+        if (path != None):
+            self.env.set_solution(path)
+        elif self.searching():
+            print("Still searching, no path yet.\n")
+        else:
+            print("There is no solution!\n")
+        if (explored != None):
+            self.env.display_explored(explored)
+        else:
+            print("There is not explored list!\n")
+        if 'peak_nodes' in self.stats:
+            print("{} kept at most {} nodes in memory".format(self.searchType, self.stats['peak_nodes']))
+        if 'bound' in self.stats and path is not None:
+            print("{} path cost {} is within {:.2f} x optimal".format(self.searchType, path.path_cost, self.stats['bound']))
+
+    def plan(self, snapshot, start):
+        """Search snapshot for a path from start to the next dirty room, using
+        the search type chosen by the user. Only the snapshot is read, never
+        the live environment. Returns (path, explored)."""
+        self.snapshot = snapshot
+        self.state = start
+        super().__init__(self.state)
+        if not snapshot.dirt:  # nothing left to plan for, e.g. all dirt is out of reach
+            return None, None
+        if self.cache is None:
+            return self.search()
+        key = self.cache.key(snapshot, start, self.searchType, self.turnCostOn,
+                             '{} h={}'.format(search_settings(self.searchType), type(self).h.__qualname__))
+        entry = self.cache.get(key)
+        if entry is not None:
+            actions, explored = entry
+            return (None if actions is None else self.pathFromActions(actions)), explored
+        path, explored = self.search()
+        if self.stats.get('bound', 1.0) > 1.0:  # an anytime search cut short by its deadline
+            return path, explored
+        self.cache.put(key, (None if path is None else path.solution(), explored))
+        return path, explored
+
+    def search(self):
+        """Run the chosen search type on the current snapshot."""
+        self.stats = {}
+        if self.searchType == 'BFS':
+            return breadth_first_graph_search(self)
+        elif self.searchType == 'DFS':
+            return depth_first_graph_search(self)
+        elif self.searchType == 'UCS':
+            return uniform_cost_search(self, tie_breakers[tieBreaking])
+        elif self.searchType == 'Greedy':
+            return best_first_graph_search(self, None, tie_breakers[tieBreaking])
+        elif self.searchType == 'A*':
+            return astar_search(self, None, tie_breakers[tieBreaking])
+        elif self.searchType == 'Portfolio':
+            return self.portfolioSearch()
+        elif self.searchType == 'IDA*':
+            return iterative_deepening_astar_search(self, None, idaTableSize, self.stats)
+        elif self.searchType == 'SMA*':
+            return simplified_memory_bounded_astar_search(self, None, smaMaxNodes, self.stats)
+        elif self.searchType == 'ARA*':
+            return self.anytimeSearch()
+        elif self.searchType == 'HPA*':
+            return self.hierarchicalSearch()
+        elif self.searchType == 'Coverage':
+            return self.coverageSearch()
+        elif self.searchType == 'ALT':
+            return self.landmarkSearch()
+        elif self.searchType == 'CH':
+            return self.contractionSearch()
+        elif self.searchType == 'Wavefront':
+            return self.wavefrontSearch()
+        else:
+            raise NameError('Unknown search type {}'.format(self.searchType))
+
+    def portfolioSearch(self, strategies=None, budget=None):
+        """Race strategies on the current snapshot, each in its own worker process
+        of the session's PortfolioPool. The first result from a strategy that is
+        known to be optimal (UCS and A*, and BFS when turns are free) wins
+        straight away; otherwise the cheapest path found within budget seconds
+        is used, waiting for the first one if nothing has finished by then.
+        Workers still running are terminated. Floors of at most
+        portfolioInlineRooms rooms are searched here by the first optimal
+        strategy alone, as that is quicker than handing them to a worker."""
+        strategies = strategies or portfolioStrategies
+        budget = portfolioBudget if budget is None else budget
+        optimal = {'UCS', 'A*'} if self.turnCostOn else {'UCS', 'A*', 'BFS'}
+        if self.snapshot.width * self.snapshot.height <= portfolioInlineRooms:
+            self.winner = next((strategy for strategy in strategies if strategy in optimal), strategies[0])
+            return plan_snapshot(self.snapshot, self.winner, self.turnCostOn, self.initial)
+        pool = PortfolioPool.session()
+        pending = pool.start(strategies, self.snapshot, self.turnCostOn, self.initial)
+        deadline = time.monotonic() + budget
+        best = None
+        won = False
+        try:
+            while pending and not won:
+                remaining = deadline - time.monotonic()
+                if best is not None and remaining <= 0:
+                    break
+                for connection in multiprocessing.connection.wait(list(pending), timeout=max(remaining, 0.05)):
+                    strategy = pending.pop(connection)
+                    try:
+                        actions, explored, cost = connection.recv()
+                    except EOFError:  # the worker died
+                        continue
+                    if actions is not None and (best is None or cost < best[0]):
+                        best = (cost, strategy, actions, explored)
+                    won = won or strategy in optimal  # nothing can beat it, not even when it found no path
+        finally:
+            pool.stop(pending.values())
+        if best is None:
+            self.winner = None
+            return None, None
+        cost, self.winner, actions, explored = best
+        return self.pathFromActions(actions), explored
+
+    def anytimeSearch(self, deadline_ms=None):
+        """Run ARA* on the current snapshot for at most deadline_ms milliseconds
+        (araDeadlineMs by default). When called again for the same map and start,
+        the previous search is resumed rather than started over, so a caller that
+        got no path, or a loose one, can simply ask again on its next frame."""
+        key = (self.snapshot.fingerprint, tuple(self.initial))
+        if self.anytime is None or self.anytimeKey != key:
+            self.anytime = AnytimeRepairingAstar(self, None, araWeight, araWeightStep)
+            self.anytimeKey = key
+        path, explored = self.anytime.run(araDeadlineMs if deadline_ms is None else deadline_ms)
+        self.stats.update(self.anytime.stats())
+        if self.anytime.done:
+            self.anytime = None
+        return path, explored
+
+    def hierarchicalSearch(self):
+        """Plan on the cluster abstraction of the current snapshot. The abstraction
+        is kept between calls and only rebuilt around walls that changed since.
+        Turn costs are not taken into account while searching, only in the cost
+        of the resulting path."""
+        snapshot = self.snapshot
+        if self.hierarchy is None or (self.hierarchy.width, self.hierarchy.height) != (snapshot.width, snapshot.height):
+            self.hierarchy = HierarchicalMap(snapshot.width, snapshot.height, snapshot.walls, hpaClusterSize)
+        else:
+            self.hierarchy.sync(snapshot.walls)
+        actions, explored = self.hierarchy.find_path(self.initial, snapshot.dirt)
+        if actions is None:
+            return None, explored
+        return self.pathFromActions(actions), explored
+
+    def contractionSearch(self):
+        """Find the nearest dirty room with the contraction hierarchy of the current
+        snapshot's floor, built again only when its walls change. Like HPA*, turn
+        costs only count in the cost of the resulting path."""
+        snapshot = self.snapshot
+        key = (snapshot.width, snapshot.height, snapshot.wall_fingerprint)
+        if self.contractionKey != key:
+            self.contraction = ContractionHierarchy(grid_graph(snapshot.width, snapshot.height, snapshot.walls))
+            self.contractionKey = key
+        _, _, path, reached = self.contraction.nearest(tuple(self.initial), snapshot.dirt)
+        if path is None:
+            return None, reached
+        return self.pathFromActions(path_actions(path)), reached
+
+    def wavefrontSearch(self):
+        """Breadth-first search of the current snapshot as whole-array operations
+        (see wavefront.py). Like BFS, turn costs only count in the cost of the
+        resulting path; explored holds the rooms closer to the agent than the goal."""
+        snapshot = self.snapshot
+        actions, expanded = find_path(snapshot.width, snapshot.height, snapshot.walls, self.initial, snapshot.dirt)
+        if exploredGrid:
+            explored = explored_grid(expanded)
+        else:
+            explored = {(x, y) for x, y in np.argwhere(expanded).tolist()}
+        if actions is None:
+            return None, explored
+        return self.pathFromActions(actions), explored
+
+    def landmarkSearch(self):
+        """A* with the landmark heuristic on the current snapshot. The landmarks
+        are picked in the part of the floor the agent can reach and kept for as
+        long as the walls stay the same and the agent stays in that part; the
+        bounds towards the dirty rooms are kept for as long as the dirt does too."""
+        snapshot = self.snapshot
+        x, y = self.initial
+        key = (snapshot.width, snapshot.height, snapshot.wall_fingerprint)
+        if self.landmarksKey != key or not self.landmarks.reaches(x * snapshot.height + y):
+            self.landmarks = GridLandmarks(snapshot.width, snapshot.height, snapshot.walls, landmarkCount,
+                                           self.initial)
+            self.landmarksKey = key
+            self.landmarkBoundsKey = None
+        if self.landmarkBoundsKey != snapshot.dirt_fingerprint:
+            self.landmarkBounds = self.landmarks.grid_bounds(snapshot.dirt).tolist()
+            self.landmarkBoundsKey = snapshot.dirt_fingerprint
+        return astar_search(self, self.landmarkHeuristic, tie_breakers[tieBreaking])
+
+    def landmarkHeuristic(self, node):
+        x, y = node.state
+        return self.landmarkBounds[x][y]
+
+    def coverageSearch(self):
+        """Plan a sweep of the whole floor reachable from the initial state, with a
+        'Suck' at each dirty room on the way. The sweep orientation is chosen by
+        the same turn costs as path_cost. Returns (path, explored) like a search,
+        explored being empty since nothing is searched."""
+        snapshot = self.snapshot
+        turn_cost = self.computeTurnCost if self.turnCostOn else None
+        rooms = self.reachabilityIndex(snapshot).component(self.initial)
+        actions, cells = plan_coverage(rooms, self.initial, snapshot.dirt, turn_cost)
+        self.stats.update(rooms=len(rooms), cells=cells)
+        return self.pathFromActions(actions), set()
+
+    def perceive(self):
+        """Explore mode: take in what the agent sees now, once per step. Other modes
+        plan on the whole map and ignore it."""
+        if self.searchType == 'Explore':
+            self.explore()
+
+    def explore(self, replan=False):
+        """Add the agent's percept to the occupancy map, then plan towards the nearest
+        known dirty room or frontier. Unless replan is set, the current plan is kept
+        while it is still good: it has moves left, runs through no newly seen wall
+        and leads to a room that is still worth going to."""
+        env = self.env
+        if self.occupancy is None:
+            self.occupancy = OccupancyMap(env.width, env.height)
+        location = tuple(env.agent.location)
+        seen = self.occupancy.observe(location, env.map_things_at, env.perceptible_distance, exploreLineOfSight)
+        if not replan and self.route is not None:
+            remaining = self.route[len(self.route) - len(env.solution):] if env.solution else []
+            if not remaining:
+                replan = location not in self.occupancy.dirt
+            else:
+                replan = (not self.occupancy.is_goal(remaining[-1]) or
+                          any(self.occupancy.state(room) != FREE for room in remaining) or
+                          (remaining[-1] not in self.occupancy.dirt and
+                           any(room in self.occupancy.dirt for room in seen)))
+        if not replan:
+            return
+        self.state = location
+        super().__init__(self.state)
+        actions, self.route, searched = self.occupancy.plan(location)
+        if actions is None:
+            env.solution = []
+            self.applySolution(None, searched)
+        else:
+            self.applySolution(self.pathFromActions(actions), searched)
+
+    def exhausted(self):
+        """True if the last plan found nothing left that the agent could go for."""
+        if self.searchType == 'Explore':
+            return self.occupancy is not None and self.route is None
+        return self.snapshot is not None and not self.snapshot.dirt
+
+    def searching(self):
+        """True while an anytime search has been cut short before finding any path."""
+        return self.anytime is not None and self.anytime.solution is None
+
+    def pathFromActions(self, actions):
+        """Rebuild the search Node at the end of actions, taken from the initial state."""
+        node = Node(self.initial)
+        for action in actions:
+            node = node.child_node(self, action)
+        return node
+
+    def generateNextSolution(self):
+        self.generateSolution()
+
+    def actions(self, state):
+        """ Return the actions that can be executed in the given state.
+        The result would be a list, since there are only four possible actions
+        in any given state of the environment """
+        x, y = state
+        walls = self.snapshot.walls
+        possible_actions = []
+        if (x, y + 1) not in walls:
+            possible_actions.append('UP')
+        if (x, y - 1) not in walls:
+            possible_actions.append('DOWN')
+        if (x - 1, y) not in walls:
+            possible_actions.append('LEFT')
+        if (x + 1, y) not in walls:
+            possible_actions.append('RIGHT')
+        return possible_actions
+
+    def result(self, state, action):
+        """ Given state and action, return a new state that is the result of the action.
+        Action is assumed to be a valid action for the state """
+        new_state = list(state)
+        if action == 'RIGHT':
+            new_state[0] += 1
+        elif action == 'LEFT':
+            new_state[0] -= 1
+        elif action == 'UP':
+            new_state[1] += 1
+        elif action == 'DOWN':
+            new_state[1] -= 1
+
+        return new_state
+
+    def goal_test(self, state):
+        """ Given a state, return True if state is a goal state or False, otherwise """
+        return tuple(state) in self.snapshot.dirt
+
+    def path_cost(self, curNode, state1, action, state2):
+        """To be used for UCS and A* search. Returns the cost of a solution path that arrives at state2 from
+        state1 via action, assuming it costs c to get up to state1. For our problem state is (x, y) coordinate pair.
+        Rotation of the Vacuum machine costs equivalent of 0.5 unit for each 90' rotation.
+        A 'Suck' along the way (see coverageSearch) costs nothing and keeps the heading. """
+        if action == 'Suck':
+            return curNode.path_cost
+        while curNode.action == 'Suck':
+            curNode = curNode.parent
+        move_cost = 1
+        if self.turnCostOn and curNode.action != None:
+            turn_cost = self.computeTurnCost(curNode.action, action)
+        else:
+            turn_cost = 0
+        return curNode.path_cost + move_cost + turn_cost
+
+    def computeTurnCost(self, action1, action):
+        possible_actions = {"UP": 0, "DOWN": 0, "LEFT": 1, "RIGHT": 1}
+
+        diff = abs(possible_actions[action] - possible_actions[action1])
+
+        if diff == 0:
+            if action != action1:
+                return 1
+            else:
+                return 0
+        else:
+            return 0.5
+
+    def findMinManhattanDist(self, pos):
+        """find the min distance between position pos and any of the dirty rooms. Dirty rooms are read from
+        the snapshot being searched."""
+        min_distance = float('inf')
+        for room in self.snapshot.dirt:
+            distance = abs(pos[0] - room[0]) + abs(pos[1] - room[1])
+            if distance < min_distance:
+                min_distance = distance
+        return min_distance
+
+    def explored_set(self):
+        """An empty explored set for a search of the current snapshot (see exploredGrid)."""
+        if exploredGrid and self.snapshot is not None:
+            return ExploredGrid(self.snapshot.width, self.snapshot.height)
+        return set()
+
+    def h(self, node):
+        """ Return the heuristic value for a given state. For this problem use minimum Manhattan
+        distance to a dirty room, among all the dirty rooms.
+        """
+        return self.findMinManhattanDist(node.state)
+
+
+def plan_snapshot(snapshot, searchtype, turnCostOn=False, start=None, cache=None):
+    """Plan on an XYSnapshot alone, from start (by default the first agent's
+    location). Nothing is shared with a live environment, so this can run on a
+    worker thread or process, and several "what-if" snapshots can be planned
+    in parallel. No plan cache is used unless one is given, since PlanCache is
+    not meant to be shared between threads. Returns (path, explored)."""
+    if start is None:
+        start = snapshot.agents[0]
+    return VacuumPlanning(None, searchtype, turnCostOn, cache).plan(snapshot, start)
+
+
+class PortfolioPool:
+    """The worker processes of the Portfolio search type, one per strategy,
+    started on first use and kept for the whole session, so that a plan costs
+    sending the snapshot rather than starting a process per strategy. Each
+    worker has a pipe of its own: a worker terminated mid-search takes only its
+    own pipe with it, and is started again when next needed."""
+
+    pool = None
+
+    def __init__(self):
+        self.workers = {}  # strategy -> (process, connection)
+
+    @classmethod
+    def session(cls):
+        """The pool of this process, shut down when the interpreter exits."""
+        if cls.pool is None:
+            cls.pool = cls()
+            atexit.register(cls.pool.close)
+        return cls.pool
+
+    def worker(self, strategy):
+        process, connection = self.workers.get(strategy, (None, None))
+        if process is None or not process.is_alive():
+            connection, child = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=portfolio_worker, args=(child, strategy), daemon=True,
+                                              name='Portfolio ' + strategy)
+            process.start()
+            child.close()
+            self.workers[strategy] = (process, connection)
+        return connection
+
+    def start(self, strategies, snapshot, turnCostOn, start):
+        """Have each of strategies plan from start on snapshot. Returns a dict
+        mapping the connection each result will arrive on to its strategy."""
+        pending = {}
+        for strategy in strategies:
+            connection = self.worker(strategy)
+            connection.send((snapshot, turnCostOn, start))
+            pending[connection] = strategy
+        return pending
+
+    def stop(self, strategies):
+        """Terminate the workers of strategies, whose results are no longer wanted."""
+        for strategy in strategies:
+            process, connection = self.workers.pop(strategy)
+            process.terminate()
+            process.join()
+            connection.close()
+
+    def close(self):
+        for process, connection in self.workers.values():
+            connection.close()  # the worker sees the end of its pipe and returns
+            process.join(1)
+            if process.is_alive():
+                process.terminate()
+        self.workers = {}
+
+
+def portfolio_worker(connection, searchtype):
+    """Process body for PortfolioPool: plan every (snapshot, turnCostOn, start)
+    received on connection with searchtype, and send back (actions, explored,
+    cost), or (None, explored, None) if there is no path."""
+    while True:
+        try:
+            snapshot, turnCostOn, start = connection.recv()
+        except EOFError:
+            return
+        path, explored = plan_snapshot(snapshot, searchtype, turnCostOn, start)
+        if path is None:
+            connection.send((None, explored, None))
+        else:
+            connection.send((path.solution(), explored, path.path_cost))
+
+
+# ______________________________________________________________________________
+
+"""
+Our search Agents ignore environment percepts for planning. The planning is done based on static
+data from environment at the beginning. The environment is fully observable
+"""
+
+
+def XYSearchAgentProgram(percept):
+    pass
+
+
+class XYSearchAgent(Agent):
+    """The modified SimpleRuleAgent for the GUI environment."""
+
+    def __init__(self, program, loc):
+        super().__init__(program)
+        self.location = loc
+        self.direction = Direction("up")
+        self.searchType = searchTypes[0]
+        self.stepCount = 0
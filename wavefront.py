@@ -0,0 +1,148 @@
+"""
+Breadth-first search on a grid as whole-array operations.
+
+free_mask  ## The rooms of a grid that are not walls, as a bool array
+wavefront  ## Breadth-first distances from a set of sources, layer by layer
+find_path  ## Shortest path in moves from a start to the nearest of some goals
+
+Each layer of a breadth-first search over a grid with unit-cost moves is the
+previous layer shifted one room in each of the four directions, less the walls
+and the rooms already reached. The masks are packed 64 rooms of a column to a
+word, so with NumPy a layer is a handful of operations on words: shifting a
+column by one bit moves up or down, taking the next or previous row of words
+moves right or left. That replaces a Node, a tuple and a few set lookups per
+room. Only the rows of the current layer, and one on either side, are worked on,
+so a search through a narrow part of the floor stays cheap too. Distances are
+kept as bit planes, only unpacked once the search is over: the rooms whose
+distance has bit k set are those reached while bit k of the layer number was on,
+so each plane is updated only when its bit turns on or off.
+
+Distances are -1 for walls and rooms out of reach. The path is read back from
+the goal by stepping to any neighbouring room one move closer to the start.
+"""
+
+from coverage_planning import MOVES, path_actions
+from utilities import np
+
+
+def free_mask(width, height, walls):
+    """A width x height bool array, indexed [x, y], of the rooms that are not walls."""
+    free = np.ones((width, height), dtype=bool)
+    for x, y in walls:
+        if 0 <= x < width and 0 <= y < height:
+            free[x, y] = False
+    return free
+
+
+def cell_mask(shape, cells):
+    mask = np.zeros(shape, dtype=bool)
+    for x, y in cells:
+        if 0 <= x < shape[0] and 0 <= y < shape[1]:
+            mask[x, y] = True
+    return mask
+
+
+def pack(mask):
+    """A width x height bool array as a width x words array of 64-bit words, bit
+    b of word j of row x holding [x, 64 * j + b]. The bits past height are 0, and
+    so is the last word of every row, so that shifting the whole array by a bit
+    never carries anything from one row into the next."""
+    width, height = mask.shape
+    words = height // 64 + 1
+    padded = np.zeros((width, words * 64), dtype=bool)
+    padded[:, :height] = mask
+    return np.packbits(padded, axis=1, bitorder='little').view('<u8')
+
+
+def unpack(packed, height):
+    """The bool array packed by pack()."""
+    return np.unpackbits(packed.view(np.uint8), axis=1, count=height, bitorder='little').view(bool)
+
+
+def wavefront(free, sources, goals=()):
+    """Breadth-first distances from the rooms in sources over the rooms marked in
+    the bool array free. If goals, a collection of rooms, is given, the search
+    stops at the first layer that reaches one of them.
+    Returns (distances, reached): an int32 array of moves from the nearest source,
+    -1 where not reached, and the sorted list of the goals in the last layer
+    (empty if no goal was reached or none was given)."""
+    width, height = free.shape
+    layer = pack(cell_mask(free.shape, sources) & free)
+    unvisited = pack(free) & ~layer
+    words = layer.shape[1]
+    goals = [(x, y) for x, y in goals if 0 <= x < width and 0 <= y < height and free[x, y]]
+    targets = [(x, y, y // 64, np.uint64(1 << y % 64)) for x, y in goals]
+    many = pack(cell_mask(free.shape, goals)) if len(goals) > 32 else None  # test them all at once
+    planes = []  # planes[k] has the rooms whose distance has bit k set
+
+    def toggle(bits):
+        """Bit k of the step number turns on or off: the rooms reached while it was
+        on are those visited at the end of that run of steps but not at its start."""
+        k = 0
+        while bits >> k:
+            if bits >> k & 1:
+                if k == len(planes):
+                    planes.append(unvisited.copy())
+                else:
+                    planes[k] ^= unvisited
+            k += 1
+
+    reached = []
+    occupied = (layer != 0).ravel()
+    offset = 0
+    step = 0
+    while occupied.any():
+        if (layer & many).any() if many is not None else any(layer[x, word] & bit for x, _, word, bit in targets):
+            reached = [(x, y) for x, y, word, bit in targets if layer[x, word] & bit]
+            break
+        x0 = offset + int(occupied.argmax()) // words
+        x1 = offset + (occupied.size - int(occupied[::-1].argmax()) - 1) // words + 1
+        a0, a1 = max(x0 - 1, 0), min(x1 + 1, width)
+        current = layer[a0:a1].ravel()
+        grown = current << np.uint64(1)  # up
+        grown |= current >> np.uint64(1)  # down
+        grown[1:] |= current[:-1] >> np.uint64(63)  # and the bits crossing a word boundary
+        grown[:-1] |= current[1:] << np.uint64(63)
+        grown[words:] |= current[:-words]  # right
+        grown[:-words] |= current[words:]  # left
+        grown = grown.reshape(a1 - a0, words)
+        grown &= unvisited[a0:a1]
+        step += 1
+        toggle(step ^ (step - 1))
+        unvisited[a0:a1] ^= grown
+        layer[a0:a1] = grown  # which clears the previous layer too, as it lies within a0:a1
+        occupied = (grown != 0).ravel()
+        offset = a0
+    toggle(step)
+    distances = np.zeros(free.shape, dtype=np.int32)
+    for bit, plane in enumerate(planes):
+        distances |= unpack(plane, height).astype(np.int32) << bit
+    distances[unpack(unvisited, height) | ~free] = -1
+    return distances, sorted(reached)
+
+
+def trace_back(distances, goal):
+    """The rooms from a source to goal, both included, along decreasing distances."""
+    width, height = distances.shape
+    x, y = goal
+    path = [(x, y)]
+    while distances[x, y] > 0:
+        for dx, dy in MOVES:
+            nx, ny = x - dx, y - dy
+            if 0 <= nx < width and 0 <= ny < height and distances[nx, ny] == distances[x, y] - 1:
+                x, y = nx, ny
+                break
+        path.append((x, y))
+    return path[::-1]
+
+
+def find_path(width, height, walls, start, goals):
+    """Breadth-first search from start to the nearest of goals on a width x height
+    grid with the given walls. Returns (actions, explored): the moves to the goal,
+    or None if no goal can be reached, and the bool array of the rooms the search
+    expanded, i.e. every room closer to start than the goal."""
+    distances, reached = wavefront(free_mask(width, height, walls), [tuple(start)], goals)
+    if not reached:
+        return None, distances >= 0
+    goal = reached[0]
+    return path_actions(trace_back(distances, goal)), (distances >= 0) & (distances < distances[goal])